@@ -2,8 +2,15 @@ from django.contrib import admin
 
 from .models import (
     Account,
+    AccountSummary,
+    AccountValuationSnapshot,
+    EstimateAccuracyRollup,
     Fund,
+    FundMetrics,
+    FundNavCoverage,
     FundNavHistory,
+    FundRanking,
+    FundRankingBuild,
     Position,
     PositionOperation,
     Watchlist,
@@ -111,3 +118,62 @@ class FundNavHistoryAdmin(admin.ModelAdmin):
     date_hierarchy = "nav_date"
     readonly_fields = ["created_at", "updated_at"]
     ordering = ["-nav_date"]
+
+
+@admin.register(FundNavCoverage)
+class FundNavCoverageAdmin(admin.ModelAdmin):
+    list_display = ["fund", "first_nav_date", "last_nav_date", "repair_attempts", "checked_at"]
+    search_fields = ["fund__fund_code", "fund__fund_name"]
+    readonly_fields = ["checked_at"]
+
+
+@admin.register(FundMetrics)
+class FundMetricsAdmin(admin.ModelAdmin):
+    list_display = ["fund", "nav_date", "return_1y", "max_drawdown", "volatility", "stale"]
+    list_filter = ["stale"]
+    search_fields = ["fund__fund_code", "fund__fund_name"]
+    readonly_fields = ["updated_at"]
+
+
+@admin.register(FundRanking)
+class FundRankingAdmin(admin.ModelAdmin):
+    list_display = ["rank_type", "category", "rank", "fund", "value", "built_at"]
+    list_filter = ["rank_type", "category"]
+    search_fields = ["fund__fund_code", "fund__fund_name"]
+
+
+@admin.register(FundRankingBuild)
+class FundRankingBuildAdmin(admin.ModelAdmin):
+    list_display = ["rank_type", "row_count", "built_at"]
+
+
+@admin.register(EstimateAccuracyRollup)
+class EstimateAccuracyRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        "source_name",
+        "fund",
+        "window_days",
+        "record_count",
+        "mean_error",
+        "mean_abs_error",
+        "rmse",
+        "updated_at",
+    ]
+    list_filter = ["source_name", "window_days"]
+    search_fields = ["fund__fund_code", "fund__fund_name"]
+    readonly_fields = ["updated_at"]
+
+
+@admin.register(AccountSummary)
+class AccountSummaryAdmin(admin.ModelAdmin):
+    list_display = ["account", "holding_cost", "holding_value", "estimate_value", "updated_at"]
+    search_fields = ["account__name"]
+    readonly_fields = ["updated_at"]
+
+
+@admin.register(AccountValuationSnapshot)
+class AccountValuationSnapshotAdmin(admin.ModelAdmin):
+    list_display = ["account", "snapshot_date", "value", "cost", "updated_at"]
+    list_filter = ["snapshot_date"]
+    search_fields = ["account__name"]
+    readonly_fields = ["updated_at"]
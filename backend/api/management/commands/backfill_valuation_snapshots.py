@@ -0,0 +1,49 @@
+"""
+回填账户估值快照命令
+
+按天回放流水，批量写入最近 N 天（不含当天）的账户估值快照
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.valuation_snapshot import backfill_snapshots
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "回填账户估值快照"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="回填天数（默认 365）",
+        )
+        parser.add_argument(
+            "--account_id",
+            type=str,
+            help="指定账户 ID（可选，不指定则回填所有有流水的子账户）",
+        )
+
+    def handle(self, *args, **options):
+        days = max(1, options.get("days") or 1)
+        account_id = options.get("account_id")
+
+        if account_id:
+            self.stdout.write(f"开始回填账户 {account_id} 最近 {days} 天的估值快照...")
+        else:
+            self.stdout.write(f"开始回填所有账户最近 {days} 天的估值快照...")
+
+        started = time.monotonic()
+        stats = backfill_snapshots(days, account_id=account_id)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"回填完成：{stats['accounts']} 个账户，写入 {stats['snapshots']} 个快照"
+                f"（耗时 {time.monotonic() - started:.2f}s）"
+            )
+        )
@@ -1,7 +1,14 @@
 """
 计算估值准确率命令
 
-计算估值数据的准确率
+计算估值数据的准确率：
+1. 一次查询取出指定日期及之前 PENDING_LOOKBACK_DAYS 天内仍未取到实际净值的记录（带 fund），
+   净值晚披露的基金（QDII 等 T+2）在之后几天的审计中补上
+2. 实际净值（单位净值）按 (基金, 估值日期) 批量获取：优先已入库的历史净值（FundNavHistory），
+   其次 FundMNFInfo 200只/批，仍缺失的基金再逐个数据源兜底；
+   接口返回的净值日期必须等于估值日期（晚间审计时接口可能已返回当天净值）
+3. 误差率在内存中计算，bulk_update 一次写回
+4. 增量更新涉及的 (数据源, 基金) 准确率滚动汇总
 """
 
 import logging
@@ -9,11 +16,18 @@ from datetime import date, timedelta
 
 from django.core.management.base import BaseCommand
 
-from api.models import EstimateAccuracy
+from api.models import EstimateAccuracy, FundNavHistory
+from api.services.accuracy_rollup import update_accuracy_rollups
+from api.services.batch_nav import BATCH_SIZE, fetch_batch_nav
 from api.sources import SourceRegistry
 
 logger = logging.getLogger(__name__)
 
+# bulk_update 每条 UPDATE 语句的行数
+WRITE_BATCH_SIZE = 500
+# 回查最近几天仍未取到实际净值的记录（净值晚披露的基金）
+PENDING_LOOKBACK_DAYS = 5
+
 
 class Command(BaseCommand):
     help = "计算估值准确率"
@@ -35,23 +49,105 @@ class Command(BaseCommand):
             target_date = date.today() - timedelta(days=1)
             self.stdout.write(f"开始计算昨天（{target_date}）的准确率...")
 
-        # 获取指定日期的未计算准确率的记录
-        records = EstimateAccuracy.objects.filter(
-            estimate_date=target_date, actual_nav__isnull=True
+        # 获取指定日期及之前几天未计算准确率的记录（一次查询）
+        records = list(
+            EstimateAccuracy.objects.filter(
+                estimate_date__gte=target_date - timedelta(days=PENDING_LOOKBACK_DAYS),
+                estimate_date__lte=target_date,
+                actual_nav__isnull=True,
+            ).select_related("fund")
         )
 
-        if not records.exists():
+        if not records:
             self.stdout.write(self.style.WARNING("没有需要计算的记录"))
             return
 
-        self.stdout.write(f"找到 {records.count()} 条记录")
+        self.stdout.write(f"找到 {len(records)} 条记录")
+
+        # 同一基金同一天的多条记录（不同估值源）共用一个实际净值
+        pending = {(record.fund_id, record.estimate_date): record.fund for record in records}
+        navs = self._fetch_actual_navs(pending)
+
+        updated = []
+        error_count = 0
+        for record in records:
+            actual_nav = navs.get((record.fund_id, record.estimate_date))
+            if actual_nav is None:
+                continue
+            try:
+                record.actual_nav = actual_nav
+                record.calculate_error_rate(save=False)
+                updated.append(record)
+            except Exception as e:
+                error_count += 1
+                logger.error(f"计算准确率失败 {record.fund.fund_code}: {e}")
+
+        EstimateAccuracy.objects.bulk_update(
+            updated, ["actual_nav", "error_rate"], batch_size=WRITE_BATCH_SIZE
+        )
+        update_accuracy_rollups({(record.source_name, record.fund_id) for record in updated})
+
+        self.stdout.write(
+            self.style.SUCCESS(f"计算完成：成功 {len(updated)} 个，失败 {error_count} 个")
+        )
+
+    def _fetch_actual_navs(self, pending: dict) -> dict:
+        """
+        批量获取各估值日期当天的实际单位净值
+
+        Args:
+            pending: {(fund_id, 估值日期): fund}
+
+        Returns:
+            {(fund_id, 估值日期): 单位净值}
+        """
+        # 1. 已入库的历史净值
+        fund_ids = {fund_id for fund_id, _ in pending}
+        dates = {nav_date for _, nav_date in pending}
+        navs = {
+            (fund_id, nav_date): unit_nav
+            for fund_id, nav_date, unit_nav in FundNavHistory.objects.filter(
+                fund_id__in=fund_ids, nav_date__in=dates
+            ).values_list("fund_id", "nav_date", "unit_nav")
+            if (fund_id, nav_date) in pending
+        }
+        if navs:
+            self.stdout.write(f"历史净值命中 {len(navs)} 条")
+
+        # 2. FundMNFInfo 批量接口（只返回最新净值：nav 为累计净值，取 unit_nav，
+        #    净值日期正好是某条待计算记录的估值日期时采用）
+        missing = {key for key in pending if key not in navs}
+        fund_ids_by_code = {pending[key].fund_code: key[0] for key in missing}
+        codes = list(fund_ids_by_code)
+        for offset in range(0, len(codes), BATCH_SIZE):
+            for code, data in fetch_batch_nav(codes[offset : offset + BATCH_SIZE]).items():
+                key = (fund_ids_by_code.get(code), data["nav_date"])
+                if key in missing and data.get("unit_nav"):
+                    navs[key] = data["unit_nav"]
+                    missing.discard(key)
+
+        # 3. 批量接口缺失的基金逐个数据源兜底（每只基金只查一次）
+        if missing:
+            sources = self._load_sources()
+            wanted_dates = {}
+            for fund_id, nav_date in missing:
+                wanted_dates.setdefault(fund_id, set()).add(nav_date)
+            for code, fund_id in fund_ids_by_code.items():
+                if fund_id not in wanted_dates:
+                    continue
+                result = self._fetch_from_sources(sources, code, wanted_dates[fund_id])
+                if result:
+                    nav_date, unit_nav = result
+                    navs[(fund_id, nav_date)] = unit_nav
+
+        return navs
 
-        # 并发从所有数据源获取实际净值
+    def _load_sources(self) -> list:
+        """可用于查询实际净值的数据源"""
         from api.models import UserSourceCredential
 
-        source_names = SourceRegistry.list_sources()
         sources = []
-        for name in source_names:
+        for name in SourceRegistry.list_sources():
             s = SourceRegistry.get_source(name)
             if not s or name == "sina":
                 continue
@@ -63,44 +159,25 @@ class Command(BaseCommand):
                     continue
                 s.set_token(cred.token)
             sources.append(s)
-        if not sources:
-            self.stdout.write(self.style.ERROR("没有可用的数据源"))
-            return
+        return sources
 
-        success_count = 0
-        error_count = 0
+    @staticmethod
+    def _fetch_from_sources(sources: list, fund_code: str, wanted_dates: set):
+        """
+        多源尝试获取最新单位净值，净值日期须为待计算的估值日期之一
 
-        for record in records:
+        Returns:
+            (净值日期, 单位净值)，都没有时返回 None
+        """
+        for s in sources:
             try:
-                # 多源尝试获取实际净值（不强制日期精确匹配，QDII T+2 延迟场景）
-                data = None
-                for s in sources:
-                    try:
-                        d = s.fetch_realtime_nav(record.fund.fund_code)
-                        if d and d.get("nav_date"):
-                            # 优先精确匹配，否则取最新的
-                            if (
-                                not data
-                                or d["nav_date"] == record.estimate_date
-                                or d["nav_date"] > data["nav_date"]
-                            ):
-                                data = d
-                    except Exception:
-                        continue
-                if not data:
-                    continue
-
-                record.actual_nav = data["nav"]
-
-                # 计算误差率
-                record.calculate_error_rate()
-
-                success_count += 1
-
-            except Exception as e:
-                error_count += 1
-                logger.error(f"计算准确率失败 {record.fund.fund_code}: {e}")
-
-        self.stdout.write(
-            self.style.SUCCESS(f"计算完成：成功 {success_count} 个，失败 {error_count} 个")
-        )
+                d = s.fetch_realtime_nav(fund_code)
+            except Exception:
+                continue
+            if not d or d.get("nav_date") not in wanted_dates:
+                continue
+            # 提供 unit_nav 的数据源（东方财富）nav 为累计净值；其余数据源 nav 即单位净值
+            unit_nav = d["unit_nav"] if "unit_nav" in d else d.get("nav")
+            if unit_nav:
+                return d["nav_date"], unit_nav
+        return None
@@ -0,0 +1,37 @@
+"""
+重建估值准确率滚动汇总命令
+
+审计后汇总会增量更新，此命令用于首次部署或手工修正准确率记录后全量重建
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.accuracy_rollup import rebuild_accuracy_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "重建估值准确率滚动汇总"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            type=str,
+            help="指定数据源（可选，默认全部）",
+        )
+
+    def handle(self, *args, **options):
+        source_name = options.get("source")
+        self.stdout.write(f"开始重建{source_name or '全部数据源'}的准确率汇总...")
+
+        started = time.monotonic()
+        count = rebuild_accuracy_rollups(source_name)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"重建完成：{count} 组数据源 × 基金（耗时 {time.monotonic() - started:.2f}s）"
+            )
+        )
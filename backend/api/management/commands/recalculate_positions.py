@@ -5,6 +5,7 @@
 """
 
 import logging
+import time
 
 from django.core.management.base import BaseCommand
 
@@ -22,15 +23,27 @@ class Command(BaseCommand):
             type=str,
             help="指定账户 ID（可选，不指定则重算所有账户）",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="并行进程数（按账户分片，默认 1）",
+        )
 
     def handle(self, *args, **options):
         account_id = options.get("account_id")
+        workers = max(1, options.get("workers") or 1)
 
         if account_id:
             self.stdout.write(f"开始重算账户 {account_id} 的持仓...")
-            recalculate_all_positions(account_id=account_id)
-            self.stdout.write(self.style.SUCCESS("重算完成"))
         else:
             self.stdout.write("开始重算所有账户的持仓...")
-            recalculate_all_positions()
-            self.stdout.write(self.style.SUCCESS("重算完成"))
+
+        started = time.monotonic()
+        stats = recalculate_all_positions(account_id=account_id, workers=workers)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"重算完成：{stats['pairs']} 个组合，更新 {stats['updated']} 个，"
+                f"删除 {stats['deleted']} 个（耗时 {time.monotonic() - started:.2f}s）"
+            )
+        )
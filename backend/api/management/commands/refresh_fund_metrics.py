@@ -0,0 +1,55 @@
+"""
+刷新基金指标命令
+
+默认只重算写入新历史净值后过期的基金和还没有指标的基金；
+--all 全量重算（修改指标窗口配置后执行）
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import Fund, FundNavHistory
+from api.services.fund_metrics import refresh_fund_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "刷新基金收益风险指标"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="重算所有有历史净值的基金（默认只重算过期 / 缺失的）",
+        )
+        parser.add_argument(
+            "--fund_code",
+            type=str,
+            help="指定基金代码（可选）",
+        )
+
+    def handle(self, *args, **options):
+        fund_code = options.get("fund_code")
+
+        if fund_code:
+            fund_ids = Fund.objects.filter(fund_code=fund_code).values_list("id", flat=True)
+            self.stdout.write(f"开始刷新基金 {fund_code} 的指标...")
+        elif options.get("all"):
+            fund_ids = (
+                FundNavHistory.objects.order_by().values_list("fund_id", flat=True).distinct()
+            )
+            self.stdout.write("开始全量刷新基金指标...")
+        else:
+            fund_ids = None
+            self.stdout.write("开始刷新过期的基金指标...")
+
+        started = time.monotonic()
+        count = refresh_fund_metrics(fund_ids)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"刷新完成：{count} 只基金（耗时 {time.monotonic() - started:.2f}s）"
+            )
+        )
@@ -2,78 +2,137 @@
 更新基金净值命令
 
 使用东方财富移动端批量 API (FundMNFInfo) 一次性获取数百只基金的净值。
+批次在限速内并发获取，变更按批次收集后用 bulk_update 一次写入，
+获取到的确认净值同时批量追加到 FundNavHistory。
+
+--backend market 时先通过 akshare 全市场开放式基金净值表一次性获取，
+表中没有的基金（或整表获取失败）再走 200只/批 的 FundMNFInfo 接口。
 """
 
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from decimal import Decimal, InvalidOperation
 
-import requests
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from fundval.config import config
 
 from api.models import Fund
+from api.services.account_summary import mark_funds_dirty
+from api.services.batch_nav import BATCH_SIZE, fetch_batch_nav
+from api.services.nav_history import record_confirmed_navs
 
 logger = logging.getLogger(__name__)
 
-BATCH_API_URL = "https://fundmobapi.eastmoney.com/FundMNewApi/FundMNFInfo"
-BATCH_SIZE = 200
-MOBILE_HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (iPhone; CPU iPhone OS 14_3 like Mac OS X) "
-        "AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148 "
-        "eastmoney/6.2.8"
-    ),
-}
+# 并发请求数与每秒请求上限（避免触发上游限流）
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 5.0
+# bulk_update 每条 UPDATE 语句的行数
+WRITE_BATCH_SIZE = 500
+# 获取方式：batch（FundMNFInfo 200只/批）/ market（全市场净值表 + batch 兜底）
+BACKENDS = ("batch", "market")
 
 
-def _fetch_batch_nav(fund_codes):
+def _fetch_market_nav():
     """
-    批量获取基金净值。
+    一次性获取全市场开放式基金净值（akshare fund_open_fund_daily_em）
 
-    返回: {fund_code: {'nav': Decimal, 'nav_date': date}}
+    返回: 与 fetch_batch_nav 相同格式的 {fund_code: {...}}，失败返回空字典
     """
-    result = {}
-    url = BATCH_API_URL
-    params = {
-        "Fcodes": ",".join(fund_codes),
-        "pageIndex": "1",
-        "pageSize": str(len(fund_codes) + 10),
-        "Sort": "",
-        "SortColumn": "",
-        "IsShowSE": "false",
-        "P": "F",
-        "deviceid": "3EA024C2-7F22-408B-95E4-383D38160FB3",
-        "plat": "Iphone",
-        "product": "EFund",
-        "version": "6.2.8",
-    }
     try:
-        resp = requests.get(url, params=params, headers=MOBILE_HEADERS, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        if not data or not data.get("Datas"):
-            return result
-
-        for item in data["Datas"]:
-            code = item.get("FCODE")
-            nav_str = item.get("ACCNAV")
-            date_str = item.get("PDATE")
-            if not code or not nav_str or not date_str:
-                continue
-            try:
-                nav_date = date.fromisoformat(date_str)
-                nav = Decimal(str(nav_str))
-                result[code] = {"nav": nav, "nav_date": nav_date}
-            except (InvalidOperation, ValueError, TypeError):
-                continue
+        import akshare as ak
+
+        df = ak.fund_open_fund_daily_em()
     except Exception as e:
-        logger.warning(f"批量获取净值失败: {e}")
+        logger.warning(f"全市场净值表获取失败: {e}")
+        return {}
+
+    return _parse_market_nav_table(df)
+
+
+def _parse_market_nav_table(df):
+    """
+    解析全市场净值表为紧凑索引
+
+    表头形如 "基金代码", "2026-02-10-单位净值", "2026-02-10-累计净值",
+    "2026-02-09-单位净值", ..., "日增长率"，日期前缀每天变化。
+    只取表中最新一天的净值；该日尚未公布（空值）的基金视为缺失，
+    交由 FundMNFInfo 批量接口兜底，不用前一天的净值顶替。
+
+    "nav" 与 FundMNFInfo 批量接口保持一致（取累计净值），
+    单位净值 / 累计净值 / 日增长率另存用于写入历史。
+    """
+    if df is None or df.empty or "基金代码" not in df.columns:
+        return {}
+
+    days = sorted(
+        {col[: -len("-单位净值")] for col in df.columns if col.endswith("-单位净值")},
+        reverse=True,
+    )
+    parsed_days = []
+    for day in days:
+        try:
+            parsed_days.append((day, date.fromisoformat(day)))
+        except ValueError:
+            continue
+    if not parsed_days:
+        return {}
+    day, nav_date = parsed_days[0]
+
+    def to_decimal(value):
+        if value is None or value == "" or value != value:  # None / 空串 / NaN
+            return None
+        try:
+            return Decimal(str(value))
+        except (InvalidOperation, ValueError):
+            return None
+
+    has_growth = "日增长率" in df.columns
+    result = {}
+    for row in df.to_dict("records"):
+        code = row.get("基金代码")
+        if not code:
+            continue
+        unit_nav = to_decimal(row.get(f"{day}-单位净值"))
+        if unit_nav is None:
+            continue
+        accumulated_nav = to_decimal(row.get(f"{day}-累计净值"))
+        result[str(code)] = {
+            "nav": accumulated_nav or unit_nav,
+            "nav_date": nav_date,
+            "unit_nav": unit_nav,
+            "accumulated_nav": accumulated_nav,
+            "daily_growth": to_decimal(row.get("日增长率")) if has_growth else None,
+        }
 
     return result
 
 
+class _RateLimiter:
+    """简单的请求限速器：保证相邻两次请求的发起间隔不小于 1/rate 秒（线程安全）"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
 class Command(BaseCommand):
-    help = "更新基金净值（批量模式，200只/请求）"
+    help = "更新基金净值（批量模式，200只/请求；--backend market 使用全市场净值表）"
 
     def add_arguments(self, parser):
         parser.add_argument("--fund_code", type=str, help="指定基金代码（可选）")
@@ -82,70 +141,49 @@ class Command(BaseCommand):
             action="store_true",
             help="仅更新当日确认净值（nav_date == today）",
         )
+        parser.add_argument(
+            "--backend",
+            choices=BACKENDS,
+            default=None,
+            help="批量模式获取方式：batch（200只/请求）/ market（全市场净值表，"
+            "缺失部分回退 batch）；默认读取配置 update_nav_backend，未配置为 batch",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f"批量模式并发请求数（默认 {DEFAULT_WORKERS}）",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=DEFAULT_RATE,
+            help=f"批量模式每秒最多发起的请求数（默认 {DEFAULT_RATE}，0 表示不限速）",
+        )
 
     def handle(self, *args, **options):
         fund_code = options.get("fund_code")
         use_today = options.get("today", False)
         today = date.today()
 
-        if fund_code:
-            funds = list(Fund.objects.filter(fund_code=fund_code))
-            if not funds:
-                self.stdout.write(self.style.ERROR(f"基金 {fund_code} 不存在"))
-                return
-        else:
-            funds = list(Fund.objects.all())
-            count = len(funds)
-            mode = "当日净值" if use_today else "最新净值"
-            self.stdout.write(f"开始更新 {count} 个基金的{mode}（{BATCH_SIZE}只/批）...")
-
-        if not funds:
-            self.stdout.write(self.style.WARNING("没有基金"))
-            return
-
-        # --- 批量模式 ---
         if not fund_code:
-            codes = [f.fund_code for f in funds]
-            code_map = {f.fund_code: f for f in funds}
-
-            success_count = 0
-            skip_count = 0
-
-            for i in range(0, len(codes), BATCH_SIZE):
-                batch = codes[i : i + BATCH_SIZE]
-                nav_data = _fetch_batch_nav(batch)
-
-                for code, nav_info in nav_data.items():
-                    fund = code_map.get(code)
-                    if not fund:
-                        continue
-
-                    new_date = nav_info["nav_date"]
-
-                    if use_today and new_date != today:
-                        continue
-
-                    if fund.latest_nav_date and new_date < fund.latest_nav_date:
-                        skip_count += 1
-                        continue
-
-                    fund.latest_nav = nav_info["nav"]
-                    fund.latest_nav_date = new_date
-                    fund.save(update_fields=["latest_nav", "latest_nav_date", "updated_at"])
-                    success_count += 1
-
-                skip_count += len(batch) - len(nav_data)
-                self.stdout.write(
-                    f"  批次 {i // BATCH_SIZE + 1}: 获取 {len(nav_data)}/{len(batch)} 净值"
-                )
-
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"更新完成：成功 {success_count} 个，跳过/无数据 {skip_count} 个"
-                )
+            backend = options.get("backend") or config.get("update_nav_backend", "batch")
+            if backend not in BACKENDS:
+                backend = "batch"
+            self._update_batch(
+                use_today,
+                today,
+                workers=max(1, options.get("workers") or DEFAULT_WORKERS),
+                rate=options.get("rate", DEFAULT_RATE),
+                backend=backend,
             )
             return
 
+        funds = list(Fund.objects.filter(fund_code=fund_code))
+        if not funds:
+            self.stdout.write(self.style.ERROR(f"基金 {fund_code} 不存在"))
+            return
+
         # --- 单基金模式（保留多源 fallback） ---
         from api.sources import SourceRegistry
 
@@ -173,6 +211,8 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f"未获取到基金 {fund_code} 的净值"))
             return
 
+        record_confirmed_navs([(fund, data)])
+
         new_date = data["nav_date"]
         if fund.latest_nav_date and new_date < fund.latest_nav_date:
             self.stdout.write(f"日期未更新（{new_date} <= {fund.latest_nav_date}），跳过")
@@ -182,3 +222,115 @@ class Command(BaseCommand):
         fund.latest_nav_date = new_date
         fund.save(update_fields=["latest_nav", "latest_nav_date", "updated_at"])
         self.stdout.write(self.style.SUCCESS(f"{fund_code}: {data['nav']} ({data['nav_date']})"))
+
+    def _update_batch(self, use_today, today, workers, rate, backend="batch"):
+        """批量模式：获取（全市场表 / 限速并发分批）→ 内存比对 → bulk_update"""
+        started = time.monotonic()
+
+        # 阶段 1：加载基金（只取比对所需字段）
+        phase_at = time.monotonic()
+        funds = list(Fund.objects.only("id", "fund_code", "latest_nav", "latest_nav_date"))
+        if not funds:
+            self.stdout.write(self.style.WARNING("没有基金"))
+            return
+
+        mode = "当日净值" if use_today else "最新净值"
+        if backend == "market":
+            self.stdout.write(f"开始更新 {len(funds)} 个基金的{mode}（全市场净值表）...")
+        else:
+            self.stdout.write(f"开始更新 {len(funds)} 个基金的{mode}（{BATCH_SIZE}只/批）...")
+        self._report_phase("加载基金", phase_at)
+
+        codes = [f.fund_code for f in funds]
+        code_map = {f.fund_code: f for f in funds}
+        nav_map = {}
+
+        # 阶段 2a：全市场净值表
+        if backend == "market":
+            phase_at = time.monotonic()
+            market = _fetch_market_nav()
+            nav_map = {code: market[code] for code in codes if code in market}
+            if market:
+                self.stdout.write(
+                    f"  全市场净值表：{len(market)} 条，命中 {len(nav_map)}/{len(codes)}"
+                )
+            else:
+                self.stdout.write(self.style.WARNING("  全市场净值表获取失败，回退批量接口"))
+            self._report_phase("获取全市场净值", phase_at)
+
+        # 阶段 2b：限速并发分批获取（market 模式下只补缺失的基金）
+        remaining = [code for code in codes if code not in nav_map]
+        batches = [remaining[i : i + BATCH_SIZE] for i in range(0, len(remaining), BATCH_SIZE)]
+        if batches:
+            phase_at = time.monotonic()
+            limiter = _RateLimiter(rate)
+
+            def fetch(batch):
+                limiter.wait()
+                return fetch_batch_nav(batch)
+
+            with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+                # map 保持批次顺序，输出与串行一致
+                results = list(executor.map(fetch, batches))
+
+            for index, (batch, nav_data) in enumerate(zip(batches, results, strict=True), start=1):
+                self.stdout.write(f"  批次 {index}: 获取 {len(nav_data)}/{len(batch)} 净值")
+                nav_map.update(
+                    (code, info) for code, info in nav_data.items() if code not in nav_map
+                )
+            self._report_phase("获取净值", phase_at)
+
+        # 阶段 3：内存比对，收集变更
+        phase_at = time.monotonic()
+        now = timezone.now()
+        changed = []
+        confirmed = []
+        skip_count = sum(1 for code in codes if code not in nav_map)
+        for code, nav_info in nav_map.items():
+            fund = code_map.get(code)
+            if not fund:
+                continue
+
+            new_date = nav_info["nav_date"]
+
+            if use_today and new_date != today:
+                continue
+
+            # 确认净值都写入历史（包括比 latest_nav_date 旧的）
+            confirmed.append((fund, nav_info))
+
+            if fund.latest_nav_date and new_date < fund.latest_nav_date:
+                skip_count += 1
+                continue
+
+            fund.latest_nav = nav_info["nav"]
+            fund.latest_nav_date = new_date
+            # bulk_update 不会触发 auto_now，手动更新
+            fund.updated_at = now
+            changed.append(fund)
+        self._report_phase("比对变更", phase_at)
+
+        # 阶段 4：批量写入
+        phase_at = time.monotonic()
+        if changed:
+            with transaction.atomic():
+                Fund.objects.bulk_update(
+                    changed,
+                    ["latest_nav", "latest_nav_date", "updated_at"],
+                    batch_size=WRITE_BATCH_SIZE,
+                )
+                # bulk_update 不触发 post_save，显式刷新持有这些基金的账户汇总
+                mark_funds_dirty([fund.id for fund in changed])
+        history_count = record_confirmed_navs(confirmed)
+        self.stdout.write(f"  写入历史净值 {history_count} 条")
+        self._report_phase("写入数据库", phase_at)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"更新完成：成功 {len(changed)} 个，跳过/无数据 {skip_count} 个"
+                f"（总耗时 {time.monotonic() - started:.2f}s）"
+            )
+        )
+
+    def _report_phase(self, name, phase_at):
+        self.stdout.write(f"  [{name}] 耗时 {time.monotonic() - phase_at:.2f}s")
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.9 on 2026-10-19 09:26
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0016_position_source_market_value_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FundNavCoverage",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "first_nav_date",
+                    models.DateField(blank=True, help_text="最早净值日期", null=True),
+                ),
+                (
+                    "last_nav_date",
+                    models.DateField(blank=True, help_text="最新净值日期", null=True),
+                ),
+                (
+                    "gaps",
+                    models.JSONField(blank=True, default=list, help_text="待修复的缺失交易日区间"),
+                ),
+                (
+                    "upstream_gaps",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="数据源确认无数据的交易日区间（不再重试）",
+                    ),
+                ),
+                (
+                    "repair_attempts",
+                    models.IntegerField(default=0, help_text="连续无进展的缺口修复次数"),
+                ),
+                ("checked_at", models.DateTimeField(auto_now=True, help_text="最近一次校验时间")),
+                (
+                    "fund",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="nav_coverage",
+                        to="api.fund",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "基金净值覆盖水位",
+                "verbose_name_plural": "基金净值覆盖水位",
+                "db_table": "fund_nav_coverage",
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.9 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0017_fundnavcoverage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="position",
+            name="last_operation_date",
+            field=models.DateField(
+                blank=True, help_text="已计入汇总的最后一笔流水日期（增量计算水位）", null=True
+            ),
+        ),
+    ]
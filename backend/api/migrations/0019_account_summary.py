@@ -0,0 +1,44 @@
+# Generated by Django 6.0.9 on 2026-10-19 10:45
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0018_position_last_operation_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountSummary",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("holding_cost", models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+                ("holding_value", models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+                ("estimate_value", models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+                ("today_pnl", models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "account",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="summary",
+                        to="api.account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "账户汇总",
+                "verbose_name_plural": "账户汇总",
+                "db_table": "account_summary",
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.9 on 2026-10-19 10:57
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0019_account_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountValuationSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("snapshot_date", models.DateField(help_text="快照日期")),
+                (
+                    "value",
+                    models.DecimalField(decimal_places=4, help_text="当日市值", max_digits=20),
+                ),
+                (
+                    "cost",
+                    models.DecimalField(decimal_places=4, help_text="当日持仓成本", max_digits=20),
+                ),
+                (
+                    "breakdown",
+                    models.JSONField(
+                        blank=True, default=dict, help_text="各基金份额 / 成本 / 市值"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="valuation_snapshots",
+                        to="api.account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "账户估值快照",
+                "verbose_name_plural": "账户估值快照",
+                "db_table": "account_valuation_snapshot",
+                "ordering": ["snapshot_date"],
+                "unique_together": {("account", "snapshot_date")},
+            },
+        ),
+    ]
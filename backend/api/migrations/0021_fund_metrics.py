@@ -0,0 +1,84 @@
+# Generated by Django 6.0.9 on 2026-10-19 11:35
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0020_account_valuation_snapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FundMetrics",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("nav_date", models.DateField(help_text="计算基准的最新净值日期")),
+                (
+                    "return_1m",
+                    models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True),
+                ),
+                (
+                    "return_3m",
+                    models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True),
+                ),
+                (
+                    "return_6m",
+                    models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True),
+                ),
+                (
+                    "return_1y",
+                    models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True),
+                ),
+                (
+                    "max_drawdown",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=4,
+                        help_text="最大回撤（%，负数）",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "volatility",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=4,
+                        help_text="年化波动率（%）",
+                        max_digits=12,
+                        null=True,
+                    ),
+                ),
+                (
+                    "sharpe",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, help_text="夏普比率", max_digits=12, null=True
+                    ),
+                ),
+                ("stale", models.BooleanField(default=False, help_text="写入新历史净值后待重算")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "fund",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="metrics",
+                        to="api.fund",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "基金指标",
+                "verbose_name_plural": "基金指标",
+                "db_table": "fund_metrics",
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.9 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0021_fund_metrics"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fund",
+            index=models.Index(fields=["fund_type"], name="fund_fund_ty_fe6ec8_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fund",
+            index=models.Index(fields=["estimate_growth"], name="fund_estimat_e9b1da_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fundmetrics",
+            index=models.Index(fields=["return_1m", "fund"], name="fund_metric_return__c7ca83_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fundmetrics",
+            index=models.Index(fields=["return_3m", "fund"], name="fund_metric_return__62f351_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fundmetrics",
+            index=models.Index(fields=["return_6m", "fund"], name="fund_metric_return__8443ab_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fundmetrics",
+            index=models.Index(fields=["return_1y", "fund"], name="fund_metric_return__9c48e3_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fundmetrics",
+            index=models.Index(
+                fields=["max_drawdown", "fund"], name="fund_metric_max_dra_c241f7_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fundmetrics",
+            index=models.Index(
+                fields=["volatility", "fund"], name="fund_metric_volatil_5f9151_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fundmetrics",
+            index=models.Index(fields=["sharpe", "fund"], name="fund_metric_sharpe_5ff407_idx"),
+        ),
+    ]
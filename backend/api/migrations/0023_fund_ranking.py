@@ -0,0 +1,63 @@
+# Generated by Django 6.0.9 on 2026-10-19 11:53
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0022_fund_screener_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FundRanking",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "rank_type",
+                    models.CharField(
+                        choices=[("gain", "涨幅榜"), ("popular", "人气榜"), ("accuracy", "准度榜")],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "category",
+                    models.CharField(
+                        blank=True, default="", help_text="分类（空为全部）", max_length=20
+                    ),
+                ),
+                ("rank", models.PositiveIntegerField(help_text="名次（从 1 开始）")),
+                (
+                    "value",
+                    models.DecimalField(
+                        decimal_places=6,
+                        help_text="排序值（涨幅 / 持仓数 / 平均误差）",
+                        max_digits=20,
+                    ),
+                ),
+                ("built_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "fund",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rankings",
+                        to="api.fund",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "基金排行榜",
+                "verbose_name_plural": "基金排行榜",
+                "db_table": "fund_ranking",
+                "unique_together": {("rank_type", "category", "rank")},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 6.0.9 on 2026-10-19 12:10
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0023_fund_ranking"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EstimateAccuracyRollup",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("source_name", models.CharField(max_length=50)),
+                (
+                    "window_days",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (20, "近20个交易日"),
+                            (60, "近60个交易日"),
+                            (250, "近250个交易日"),
+                        ],
+                        help_text="窗口（最近 N 条已审计记录）",
+                    ),
+                ),
+                ("record_count", models.PositiveIntegerField(default=0)),
+                (
+                    "mean_error",
+                    models.DecimalField(decimal_places=8, help_text="平均误差率", max_digits=14),
+                ),
+                (
+                    "mean_abs_error",
+                    models.DecimalField(
+                        decimal_places=8, help_text="平均绝对误差率", max_digits=14
+                    ),
+                ),
+                (
+                    "rmse",
+                    models.DecimalField(decimal_places=8, help_text="误差率均方根", max_digits=14),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "fund",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="为空表示数据源整体",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="accuracy_rollups",
+                        to="api.fund",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "估值准确率汇总",
+                "verbose_name_plural": "估值准确率汇总",
+                "db_table": "estimate_accuracy_rollup",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("source_name", "fund", "window_days"),
+                        name="uniq_accuracy_rollup_fund",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("fund__isnull", True)),
+                        fields=("source_name", "window_days"),
+                        name="uniq_accuracy_rollup_source",
+                    ),
+                ],
+            },
+        ),
+    ]
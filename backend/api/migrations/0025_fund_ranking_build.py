@@ -0,0 +1,40 @@
+# Generated by Django 6.0.9 on 2026-10-19 12:43
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0024_estimate_accuracy_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FundRankingBuild",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "rank_type",
+                    models.CharField(
+                        choices=[("gain", "涨幅榜"), ("popular", "人气榜"), ("accuracy", "准度榜")],
+                        max_length=20,
+                        unique=True,
+                    ),
+                ),
+                ("row_count", models.PositiveIntegerField(default=0, help_text="快照行数")),
+                ("built_at", models.DateTimeField(blank=True, help_text="最近重建时间", null=True)),
+            ],
+            options={
+                "verbose_name": "排行榜构建记录",
+                "verbose_name_plural": "排行榜构建记录",
+                "db_table": "fund_ranking_build",
+            },
+        ),
+    ]
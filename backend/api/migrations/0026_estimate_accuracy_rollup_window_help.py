@@ -0,0 +1,20 @@
+# Generated by Django 6.0.9 on 2026-10-19 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0025_fund_ranking_build"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="estimateaccuracyrollup",
+            name="window_days",
+            field=models.PositiveSmallIntegerField(
+                choices=[(20, "近20个交易日"), (60, "近60个交易日"), (250, "近250个交易日")],
+                help_text="窗口（基金行：最近 N 条已审计记录；整体行：最近 N 个审计日期）",
+            ),
+        ),
+    ]
@@ -47,6 +47,10 @@ class Fund(models.Model):
         db_table = "fund"
         verbose_name = "基金"
         verbose_name_plural = "基金"
+        indexes = [
+            models.Index(fields=["fund_type"]),
+            models.Index(fields=["estimate_growth"]),
+        ]
 
     def __str__(self):
         return f"{self.fund_code} - {self.fund_name}"
@@ -117,120 +121,58 @@ class Account(models.Model):
         self.full_clean()
         super().save(*args, **kwargs)
 
-    # 汇总字段（@property）
+    # 汇总字段（@property，由 services.account_metrics 单次遍历计算）
+    @property
+    def metrics(self) -> dict:
+        """全部汇总指标（每次访问重新计算；批量场景请直接使用 compute_account_metrics）"""
+        from .services.account_metrics import compute_account_metrics
+
+        return compute_account_metrics([self])[self.id]
+
     @property
     def holding_cost(self):
         """持仓成本"""
-        from decimal import Decimal
-
-        if self.parent is None:
-            # 父账户：汇总所有子账户
-            return sum((child.holding_cost for child in self.children.all()), Decimal(0))
-        else:
-            # 子账户：汇总所有持仓
-            return sum((pos.holding_cost for pos in self.positions.all()), Decimal(0))
+        return self.metrics["holding_cost"]
 
     @property
     def holding_value(self):
         """持仓市值（latest_nav）"""
-        from decimal import Decimal
-
-        if self.parent is None:
-            # 父账户：汇总所有子账户
-            return sum((child.holding_value for child in self.children.all()), Decimal(0))
-        else:
-            # 子账户：汇总所有持仓
-            return sum((pos.holding_value for pos in self.positions.all()), Decimal(0))
+        return self.metrics["holding_value"]
 
     @property
     def pnl(self):
         """总盈亏"""
-
-        return self.holding_value - self.holding_cost
+        return self.metrics["pnl"]
 
     @property
     def pnl_rate(self):
         """收益率"""
-        from decimal import Decimal
-
-        if self.holding_cost == 0:
-            return None
-        return (self.pnl / self.holding_cost).quantize(Decimal("0.0001"))
+        return self.metrics["pnl_rate"]
 
     @property
     def estimate_value(self):
         """预估市值"""
-        from decimal import Decimal
-
-        if self.parent is None:
-            # 父账户：汇总所有子账户，跳过 None
-            values = [child.estimate_value for child in self.children.all()]
-            non_null = [v for v in values if v is not None]
-            if not non_null:
-                return Decimal(0)
-            return sum(non_null, Decimal(0))
-        else:
-            # 子账户：汇总所有持仓，跳过缺失估值的持仓
-            total = Decimal(0)
-            has_any = False
-            for pos in self.positions.all():
-                if pos.fund.estimate_nav is None:
-                    if pos.source_market_value is not None:
-                        total += pos.source_market_value
-                        has_any = True
-                    continue
-                total += pos.fund.estimate_nav * pos.holding_share
-                has_any = True
-            return total if has_any else (Decimal(0) if not self.positions.exists() else Decimal(0))
+        return self.metrics["estimate_value"]
 
     @property
     def estimate_pnl(self):
         """预估盈亏"""
-
-        if self.estimate_value is None:
-            return None
-        return self.estimate_value - self.holding_cost
+        return self.metrics["estimate_pnl"]
 
     @property
     def estimate_pnl_rate(self):
         """预估收益率"""
-        from decimal import Decimal
-
-        if self.estimate_pnl is None or self.holding_cost == 0:
-            return None
-        return (self.estimate_pnl / self.holding_cost).quantize(Decimal("0.0001"))
+        return self.metrics["estimate_pnl_rate"]
 
     @property
     def today_pnl(self):
         """今日盈亏"""
-        from decimal import Decimal
-
-        if self.parent is None:
-            # 父账户：汇总所有子账户，跳过 None
-            values = [child.today_pnl for child in self.children.all()]
-            non_null = [v for v in values if v is not None]
-            if not non_null:
-                return Decimal(0)
-            return sum(non_null, Decimal(0))
-        else:
-            # 子账户：汇总所有持仓，跳过缺失估值的持仓
-            total = Decimal(0)
-            has_any = False
-            for pos in self.positions.all():
-                if pos.fund.estimate_nav is None or pos.fund.latest_nav is None:
-                    continue  # 跳过缺失估值的持仓，不影响其他持仓的计算
-                total += pos.holding_share * (pos.fund.estimate_nav - pos.fund.latest_nav)
-                has_any = True
-            return total if has_any else (Decimal(0) if self.positions.exists() else Decimal(0))
+        return self.metrics["today_pnl"]
 
     @property
     def today_pnl_rate(self):
         """今日收益率"""
-        from decimal import Decimal
-
-        if self.today_pnl is None or self.holding_value == 0:
-            return None
-        return (self.today_pnl / self.holding_value).quantize(Decimal("0.0001"))
+        return self.metrics["today_pnl_rate"]
 
 
 class Position(models.Model):
@@ -251,6 +193,11 @@ class Position(models.Model):
         blank=True,
         help_text="数据源仅提供金额时的持仓市值快照",
     )
+    last_operation_date = models.DateField(
+        null=True,
+        blank=True,
+        help_text="已计入汇总的最后一笔流水日期（增量计算水位）",
+    )
 
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -298,6 +245,55 @@ class Position(models.Model):
         return self.holding_value - self.holding_cost
 
 
+class AccountSummary(models.Model):
+    """子账户汇总物化表（持仓重算、净值 / 估值更新时增量刷新；父账户读取时由子账户累加）"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, related_name="summary")
+
+    holding_cost = models.DecimalField(max_digits=24, decimal_places=4, default=0)
+    holding_value = models.DecimalField(max_digits=24, decimal_places=4, default=0)
+    estimate_value = models.DecimalField(max_digits=24, decimal_places=4, default=0)
+    today_pnl = models.DecimalField(max_digits=24, decimal_places=4, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "account_summary"
+        verbose_name = "账户汇总"
+        verbose_name_plural = "账户汇总"
+
+    def __str__(self):
+        return f"{self.account.name} - {self.holding_value}"
+
+
+class AccountValuationSnapshot(models.Model):
+    """账户每日估值快照（历史市值曲线按天预计算，流水 / 历史净值变更时失效）"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.ForeignKey(
+        Account, on_delete=models.CASCADE, related_name="valuation_snapshots"
+    )
+    snapshot_date = models.DateField(help_text="快照日期")
+
+    value = models.DecimalField(max_digits=20, decimal_places=4, help_text="当日市值")
+    cost = models.DecimalField(max_digits=20, decimal_places=4, help_text="当日持仓成本")
+    # 各基金明细：{fund_id: {"share": "...", "cost": "...", "value": "..."}}
+    breakdown = models.JSONField(default=dict, blank=True, help_text="各基金份额 / 成本 / 市值")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "account_valuation_snapshot"
+        verbose_name = "账户估值快照"
+        verbose_name_plural = "账户估值快照"
+        unique_together = [["account", "snapshot_date"]]
+        ordering = ["snapshot_date"]
+
+    def __str__(self):
+        return f"{self.account.name} - {self.snapshot_date}: {self.value}"
+
+
 class PositionOperation(models.Model):
     """持仓操作流水"""
 
@@ -352,11 +348,13 @@ class PositionOperation(models.Model):
         is_new = self._state.adding
         super().save(*args, **kwargs)
 
-        # 新建操作后自动重算持仓
+        # 新建操作后自动更新持仓（按日期追加时增量计算），并失效该日期起的估值快照
         if is_new:
-            from .services import recalculate_position
+            from .services import apply_new_operation
+            from .services.valuation_snapshot import invalidate_snapshots
 
-            recalculate_position(self.account.id, self.fund.id)
+            apply_new_operation(self)
+            invalidate_snapshots({self.account_id: self.operation_date})
 
 
 class Watchlist(models.Model):
@@ -429,13 +427,69 @@ class EstimateAccuracy(models.Model):
     def __str__(self):
         return f"{self.source_name} - {self.fund.fund_code} - {self.estimate_date}"
 
-    def calculate_error_rate(self):
-        """计算误差率"""
+    def calculate_error_rate(self, save=True):
+        """计算误差率（批量计算时传 save=False，由调用方统一 bulk_update）"""
         if self.actual_nav and self.actual_nav > 0:
             # 去掉 abs()，改用 (估值 - 实际) / 实际
             error = self.estimate_nav - self.actual_nav
             self.error_rate = error / self.actual_nav
-            self.save()
+            if save:
+                self.save()
+
+
+class EstimateAccuracyRollup(models.Model):
+    """估值准确率滚动汇总（数据源 × 基金 最近 20/60/250 条，数据源整体最近 20/60/250 个审计日期；审计写入误差率后增量更新）"""
+
+    WINDOW_CHOICES = [
+        (20, "近20个交易日"),
+        (60, "近60个交易日"),
+        (250, "近250个交易日"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    source_name = models.CharField(max_length=50)
+    fund = models.ForeignKey(
+        Fund,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="accuracy_rollups",
+        help_text="为空表示数据源整体",
+    )
+    window_days = models.PositiveSmallIntegerField(
+        choices=WINDOW_CHOICES,
+        help_text="窗口（基金行：最近 N 条已审计记录；整体行：最近 N 个审计日期）",
+    )
+
+    record_count = models.PositiveIntegerField(default=0)
+    mean_error = models.DecimalField(max_digits=14, decimal_places=8, help_text="平均误差率")
+    mean_abs_error = models.DecimalField(
+        max_digits=14, decimal_places=8, help_text="平均绝对误差率"
+    )
+    rmse = models.DecimalField(max_digits=14, decimal_places=8, help_text="误差率均方根")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "estimate_accuracy_rollup"
+        verbose_name = "估值准确率汇总"
+        verbose_name_plural = "估值准确率汇总"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source_name", "fund", "window_days"],
+                name="uniq_accuracy_rollup_fund",
+            ),
+            # 数据源整体行 fund 为空，唯一约束不覆盖 NULL，单独约束
+            models.UniqueConstraint(
+                fields=["source_name", "window_days"],
+                condition=models.Q(fund__isnull=True),
+                name="uniq_accuracy_rollup_source",
+            ),
+        ]
+
+    def __str__(self):
+        target = self.fund_id or "全部"
+        return f"{self.source_name} - {target} - {self.window_days}"
 
 
 class FundNavHistory(models.Model):
@@ -477,6 +531,126 @@ class FundNavHistory(models.Model):
         return f"{self.fund.fund_code} - {self.nav_date}"
 
 
+class FundMetrics(models.Model):
+    """基金收益风险指标（每晚净值更新后批量计算，写入新历史净值的基金标记过期后增量重算）"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fund = models.OneToOneField(Fund, on_delete=models.CASCADE, related_name="metrics")
+    nav_date = models.DateField(help_text="计算基准的最新净值日期")
+
+    # 区间收益（%）
+    return_1m = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    return_3m = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    return_6m = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    return_1y = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+
+    # 风险指标（窗口内净值不足 60 条时为空）
+    max_drawdown = models.DecimalField(
+        max_digits=12, decimal_places=4, null=True, blank=True, help_text="最大回撤（%，负数）"
+    )
+    volatility = models.DecimalField(
+        max_digits=12, decimal_places=4, null=True, blank=True, help_text="年化波动率（%）"
+    )
+    sharpe = models.DecimalField(
+        max_digits=12, decimal_places=4, null=True, blank=True, help_text="夏普比率"
+    )
+
+    stale = models.BooleanField(default=False, help_text="写入新历史净值后待重算")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "fund_metrics"
+        verbose_name = "基金指标"
+        verbose_name_plural = "基金指标"
+        # 筛选按 (指标, 基金) keyset 分页
+        indexes = [
+            models.Index(fields=["return_1m", "fund"]),
+            models.Index(fields=["return_3m", "fund"]),
+            models.Index(fields=["return_6m", "fund"]),
+            models.Index(fields=["return_1y", "fund"]),
+            models.Index(fields=["max_drawdown", "fund"]),
+            models.Index(fields=["volatility", "fund"]),
+            models.Index(fields=["sharpe", "fund"]),
+        ]
+
+    def __str__(self):
+        return f"{self.fund.fund_code} - {self.nav_date}"
+
+
+class FundRanking(models.Model):
+    """基金排行榜快照（按榜单类型 × 分类预排序，估值抓取与晚间任务后重建）"""
+
+    RANK_TYPE_CHOICES = [
+        ("gain", "涨幅榜"),
+        ("popular", "人气榜"),
+        ("accuracy", "准度榜"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    rank_type = models.CharField(max_length=20, choices=RANK_TYPE_CHOICES)
+    category = models.CharField(max_length=20, blank=True, default="", help_text="分类（空为全部）")
+    rank = models.PositiveIntegerField(help_text="名次（从 1 开始）")
+    fund = models.ForeignKey(Fund, on_delete=models.CASCADE, related_name="rankings")
+    value = models.DecimalField(
+        max_digits=20, decimal_places=6, help_text="排序值（涨幅 / 持仓数 / 平均误差）"
+    )
+    built_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "fund_ranking"
+        verbose_name = "基金排行榜"
+        verbose_name_plural = "基金排行榜"
+        unique_together = [["rank_type", "category", "rank"]]
+
+    def __str__(self):
+        return f"{self.rank_type}/{self.category or '全部'} #{self.rank} {self.fund_id}"
+
+
+class FundRankingBuild(models.Model):
+    """排行榜快照构建记录（每个榜单类型一行，空榜单也记录；重建时行锁串行化）"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    rank_type = models.CharField(max_length=20, choices=FundRanking.RANK_TYPE_CHOICES, unique=True)
+    row_count = models.PositiveIntegerField(default=0, help_text="快照行数")
+    built_at = models.DateTimeField(null=True, blank=True, help_text="最近重建时间")
+
+    class Meta:
+        db_table = "fund_ranking_build"
+        verbose_name = "排行榜构建记录"
+        verbose_name_plural = "排行榜构建记录"
+
+    def __str__(self):
+        return f"{self.rank_type} {self.built_at}"
+
+
+class FundNavCoverage(models.Model):
+    """基金历史净值覆盖水位（已同步区间 + 缺口，按交易日校验）"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fund = models.OneToOneField(Fund, on_delete=models.CASCADE, related_name="nav_coverage")
+
+    # 已入库净值的首尾日期（水位线）
+    first_nav_date = models.DateField(null=True, blank=True, help_text="最早净值日期")
+    last_nav_date = models.DateField(null=True, blank=True, help_text="最新净值日期")
+
+    # 缺口：[["2024-01-02", "2024-01-05"], ...]，闭区间，仅包含交易日
+    gaps = models.JSONField(default=list, blank=True, help_text="待修复的缺失交易日区间")
+    upstream_gaps = models.JSONField(
+        default=list, blank=True, help_text="数据源确认无数据的交易日区间（不再重试）"
+    )
+    repair_attempts = models.IntegerField(default=0, help_text="连续无进展的缺口修复次数")
+
+    checked_at = models.DateTimeField(auto_now=True, help_text="最近一次校验时间")
+
+    class Meta:
+        db_table = "fund_nav_coverage"
+        verbose_name = "基金净值覆盖水位"
+        verbose_name_plural = "基金净值覆盖水位"
+
+    def __str__(self):
+        return f"{self.fund.fund_code} - {self.first_nav_date} ~ {self.last_nav_date}"
+
+
 class UserSourceCredential(models.Model):
     """用户数据源凭证"""
 
@@ -708,13 +882,32 @@ class EstimateSnapshot(models.Model):
 
 
 # Signal handlers
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 
 @receiver(post_delete, sender=PositionOperation)
 def recalculate_position_on_delete(sender, instance, **kwargs):
-    """删除操作后自动重算持仓"""
+    """删除操作后自动重算持仓、失效估值快照（处于 deferred_recalculation 作用域内时只登记，统一处理）"""
     from .services import recalculate_position
+    from .services.recalc_queue import mark_dirty
+    from .services.valuation_snapshot import invalidate_snapshots
+
+    if not mark_dirty(instance.account_id, instance.fund_id, instance.operation_date):
+        recalculate_position(instance.account_id, instance.fund_id)
+        invalidate_snapshots({instance.account_id: instance.operation_date})
+
+
+# 影响持仓市值 / 估值的基金字段
+_SUMMARY_FUND_FIELDS = {"latest_nav", "estimate_nav"}
+
+
+@receiver(post_save, sender=Fund)
+def refresh_account_summaries_on_fund_save(sender, instance, created, update_fields, **kwargs):
+    """净值 / 估值变化后刷新持有该基金的账户汇总（处于 deferred_summary_refresh 作用域内时只登记）"""
+    if created or (update_fields is not None and not _SUMMARY_FUND_FIELDS & set(update_fields)):
+        return
+
+    from .services.account_summary import mark_funds_dirty
 
-    recalculate_position(instance.account.id, instance.fund.id)
+    mark_funds_dirty([instance.id])
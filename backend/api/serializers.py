@@ -46,6 +46,27 @@ class FundSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
+class AccountMetricField(serializers.DecimalField):
+    """账户汇总指标字段：从汇总表读取，不触发 Account 上的 @property"""
+
+    def get_attribute(self, instance):
+        return self.parent.get_metrics(instance)[self.field_name]
+
+
+class AccountListSerializer(serializers.ListSerializer):
+    """账户列表序列化器：序列化前一次性读取所有账户（含子账户）的汇总指标"""
+
+    def to_representation(self, data):
+        from .services.account_summary import load_account_metrics
+
+        accounts = list(data.all() if hasattr(data, "all") else data)
+        cache = self.context.setdefault("account_metrics", {})
+        pending = [account for account in accounts if account.id not in cache]
+        if pending:
+            cache.update(load_account_metrics(pending))
+        return super().to_representation(accounts)
+
+
 class AccountSerializer(serializers.ModelSerializer):
     """账户序列化器"""
 
@@ -53,26 +74,22 @@ class AccountSerializer(serializers.ModelSerializer):
         queryset=Account.objects.all(), required=False, allow_null=True
     )
 
-    # 汇总字段
-    holding_cost = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
-    holding_value = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
-    pnl = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
-    pnl_rate = serializers.DecimalField(
-        max_digits=10, decimal_places=4, read_only=True, allow_null=True
-    )
-    estimate_value = serializers.DecimalField(
+    # 汇总字段（同一请求内只计算一次，见 get_metrics）
+    holding_cost = AccountMetricField(max_digits=20, decimal_places=2, read_only=True)
+    holding_value = AccountMetricField(max_digits=20, decimal_places=2, read_only=True)
+    pnl = AccountMetricField(max_digits=20, decimal_places=2, read_only=True)
+    pnl_rate = AccountMetricField(max_digits=10, decimal_places=4, read_only=True, allow_null=True)
+    estimate_value = AccountMetricField(
         max_digits=20, decimal_places=2, read_only=True, allow_null=True
     )
-    estimate_pnl = serializers.DecimalField(
+    estimate_pnl = AccountMetricField(
         max_digits=20, decimal_places=2, read_only=True, allow_null=True
     )
-    estimate_pnl_rate = serializers.DecimalField(
+    estimate_pnl_rate = AccountMetricField(
         max_digits=10, decimal_places=4, read_only=True, allow_null=True
     )
-    today_pnl = serializers.DecimalField(
-        max_digits=20, decimal_places=2, read_only=True, allow_null=True
-    )
-    today_pnl_rate = serializers.DecimalField(
+    today_pnl = AccountMetricField(max_digits=20, decimal_places=2, read_only=True, allow_null=True)
+    today_pnl_rate = AccountMetricField(
         max_digits=10, decimal_places=4, read_only=True, allow_null=True
     )
 
@@ -100,6 +117,21 @@ class AccountSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
+        list_serializer_class = AccountListSerializer
+
+    def get_metrics(self, instance) -> dict:
+        """
+        获取账户汇总指标
+
+        读取账户汇总物化表，结果缓存在序列化上下文中（嵌套的子账户序列化器共享同一上下文），
+        父账户读取时会一并取出其全部子账户。
+        """
+        from .services.account_summary import load_account_metrics
+
+        cache = self.context.setdefault("account_metrics", {})
+        if instance.id not in cache:
+            cache.update(load_account_metrics([instance]))
+        return cache[instance.id]
 
     def get_children(self, obj):
         """获取子账户列表（仅父账户）"""
@@ -234,16 +266,23 @@ class PositionOperationSerializer(serializers.ModelSerializer):
 
         return data
 
-    def create(self, validated_data):
-        """创建操作并自动重算持仓"""
-        from .services import recalculate_position
 
-        operation = super().create(validated_data)
+class PositionOperationImportRowSerializer(serializers.Serializer):
+    """
+    批量导入操作流水的行序列化器
 
-        # 自动重算持仓
-        recalculate_position(operation.account.id, operation.fund.id)
+    只做字段格式校验；账户、基金的存在性由导入服务用预取的映射统一校验，
+    避免每行各查一次数据库。
+    """
 
-        return operation
+    account = serializers.UUIDField()
+    fund_code = serializers.CharField(max_length=10)
+    operation_type = serializers.ChoiceField(choices=PositionOperation.OPERATION_TYPE_CHOICES)
+    operation_date = serializers.DateField()
+    before_15 = serializers.BooleanField(default=True)
+    amount = serializers.DecimalField(max_digits=20, decimal_places=2)
+    share = serializers.DecimalField(max_digits=20, decimal_places=4)
+    nav = serializers.DecimalField(max_digits=10, decimal_places=4)
 
 
 class WatchlistItemSerializer(serializers.ModelSerializer):
@@ -340,6 +379,37 @@ class FundNavHistorySerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class FundNavHistoryRowSerializer(serializers.Serializer):
+    """
+    基金历史净值行序列化器（轻量）
+
+    用于批量查询：输入为 QuerySet.values() 的字典行，不实例化模型，
+    输出格式与 FundNavHistorySerializer 一致。
+    """
+
+    ROW_FIELDS = [
+        "id",
+        "fund__fund_code",
+        "fund__fund_name",
+        "nav_date",
+        "unit_nav",
+        "accumulated_nav",
+        "daily_growth",
+        "created_at",
+        "updated_at",
+    ]
+
+    id = serializers.UUIDField(read_only=True)
+    fund_code = serializers.CharField(source="fund__fund_code", read_only=True)
+    fund_name = serializers.CharField(source="fund__fund_name", read_only=True)
+    nav_date = serializers.DateField(read_only=True)
+    unit_nav = serializers.DecimalField(max_digits=10, decimal_places=4, read_only=True)
+    accumulated_nav = serializers.DecimalField(max_digits=10, decimal_places=4, read_only=True)
+    daily_growth = serializers.DecimalField(max_digits=10, decimal_places=4, read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
+
 class QueryNavSerializer(serializers.Serializer):
     """查询持仓操作净值序列化器"""
 
@@ -4,20 +4,78 @@
 核心逻辑：
 - Position 是汇总表，只读
 - 所有计算基于 PositionOperation 流水
-- 支持回溯重算
+- 追加流水增量计算，补录 / 删除流水时回溯重算
 """
 
+import logging
 from decimal import Decimal
-from typing import Optional
 
 from django.db import transaction
+from django.utils import timezone
 
 from ..models import Position, PositionOperation
+from .account_summary import deferred_summary_refresh, mark_accounts_dirty
+
+logger = logging.getLogger(__name__)
+
+
+def _new_state() -> dict:
+    """空持仓状态：份额 / 成本 / 来源市值"""
+    return {"share": Decimal(0), "cost": Decimal(0), "smv": None}
+
+
+def _apply_operation(state: dict, op) -> None:
+    """
+    将一笔流水计入持仓状态（全量回放与增量计算共用）
+
+    Args:
+        state: _new_state() 格式的持仓状态，原地修改
+        op: PositionOperation（或具有相同字段的对象）
+    """
+    if op.operation_type == "BUY":
+        # 买入：增加份额和成本
+        state["share"] += op.share
+        state["cost"] += op.amount
+        if op.source_market_value is not None:
+            state["smv"] = op.source_market_value
+        elif op.share > 0:
+            state["smv"] = None
+    elif op.operation_type == "SELL":
+        # 卖出：按比例减少成本
+        total_share = state["share"]
+        if total_share > 0:
+            # 防止超卖
+            sell_share = min(op.share, total_share)
+
+            cost_per_share = state["cost"] / total_share
+            state["share"] = total_share - sell_share
+            # 四舍五入到 2 位小数
+            state["cost"] = (state["cost"] - sell_share * cost_per_share).quantize(Decimal("0.01"))
+
+            # 超卖警告
+            if op.share > sell_share:
+                logger.warning(
+                    f"超卖警告: 账户 {op.account_id} 基金 {op.fund_id} "
+                    f"操作日期 {op.operation_date} 尝试卖出 {op.share} 份，"
+                    f"但只有 {sell_share} 份可卖"
+                )
+
+
+def _holding_nav(state: dict) -> Decimal:
+    """持仓净值（加权平均，四舍五入到 4 位小数）"""
+    if state["share"] > 0:
+        return (state["cost"] / state["share"]).quantize(Decimal("0.0001"))
+    return Decimal(0)
+
+
+def _has_holding(state: dict) -> bool:
+    """有份额或有来源市值才保留持仓记录"""
+    return state["share"] > 0 or state["smv"] is not None
 
 
 def recalculate_position(account_id, fund_id) -> Position | None:
     """
-    重新计算持仓汇总
+    重新计算持仓汇总（全量回放该账户该基金的所有流水）
 
     Args:
         account_id: 账户 ID
@@ -37,62 +95,26 @@ def recalculate_position(account_id, fund_id) -> Position | None:
         "operation_date", "created_at"
     )
 
-    total_share = Decimal(0)
-    total_cost = Decimal(0)
-    source_market_value = None
-
+    state = _new_state()
+    last_operation_date = None
     for op in operations:
-        if op.operation_type == "BUY":
-            # 买入：增加份额和成本
-            total_share += op.share
-            total_cost += op.amount
-            if op.source_market_value is not None:
-                source_market_value = op.source_market_value
-            elif op.share > 0:
-                source_market_value = None
-        elif op.operation_type == "SELL":
-            # 卖出：按比例减少成本
-            if total_share > 0:
-                # 防止超卖
-                sell_share = min(op.share, total_share)
-
-                cost_per_share = total_cost / total_share
-                total_share -= sell_share
-                total_cost -= sell_share * cost_per_share
-                # 四舍五入到 2 位小数
-                total_cost = total_cost.quantize(Decimal("0.01"))
-
-                # 超卖警告
-                if op.share > sell_share:
-                    import logging
-
-                    logger = logging.getLogger(__name__)
-                    logger.warning(
-                        f"超卖警告: 账户 {account_id} 基金 {fund_id} "
-                        f"操作日期 {op.operation_date} 尝试卖出 {op.share} 份，"
-                        f"但只有 {sell_share} 份可卖"
-                    )
-
-    # 计算持仓净值（加权平均）
-    if total_share > 0:
-        holding_nav = total_cost / total_share
-        # 四舍五入到 4 位小数
-        holding_nav = holding_nav.quantize(Decimal("0.0001"))
-    else:
-        holding_nav = Decimal(0)
+        _apply_operation(state, op)
+        last_operation_date = op.operation_date
 
     # 更新或创建 Position（使用对象而不是 ID）
-    with transaction.atomic():
-        if total_share > 0 or source_market_value is not None:
+    with transaction.atomic(), deferred_summary_refresh():
+        mark_accounts_dirty([account_id])
+        if _has_holding(state):
             # 有持仓：更新或创建
             position, created = Position.objects.update_or_create(
                 account=account,
                 fund=fund,
                 defaults={
-                    "holding_share": total_share,
-                    "holding_cost": total_cost,
-                    "holding_nav": holding_nav,
-                    "source_market_value": source_market_value,
+                    "holding_share": state["share"],
+                    "holding_cost": state["cost"],
+                    "holding_nav": _holding_nav(state),
+                    "source_market_value": state["smv"],
+                    "last_operation_date": last_operation_date,
                 },
             )
             return position
@@ -102,20 +124,75 @@ def recalculate_position(account_id, fund_id) -> Position | None:
             return None
 
 
-def recalculate_all_positions(account_id: str | None = None):
+def apply_new_operation(operation) -> Position | None:
     """
-    重算所有持仓
+    新增流水后更新持仓
+
+    持仓记录保存了回放到最后一笔流水时的份额 / 成本 / 来源市值。
+    新流水日期不早于已计入的最后一笔时，直接在该状态上增量计算（不读取历史流水）；
+    补录更早日期的流水、持仓不存在或缺少水位时，退回全量回放。
 
     Args:
-        account_id: 可选，只重算指定账户的持仓
+        operation: 刚创建的 PositionOperation
+
+    Returns:
+        Position: 更新后的持仓对象，清仓时返回 None
     """
-    if account_id:
-        operations = PositionOperation.objects.filter(account_id=account_id)
-    else:
-        operations = PositionOperation.objects.all()
+    # 锁定持仓行：同一 (账户, 基金) 并发追加流水时串行读取 - 计算 - 写回，避免增量丢失
+    with transaction.atomic():
+        position = (
+            Position.objects.select_for_update()
+            .filter(account_id=operation.account_id, fund_id=operation.fund_id)
+            .first()
+        )
+        if (
+            position is None
+            or position.last_operation_date is None
+            or operation.operation_date < position.last_operation_date
+        ):
+            return recalculate_position(operation.account_id, operation.fund_id)
+
+        state = {
+            "share": position.holding_share,
+            "cost": position.holding_cost,
+            "smv": position.source_market_value,
+        }
+        _apply_operation(state, operation)
+
+        if not _has_holding(state):
+            position.delete()
+            mark_accounts_dirty([operation.account_id])
+            return None
 
-    # 获取所有需要重算的 (account_id, fund_id) 组合
-    account_fund_pairs = operations.values_list("account_id", "fund_id").distinct()
+        fields = {
+            "holding_share": state["share"],
+            "holding_cost": state["cost"],
+            "holding_nav": _holding_nav(state),
+            "source_market_value": state["smv"],
+            "last_operation_date": operation.operation_date,
+            # queryset.update 不会触发 auto_now
+            "updated_at": timezone.now(),
+        }
+        Position.objects.filter(pk=position.pk).update(**fields)
+        mark_accounts_dirty([operation.account_id])
+    for name, value in fields.items():
+        setattr(position, name, value)
+    return position
+
+
+def recalculate_all_positions(account_id: str | None = None, workers: int = 1) -> dict:
+    """
+    重算所有持仓（批量引擎：一次查询流式回放，批量写回）
 
-    for account_id, fund_id in account_fund_pairs:
-        recalculate_position(account_id, fund_id)
+    Args:
+        account_id: 可选，只重算指定账户的持仓
+        workers: 进程数，>1 时按账户分片并行
+
+    Returns:
+        {'pairs': 处理的组合数, 'updated': upsert 数, 'deleted': 删除数}
+    """
+    from .position_bulk import bulk_recalculate_positions
+
+    return bulk_recalculate_positions(
+        account_ids=[account_id] if account_id else None, workers=workers
+    )
@@ -0,0 +1,156 @@
+"""
+账户汇总指标引擎
+
+一次遍历账户树下的持仓，同时算出所有汇总指标（成本、市值、盈亏、预估市值、今日盈亏及各收益率），
+父账户由子账户结果累加，避免 Account 上 @property 互相调用导致的重复遍历。
+已预加载（prefetch_related）的子账户 / 持仓直接复用，缺失的部分各用一次查询补齐。
+"""
+
+from decimal import Decimal
+
+from ..models import Account, Position
+
+METRIC_FIELDS = [
+    "holding_cost",
+    "holding_value",
+    "pnl",
+    "pnl_rate",
+    "estimate_value",
+    "estimate_pnl",
+    "estimate_pnl_rate",
+    "today_pnl",
+    "today_pnl_rate",
+]
+
+_RATE_QUANT = Decimal("0.0001")
+
+
+def compute_account_metrics(accounts) -> dict:
+    """
+    计算账户汇总指标
+
+    Args:
+        accounts: Account 可迭代对象（父账户 / 子账户均可）
+
+    Returns:
+        {account_id: {指标名: 值}}，包含传入账户及父账户下的全部子账户
+    """
+    accounts = list(accounts)
+    parents = [account for account in accounts if account.parent_id is None]
+    leaves = {account.id: account for account in accounts if account.parent_id is not None}
+
+    children_map = _load_children(parents)
+    for children in children_map.values():
+        for child in children:
+            leaves.setdefault(child.id, child)
+
+    positions_map = _load_positions(list(leaves.values()))
+
+    totals = {}
+    for account_id, positions in positions_map.items():
+        totals[account_id] = _sum_positions(positions)
+
+    for parent in parents:
+        total = _empty_totals()
+        for child in children_map[parent.id]:
+            for key, value in totals[child.id].items():
+                total[key] += value
+        totals[parent.id] = total
+
+    return {account_id: finalize_metrics(total) for account_id, total in totals.items()}
+
+
+def _load_children(parents: list) -> dict:
+    """父账户 → 子账户列表（复用预加载结果）"""
+    children_map = {}
+    missing = []
+    for parent in parents:
+        if _is_prefetched(parent, "children"):
+            children_map[parent.id] = list(parent.children.all())
+        else:
+            children_map[parent.id] = []
+            missing.append(parent.id)
+
+    if missing:
+        for child in Account.objects.filter(parent_id__in=missing):
+            children_map[child.parent_id].append(child)
+    return children_map
+
+
+def _load_positions(leaves: list) -> dict:
+    """子账户 → 持仓列表（复用预加载结果，持仓需带 fund）"""
+    positions_map = {}
+    missing = []
+    for account in leaves:
+        if _is_prefetched(account, "positions"):
+            positions_map[account.id] = list(account.positions.all())
+        else:
+            positions_map[account.id] = []
+            missing.append(account.id)
+
+    if missing:
+        for position in Position.objects.filter(account_id__in=missing).select_related("fund"):
+            positions_map[position.account_id].append(position)
+    return positions_map
+
+
+def _is_prefetched(instance, name: str) -> bool:
+    return name in getattr(instance, "_prefetched_objects_cache", {})
+
+
+def _empty_totals() -> dict:
+    return {
+        "holding_cost": Decimal(0),
+        "holding_value": Decimal(0),
+        "estimate_value": Decimal(0),
+        "today_pnl": Decimal(0),
+    }
+
+
+def _sum_positions(positions) -> dict:
+    """单次遍历持仓，累加成本 / 市值 / 预估市值 / 今日盈亏"""
+    total = _empty_totals()
+    for pos in positions:
+        fund = pos.fund
+        latest_nav = fund.latest_nav
+        estimate_nav = fund.estimate_nav
+
+        total["holding_cost"] += pos.holding_cost
+
+        # 市值：来源市值优先，其次最新净值 × 份额
+        if pos.source_market_value is not None:
+            total["holding_value"] += pos.source_market_value
+        elif latest_nav and pos.holding_share != 0:
+            total["holding_value"] += latest_nav * pos.holding_share
+
+        # 预估市值：缺失估值时回退来源市值，两者都没有则跳过
+        if estimate_nav is not None:
+            total["estimate_value"] += estimate_nav * pos.holding_share
+        elif pos.source_market_value is not None:
+            total["estimate_value"] += pos.source_market_value
+
+        # 今日盈亏：跳过缺失估值或净值的持仓
+        if estimate_nav is not None and latest_nav is not None:
+            total["today_pnl"] += pos.holding_share * (estimate_nav - latest_nav)
+    return total
+
+
+def finalize_metrics(total: dict) -> dict:
+    """由累加值推导盈亏与收益率"""
+    cost = total["holding_cost"]
+    value = total["holding_value"]
+    pnl = value - cost
+    estimate_pnl = total["estimate_value"] - cost
+    return {
+        "holding_cost": cost,
+        "holding_value": value,
+        "pnl": pnl,
+        "pnl_rate": None if cost == 0 else (pnl / cost).quantize(_RATE_QUANT),
+        "estimate_value": total["estimate_value"],
+        "estimate_pnl": estimate_pnl,
+        "estimate_pnl_rate": None if cost == 0 else (estimate_pnl / cost).quantize(_RATE_QUANT),
+        "today_pnl": total["today_pnl"],
+        "today_pnl_rate": (
+            None if value == 0 else (total["today_pnl"] / value).quantize(_RATE_QUANT)
+        ),
+    }
@@ -0,0 +1,153 @@
+"""
+账户汇总物化表（AccountSummary）
+
+汇总值只在以下情况变化：持仓重算、最新净值更新、估值刷新。
+这些写入路径登记受影响的账户 / 基金，刷新对应子账户的汇总行；
+账户列表等读取路径直接读取物化行，缺失的行现场计算并补写。
+
+只物化子账户（持仓所在的叶子），父账户在读取时由子账户行累加，
+子账户调整归属后父账户汇总不会残留旧值。
+
+批量写入时在 deferred_summary_refresh() 作用域内执行，作用域结束时统一刷新一次。
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from ..models import Account, AccountSummary, Position
+from .account_metrics import _load_children, compute_account_metrics, finalize_metrics
+
+logger = logging.getLogger(__name__)
+
+# 物化的累加字段（盈亏、收益率由 finalize_metrics 推导）
+SUMMARY_FIELDS = ["holding_cost", "holding_value", "estimate_value", "today_pnl"]
+
+_local = threading.local()
+
+
+@contextmanager
+def deferred_summary_refresh():
+    """
+    延迟刷新作用域
+
+    作用域内登记的账户 / 基金在退出时统一刷新；可嵌套，只有最外层退出时执行。
+    作用域内抛出异常时不刷新。
+    """
+    if getattr(_local, "pending", None) is not None:
+        yield
+        return
+
+    _local.pending = (set(), set())
+    try:
+        yield
+        account_ids, fund_ids = _local.pending
+        _local.pending = None
+        if fund_ids:
+            account_ids |= _accounts_holding(fund_ids)
+        refresh_account_summaries(account_ids)
+    finally:
+        _local.pending = None
+
+
+def mark_accounts_dirty(account_ids) -> None:
+    """登记汇总需要刷新的账户（不在作用域内时立即刷新）"""
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        refresh_account_summaries(account_ids)
+        return
+    pending[0].update(account_ids)
+
+
+def mark_funds_dirty(fund_ids) -> None:
+    """登记净值 / 估值发生变化的基金，刷新持有这些基金的账户（不在作用域内时立即刷新）"""
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        refresh_account_summaries(_accounts_holding(fund_ids))
+        return
+    pending[1].update(fund_ids)
+
+
+def refresh_account_summaries(account_ids) -> dict:
+    """
+    重新计算并写入子账户汇总行（父账户 ID 会被忽略）
+
+    Returns:
+        {account_id: 指标 dict}（同 compute_account_metrics）
+    """
+    account_ids = set(account_ids)
+    if not account_ids:
+        return {}
+    return _write_summaries(Account.objects.filter(id__in=account_ids, parent__isnull=False))
+
+
+def load_account_metrics(accounts) -> dict:
+    """
+    读取账户汇总指标（物化行优先）
+
+    Args:
+        accounts: Account 可迭代对象；父账户由其全部子账户的汇总行累加
+                  （已预加载的 children 直接复用）
+
+    Returns:
+        {account_id: 指标 dict}（同 compute_account_metrics），包含父账户下的全部子账户
+    """
+    accounts = list(accounts)
+    parents = [account for account in accounts if account.parent_id is None]
+    leaves = {account.id: account for account in accounts if account.parent_id is not None}
+
+    children_map = _load_children(parents)
+    for children in children_map.values():
+        for child in children:
+            leaves.setdefault(child.id, child)
+
+    totals = {
+        row.pop("account_id"): row
+        for row in AccountSummary.objects.filter(account_id__in=leaves).values(
+            "account_id", *SUMMARY_FIELDS
+        )
+    }
+    missing = [account for account_id, account in leaves.items() if account_id not in totals]
+    if missing:
+        totals.update(_write_summaries(missing))
+
+    result = {account_id: finalize_metrics(total) for account_id, total in totals.items()}
+    for parent in parents:
+        result[parent.id] = finalize_metrics(
+            {
+                field: sum(
+                    (totals[child.id][field] for child in children_map[parent.id]), Decimal(0)
+                )
+                for field in SUMMARY_FIELDS
+            }
+        )
+    return result
+
+
+def _write_summaries(leaves) -> dict:
+    """计算子账户指标并 upsert 汇总行"""
+    metrics = compute_account_metrics(leaves)
+    if not metrics:
+        return {}
+
+    AccountSummary.objects.bulk_create(
+        [
+            AccountSummary(account_id=account_id, **{f: values[f] for f in SUMMARY_FIELDS})
+            for account_id, values in metrics.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["account"],
+        update_fields=[*SUMMARY_FIELDS, "updated_at"],
+    )
+    logger.debug(f"刷新账户汇总 {len(metrics)} 个")
+    return metrics
+
+
+def _accounts_holding(fund_ids) -> set:
+    """持有这些基金的账户"""
+    return set(
+        Position.objects.filter(fund_id__in=fund_ids)
+        .values_list("account_id", flat=True)
+        .distinct()
+    )
@@ -0,0 +1,304 @@
+"""
+估值准确率滚动汇总
+
+按 数据源 × 基金 保存最近 20/60/250 条已审计记录（即最近 N 个交易日）的
+记录数、平均误差、平均绝对误差、误差均方根；数据源整体行统计该数据源最近 N 个审计日期
+（不同的 estimate_date）内的全部记录，停止审计的基金不会再计入。
+
+更新时机：
+- 准确率审计（calculate_accuracy）写入误差率后，只重算涉及的 (数据源, 基金) 及其数据源整体行
+- 某基金 / 数据源还没有汇总时，首次读取现场补建（数据源只补建整体行）
+
+准确率接口只按 (数据源, 基金, 窗口) 读取汇总行，不再逐条加载原始记录做聚合。
+"""
+
+import logging
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Count, F, FloatField
+from django.db.models.expressions import Window
+from django.db.models.functions import Abs, DenseRank, RowNumber
+
+from ..models import EstimateAccuracy, EstimateAccuracyRollup
+from ..sources import SourceRegistry
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = (20, 60, 250)
+DEFAULT_WINDOW = 60
+FUND_CHUNK_SIZE = 200
+
+STAT_FIELDS = ["record_count", "mean_error", "mean_abs_error", "rmse"]
+
+_VALUE_QUANT = Decimal("0.00000001")
+
+
+def resolve_window(params) -> int:
+    """
+    查询参数 → 窗口
+
+    优先 window；兼容旧的 days 参数（取不小于 days 的最小窗口，超过 250 按 250）
+    """
+    for key in ("window", "days"):
+        raw = params.get(key)
+        if raw in (None, ""):
+            continue
+        try:
+            value = int(raw)
+        except ValueError:
+            continue
+        return next((window for window in WINDOWS if window >= value), WINDOWS[-1])
+    return DEFAULT_WINDOW
+
+
+def update_accuracy_rollups(pairs) -> int:
+    """
+    增量更新汇总
+
+    Args:
+        pairs: [(source_name, fund_id)]，审计新写入误差率的组合
+
+    Returns:
+        重算的 (数据源, 基金) 组合数
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+
+    _refresh_fund_rollups(pairs)
+    _rebuild_source_rollups({source_name for source_name, _ in pairs})
+    logger.info(f"更新准确率汇总 {len(pairs)} 组")
+    return len(pairs)
+
+
+def rebuild_accuracy_rollups(source_name: str | None = None) -> int:
+    """
+    全量重建汇总（首次部署 / 数据修复）
+
+    Args:
+        source_name: 只重建指定数据源（默认全部）
+    """
+    queryset = EstimateAccuracy.objects.filter(error_rate__isnull=False)
+    stale = EstimateAccuracyRollup.objects.all()
+    if source_name:
+        queryset = queryset.filter(source_name=source_name)
+        stale = stale.filter(source_name=source_name)
+
+    pairs = set(queryset.order_by().values_list("source_name", "fund_id").distinct())
+    stale.delete()
+    return update_accuracy_rollups(pairs)
+
+
+def load_fund_accuracy(fund, window: int) -> dict:
+    """
+    读取基金各数据源的汇总
+
+    Returns:
+        {source_name: 汇总 dict}
+    """
+    rows = list(EstimateAccuracyRollup.objects.filter(fund=fund, window_days=window))
+    if not rows:
+        pairs = set(
+            EstimateAccuracy.objects.filter(fund=fund, error_rate__isnull=False)
+            .order_by()
+            .values_list("source_name", "fund_id")
+            .distinct()
+        )
+        if not pairs:
+            return {}
+        update_accuracy_rollups(pairs)
+        rows = list(EstimateAccuracyRollup.objects.filter(fund=fund, window_days=window))
+    return {row.source_name: format_rollup(row) for row in rows}
+
+
+def load_source_accuracy(source_name: str, window: int) -> dict:
+    """
+    读取数据源整体汇总（没有已审计记录时记录数为 0）
+
+    还没有整体行时只为已注册、且确有已审计记录的数据源补建整体行；
+    未知数据源名不会触发任何重建
+    """
+    queryset = EstimateAccuracyRollup.objects.filter(
+        source_name=source_name, fund__isnull=True, window_days=window
+    )
+    row = queryset.first()
+    if (
+        row is None
+        and source_name in SourceRegistry.list_sources()
+        and EstimateAccuracy.objects.filter(
+            source_name=source_name, error_rate__isnull=False
+        ).exists()
+    ):
+        _rebuild_source_rollups({source_name})
+        row = queryset.first()
+    if row is None:
+        return {"window": window, "avg_error_rate": 0, "record_count": 0}
+    return format_rollup(row)
+
+
+def recent_records(fund, sources, window: int) -> dict:
+    """
+    基金各数据源最近 window 条已审计记录（详情页明细表）
+
+    Returns:
+        {source_name: [{date, estimate_nav, actual_nav, error_rate}]}，按日期倒序
+    """
+    records = {}
+    for source_name, estimate_date, estimate_nav, actual_nav, error_rate in (
+        EstimateAccuracy.objects.filter(
+            fund=fund, source_name__in=sources, error_rate__isnull=False
+        )
+        .annotate(position=_recency_position())
+        .filter(position__lte=window)
+        .order_by("source_name", "-estimate_date")
+        .values_list("source_name", "estimate_date", "estimate_nav", "actual_nav", "error_rate")
+    ):
+        records.setdefault(source_name, []).append(
+            {
+                "date": estimate_date,
+                "estimate_nav": estimate_nav,
+                "actual_nav": actual_nav,
+                "error_rate": error_rate,
+            }
+        )
+    return records
+
+
+def format_rollup(row: EstimateAccuracyRollup) -> dict:
+    return {
+        "window": row.window_days,
+        # avg_error_rate / record_count 沿用旧接口字段名
+        "avg_error_rate": row.mean_error,
+        "record_count": row.record_count,
+        "mean_abs_error": row.mean_abs_error,
+        "rmse": row.rmse,
+    }
+
+
+def _recency_position():
+    """每个 (数据源, 基金) 内按日期倒序的序号（从 1 开始）"""
+    return Window(
+        RowNumber(),
+        partition_by=[F("source_name"), F("fund_id")],
+        order_by=F("estimate_date").desc(),
+    )
+
+
+def _date_position():
+    """每个数据源内按审计日期倒序的序号（同一天的记录序号相同）"""
+    return Window(
+        DenseRank(),
+        partition_by=[F("source_name")],
+        order_by=F("estimate_date").desc(),
+    )
+
+
+def _recent_errors(fund_ids, sources) -> dict:
+    """
+    一次查询加载最近 250 条误差率
+
+    Returns:
+        {(source_name, fund_id): [误差率 float]}，按日期倒序
+    """
+    errors = {}
+    for source_name, fund_id, error_rate in (
+        EstimateAccuracy.objects.filter(
+            fund_id__in=fund_ids, source_name__in=sources, error_rate__isnull=False
+        )
+        .annotate(position=_recency_position())
+        .filter(position__lte=WINDOWS[-1])
+        .order_by("source_name", "fund_id", "-estimate_date")
+        .values_list("source_name", "fund_id", "error_rate")
+    ):
+        errors.setdefault((source_name, fund_id), []).append(float(error_rate))
+    return errors
+
+
+def _window_stats(errors: np.ndarray) -> dict:
+    return {
+        "record_count": len(errors),
+        "mean_error": _to_decimal(errors.mean()),
+        "mean_abs_error": _to_decimal(np.abs(errors).mean()),
+        "rmse": _to_decimal(np.sqrt(np.square(errors).mean())),
+    }
+
+
+def _write_fund_rollups(pairs, errors: dict) -> None:
+    """upsert (数据源, 基金) 汇总行；已没有审计记录的组合删除旧行"""
+    rows = []
+    for (source_name, fund_id), values in errors.items():
+        if not values:
+            continue
+        values = np.array(values)
+        for window in WINDOWS:
+            rows.append(
+                EstimateAccuracyRollup(
+                    source_name=source_name,
+                    fund_id=fund_id,
+                    window_days=window,
+                    **_window_stats(values[:window]),
+                )
+            )
+
+    with transaction.atomic():
+        for source_name, fund_id in pairs:
+            if not errors.get((source_name, fund_id)):
+                EstimateAccuracyRollup.objects.filter(
+                    source_name=source_name, fund_id=fund_id
+                ).delete()
+        EstimateAccuracyRollup.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["source_name", "fund", "window_days"],
+            update_fields=[*STAT_FIELDS, "updated_at"],
+        )
+
+
+def _refresh_fund_rollups(pairs: set) -> None:
+    """按基金分批重算 (数据源, 基金) 汇总行"""
+    fund_ids = sorted({fund_id for _, fund_id in pairs}, key=str)
+    sources = {source_name for source_name, _ in pairs}
+
+    for offset in range(0, len(fund_ids), FUND_CHUNK_SIZE):
+        chunk = set(fund_ids[offset : offset + FUND_CHUNK_SIZE])
+        errors = _recent_errors(chunk, sources)
+        chunk_pairs = {pair for pair in pairs if pair[1] in chunk}
+        _write_fund_rollups(chunk_pairs, {pair: errors.get(pair, []) for pair in chunk_pairs})
+
+
+def _rebuild_source_rollups(sources) -> None:
+    """按数据源最近 N 个审计日期内的全部记录重算数据源整体行"""
+    rows = []
+    for source_name in sources:
+        queryset = EstimateAccuracy.objects.filter(
+            source_name=source_name, error_rate__isnull=False
+        ).annotate(date_position=_date_position())
+        for window in WINDOWS:
+            total = queryset.filter(date_position__lte=window).aggregate(
+                count=Count("id"),
+                mean_error=Avg("error_rate", output_field=FloatField()),
+                mean_abs_error=Avg(Abs("error_rate"), output_field=FloatField()),
+                mean_square=Avg(F("error_rate") * F("error_rate"), output_field=FloatField()),
+            )
+            if not total["count"]:
+                continue
+            rows.append(
+                EstimateAccuracyRollup(
+                    source_name=source_name,
+                    window_days=window,
+                    record_count=total["count"],
+                    mean_error=_to_decimal(total["mean_error"]),
+                    mean_abs_error=_to_decimal(total["mean_abs_error"]),
+                    rmse=_to_decimal(np.sqrt(total["mean_square"])),
+                )
+            )
+
+    with transaction.atomic():
+        EstimateAccuracyRollup.objects.filter(source_name__in=sources, fund__isnull=True).delete()
+        EstimateAccuracyRollup.objects.bulk_create(rows)
+
+
+def _to_decimal(value: float) -> Decimal:
+    return Decimal(repr(float(value))).quantize(_VALUE_QUANT)
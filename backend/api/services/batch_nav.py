@@ -0,0 +1,76 @@
+"""
+东方财富移动端批量净值接口（FundMNFInfo）
+
+一次请求最多获取 200 只基金的最新净值，供净值更新与准确率审计共用。
+"""
+
+import logging
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import requests
+
+from ..sources.eastmoney import EastMoneySource
+
+logger = logging.getLogger(__name__)
+
+BATCH_API_URL = "https://fundmobapi.eastmoney.com/FundMNewApi/FundMNFInfo"
+BATCH_SIZE = 200
+MOBILE_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 14_3 like Mac OS X) "
+        "AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148 "
+        "eastmoney/6.2.8"
+    ),
+}
+
+
+def fetch_batch_nav(fund_codes) -> dict:
+    """
+    批量获取基金净值。
+
+    返回: {fund_code: {'nav': Decimal, 'nav_date': date,
+                       'unit_nav', 'accumulated_nav', 'daily_growth'}}
+    """
+    result = {}
+    url = BATCH_API_URL
+    params = {
+        "Fcodes": ",".join(fund_codes),
+        "pageIndex": "1",
+        "pageSize": str(len(fund_codes) + 10),
+        "Sort": "",
+        "SortColumn": "",
+        "IsShowSE": "false",
+        "P": "F",
+        "deviceid": "3EA024C2-7F22-408B-95E4-383D38160FB3",
+        "plat": "Iphone",
+        "product": "EFund",
+        "version": "6.2.8",
+    }
+    try:
+        resp = requests.get(url, params=params, headers=MOBILE_HEADERS, timeout=30)
+        resp.raise_for_status()
+        data = resp.json()
+        if not data or not data.get("Datas"):
+            return result
+
+        for item in data["Datas"]:
+            code = item.get("FCODE")
+            nav_str = item.get("ACCNAV")
+            date_str = item.get("PDATE")
+            if not code or not nav_str or not date_str:
+                continue
+            try:
+                nav_date = date.fromisoformat(date_str)
+                nav = Decimal(str(nav_str))
+                result[code] = {
+                    "nav": nav,
+                    "nav_date": nav_date,
+                    **EastMoneySource.parse_mnfinfo_nav_fields(item),
+                }
+            except (InvalidOperation, ValueError, TypeError):
+                continue
+    except Exception as e:
+        logger.warning(f"批量获取净值失败: {e}")
+
+    return result
@@ -0,0 +1,240 @@
+"""
+基金收益风险指标
+
+区间收益（近 1 月 / 3 月 / 6 月 / 1 年）、最大回撤、年化波动率、夏普比率。
+所有基金的历史净值按指标窗口分块查询（values_list，不实例化模型），
+每只基金的净值序列转成 NumPy 数组整体计算。
+
+指标以基金最新净值日为基准，结果物化到 FundMetrics 表：
+- 写入历史净值时标记对应基金过期（见 nav_history）
+- 每晚净值更新后只重算过期 / 缺失的基金
+- 读取时遇到过期 / 缺失的行现场计算并补写
+"""
+
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Exists, OuterRef
+from fundval.config import config
+
+from ..models import Fund, FundMetrics, FundNavHistory
+
+logger = logging.getLogger(__name__)
+
+# 区间收益：名称 → 回看自然日数
+PERIODS = {"1m": 30, "3m": 90, "6m": 180, "1y": 365}
+
+# 风险指标默认窗口（自然日，近 3 年），最短不小于最长收益区间
+DEFAULT_WINDOW_DAYS = 1095
+
+# 区间起点向前多取的净值天数，覆盖长假休市，保证起点之前能取到净值
+NAV_LOOKBACK_DAYS = 15
+
+# 风险指标至少需要的净值条数
+MIN_METRIC_POINTS = 60
+
+TRADING_DAYS_PER_YEAR = 252
+RISK_FREE_RATE = 0.02
+
+# 每次查询加载净值的基金数
+FUND_CHUNK_SIZE = 200
+
+RETURN_FIELDS = {period: f"return_{period}" for period in PERIODS}
+RISK_FIELDS = ["max_drawdown", "volatility", "sharpe"]
+METRIC_FIELDS = [*RETURN_FIELDS.values(), *RISK_FIELDS]
+
+EMPTY_RETURNS = dict.fromkeys(PERIODS)
+EMPTY_METRICS = dict.fromkeys(RISK_FIELDS)
+
+_VALUE_QUANT = Decimal("0.0001")
+_DISPLAY_QUANT = Decimal("0.01")
+
+
+def get_window_days() -> int:
+    """风险指标窗口（配置 fund_metrics_window_days，不小于最长收益区间）"""
+    window_days = int(config.get("fund_metrics_window_days", DEFAULT_WINDOW_DAYS) or 0)
+    return max(window_days or DEFAULT_WINDOW_DAYS, max(PERIODS.values()))
+
+
+def compute_fund_metrics(fund_ids, today: date | None = None, window_days: int | None = None):
+    """
+    计算多只基金的区间收益与风险指标（不落表）
+
+    Args:
+        fund_ids: 基金 ID 列表
+        today: 净值截止日期（默认当天）
+        window_days: 风险指标窗口（自然日，默认读取配置）
+
+    Returns:
+        {fund_id: {'nav_date': 最新净值日, 'return_1m': Decimal | None, ...,
+                   'max_drawdown': Decimal | None, 'volatility': ..., 'sharpe': ...}}，
+        窗口内没有净值的基金不在结果中
+    """
+    today = today or date.today()
+    window_days = window_days or get_window_days()
+    start = today - timedelta(days=window_days + NAV_LOOKBACK_DAYS)
+
+    result = {}
+    for dates, navs, fund_id in _iter_nav_series(fund_ids, start, today):
+        nav_date = dates[-1]
+        window_start = nav_date - np.timedelta64(window_days, "D")
+        values = _period_returns(dates, navs)
+        values.update(_risk_metrics(navs[np.searchsorted(dates, window_start) :]))
+        result[fund_id] = {"nav_date": nav_date.astype(date), **values}
+    return result
+
+
+def refresh_fund_metrics(fund_ids=None, today: date | None = None) -> int:
+    """
+    重算并写入基金指标
+
+    Args:
+        fund_ids: 指定基金；不指定时只重算过期的行和有净值但还没有指标的基金
+
+    Returns:
+        写入的行数
+    """
+    if fund_ids is None:
+        fund_ids = (
+            Fund.objects.filter(Exists(FundNavHistory.objects.filter(fund=OuterRef("pk"))))
+            .exclude(metrics__stale=False)
+            .values_list("id", flat=True)
+        )
+    fund_ids = list(fund_ids)
+
+    written = 0
+    for offset in range(0, len(fund_ids), FUND_CHUNK_SIZE):
+        chunk = fund_ids[offset : offset + FUND_CHUNK_SIZE]
+        written += _write_metrics(chunk, compute_fund_metrics(chunk, today))
+    logger.info(f"刷新基金指标 {written} 只")
+    return written
+
+
+def mark_fund_metrics_stale(fund_ids) -> None:
+    """标记写入了新历史净值的基金指标过期"""
+    FundMetrics.objects.filter(fund_id__in=fund_ids, stale=False).update(stale=True)
+
+
+def load_fund_metrics(fund_ids) -> dict:
+    """
+    读取基金指标（物化行优先，过期 / 缺失的现场计算并补写）
+
+    Returns:
+        {fund_id: {'returns': {...}, 'metrics': {...}}}，数值为保留两位小数的字符串，
+        没有净值的基金不在结果中
+    """
+    fund_ids = list(fund_ids)
+    rows = {
+        row.pop("fund_id"): row
+        for row in FundMetrics.objects.filter(fund_id__in=fund_ids, stale=False).values(
+            "fund_id", *METRIC_FIELDS
+        )
+    }
+    missing = [fund_id for fund_id in fund_ids if fund_id not in rows]
+    if missing:
+        computed = compute_fund_metrics(missing)
+        _write_metrics(missing, computed)
+        rows.update(computed)
+
+    return {fund_id: format_metrics(row) for fund_id, row in rows.items()}
+
+
+def format_metrics(row: dict) -> dict:
+    """指标行 → 接口格式（保留两位小数的字符串）"""
+    return {
+        "returns": {period: _display(row[field]) for period, field in RETURN_FIELDS.items()},
+        "metrics": {field: _display(row[field]) for field in RISK_FIELDS},
+    }
+
+
+def _display(value) -> str | None:
+    return None if value is None else str(value.quantize(_DISPLAY_QUANT))
+
+
+def _write_metrics(fund_ids, computed: dict) -> int:
+    """upsert 指标行；窗口内已没有净值的基金删除旧行"""
+    FundMetrics.objects.filter(fund_id__in=set(fund_ids) - computed.keys()).delete()
+    if not computed:
+        return 0
+    FundMetrics.objects.bulk_create(
+        [
+            FundMetrics(fund_id=fund_id, stale=False, **values)
+            for fund_id, values in computed.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["fund"],
+        update_fields=["nav_date", *METRIC_FIELDS, "stale", "updated_at"],
+    )
+    return len(computed)
+
+
+def _iter_nav_series(fund_ids, start: date, end: date):
+    """
+    一次查询加载区间内的净值序列
+
+    Yields:
+        (日期数组 datetime64[D], 净值列表 Decimal, fund_id)，按日期升序
+    """
+    rows = {}
+    for fund_id, nav_date, unit_nav in (
+        FundNavHistory.objects.filter(fund_id__in=fund_ids, nav_date__gte=start, nav_date__lte=end)
+        .order_by("fund_id", "nav_date")
+        .values_list("fund_id", "nav_date", "unit_nav")
+    ):
+        dates, navs = rows.setdefault(fund_id, ([], []))
+        dates.append(nav_date)
+        navs.append(unit_nav)
+
+    for fund_id, (dates, navs) in rows.items():
+        yield np.array(dates, dtype="datetime64[D]"), navs, fund_id
+
+
+def _period_returns(dates, navs: list) -> dict:
+    """区间收益（%）：起点取区间起始日当天或之前最近的净值，终点取最新净值"""
+    cutoffs = dates[-1] - np.array(list(PERIODS.values()), dtype="timedelta64[D]")
+    start_indexes = np.searchsorted(dates, cutoffs, side="right") - 1
+    end_nav = navs[-1]
+
+    result = {}
+    for field, index in zip(RETURN_FIELDS.values(), start_indexes, strict=True):
+        start_nav = navs[index] if index >= 0 else None
+        if start_nav and start_nav > 0:
+            # 只有 4 个区间，收益用 Decimal 计算
+            result[field] = ((end_nav - start_nav) / start_nav * 100).quantize(_VALUE_QUANT)
+        else:
+            result[field] = None
+    return result
+
+
+def _risk_metrics(navs: list) -> dict:
+    """最大回撤（负百分比）、年化波动率（%）、夏普比率（无风险利率 2%）"""
+    if len(navs) < MIN_METRIC_POINTS:
+        return dict(EMPTY_METRICS)
+
+    values = np.array(navs, dtype=np.float64)
+
+    peaks = np.maximum.accumulate(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdowns = np.where(peaks > 0, (peaks - values) / peaks, 0.0)
+        daily_returns = np.diff(values) / values[:-1]
+    max_drawdown = float(drawdowns.max())
+
+    # 样本标准差，按 252 个交易日年化
+    annual_vol = float(daily_returns.std(ddof=1)) * TRADING_DAYS_PER_YEAR**0.5
+    annual_return = float(daily_returns.mean()) * TRADING_DAYS_PER_YEAR
+    sharpe = (annual_return - RISK_FREE_RATE) / annual_vol if annual_vol > 0 else None
+
+    return {
+        "max_drawdown": _to_decimal(-max_drawdown * 100),
+        "volatility": _to_decimal(annual_vol * 100),
+        "sharpe": None if sharpe is None else _to_decimal(sharpe),
+    }
+
+
+def _to_decimal(value: float) -> Decimal | None:
+    """浮点结果转 Decimal（净值为 0 等导致的非有限值记为 None）"""
+    if not np.isfinite(value):
+        return None
+    return Decimal(repr(value)).quantize(_VALUE_QUANT)
@@ -0,0 +1,150 @@
+"""
+基金排行榜快照
+
+排行榜按 榜单类型 × 分类 预先排好名次落表（FundRanking），翻页只按名次区间读取一页，
+不再在每次请求时对全表聚合 / 排序 / COUNT。
+
+重建时机：
+- 涨幅榜：盘中估值抓取（capture_intraday_snapshots）之后
+- 人气榜：每晚净值更新之后
+- 准度榜：每晚准确率审计之后
+- 某类型还没有构建记录（FundRankingBuild）时，首次读取现场重建；空榜单也记录构建时间，
+  不会每次请求重复重建
+- 重建时锁住该类型的构建记录，并发重建串行执行，不会写出重复名次
+
+预建分类之外的分类不在快照中，按原排序查询现场分页（不截断到全部榜单的前 N 名）。
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max
+from django.db.models.functions import Abs
+from django.utils import timezone
+from fundval.config import config
+
+from ..models import Fund, FundRanking, FundRankingBuild
+
+logger = logging.getLogger(__name__)
+
+RANK_TYPES = ["gain", "popular", "accuracy"]
+
+# 预建快照的分类（与前端分类筛选一致，按 fund_type 包含匹配）；其他分类现场查询
+RANKING_CATEGORIES = ["股票", "混合", "债券", "指数", "QDII", "黄金", "半导体"]
+
+# 每个榜单保留的名次数
+DEFAULT_RANKING_DEPTH = 1000
+
+WRITE_BATCH_SIZE = 1000
+
+
+def _ranked_funds(rank_type: str):
+    """榜单排序查询（Fund 带 value 排序值；重建快照与非预建分类的现场查询共用）"""
+    if rank_type == "popular":
+        queryset = (
+            Fund.objects.annotate(value=Count("positions"))
+            .filter(value__gt=0)
+            .order_by("-value", "fund_code")
+        )
+    elif rank_type == "accuracy":
+        queryset = (
+            Fund.objects.annotate(value=Avg(Abs("accuracy_records__error_rate")))
+            .filter(value__isnull=False)
+            .order_by("value", "fund_code")
+        )
+    else:
+        queryset = (
+            Fund.objects.exclude(estimate_growth__isnull=True)
+            .annotate(value=F("estimate_growth"))
+            .order_by("-value", "fund_code")
+        )
+    return queryset
+
+
+def rebuild_rankings(rank_types=None, only_missing: bool = False) -> int:
+    """
+    重建排行榜快照
+
+    Args:
+        rank_types: 榜单类型列表（默认全部）
+        only_missing: 只重建还没有构建记录的类型（首次读取时使用，
+            等锁期间已被并发请求重建的类型直接跳过）
+
+    Returns:
+        写入的行数
+    """
+    depth = int(config.get("fund_ranking_depth", DEFAULT_RANKING_DEPTH) or DEFAULT_RANKING_DEPTH)
+
+    written = 0
+    for rank_type in rank_types or RANK_TYPES:
+        with transaction.atomic():
+            # get_or_create 内部用保存点处理并发创建的唯一冲突，之后再锁行
+            FundRankingBuild.objects.get_or_create(rank_type=rank_type)
+            build = FundRankingBuild.objects.select_for_update().get(rank_type=rank_type)
+            if only_missing and build.built_at:
+                continue
+
+            ranked = list(_ranked_funds(rank_type).values_list("id", "fund_type", "value"))
+            rows = _ranking_rows(rank_type, "", ranked[:depth])
+            for category in RANKING_CATEGORIES:
+                keyword = category.lower()
+                matched = [item for item in ranked if keyword in (item[1] or "").lower()]
+                rows.extend(_ranking_rows(rank_type, category, matched[:depth]))
+
+            FundRanking.objects.filter(rank_type=rank_type).delete()
+            FundRanking.objects.bulk_create(rows, batch_size=WRITE_BATCH_SIZE)
+            build.row_count = len(rows)
+            build.built_at = timezone.now()
+            build.save(update_fields=["row_count", "built_at"])
+        written += len(rows)
+        logger.info(f"重建 {rank_type} 排行榜快照 {len(rows)} 行")
+    return written
+
+
+def _ranking_rows(rank_type: str, category: str, ranked: list) -> list:
+    return [
+        FundRanking(rank_type=rank_type, category=category, rank=rank, fund_id=fund_id, value=value)
+        for rank, (fund_id, _fund_type, value) in enumerate(ranked, start=1)
+    ]
+
+
+def load_ranking(rank_type: str, category: str, page: int, page_size: int) -> tuple:
+    """
+    读取排行榜一页
+
+    Returns:
+        (总条数, [FundRanking（已带 fund）])
+    """
+    if rank_type not in RANK_TYPES:
+        rank_type = "gain"
+
+    if not FundRankingBuild.objects.filter(rank_type=rank_type, built_at__isnull=False).exists():
+        rebuild_rankings([rank_type], only_missing=True)
+
+    if not category or category in RANKING_CATEGORIES:
+        # 预建分类：总数即最大名次，按名次区间取一页
+        queryset = FundRanking.objects.select_related("fund").filter(
+            rank_type=rank_type, category=category
+        )
+        count = queryset.aggregate(count=Max("rank"))["count"] or 0
+        start = (_clamp_page(page, count, page_size) - 1) * page_size
+        rows = queryset.filter(rank__gt=start, rank__lte=start + page_size).order_by("rank")
+    else:
+        # 非预建分类：现场查询一页，组装成未落表的 FundRanking
+        queryset = _ranked_funds(rank_type).filter(fund_type__icontains=category)
+        count = queryset.count()
+        start = (_clamp_page(page, count, page_size) - 1) * page_size
+        rows = [
+            FundRanking(
+                rank_type=rank_type, category=category, rank=rank, fund=fund, value=fund.value
+            )
+            for rank, fund in enumerate(queryset[start : start + page_size], start=start + 1)
+        ]
+
+    return count, list(rows)
+
+
+def _clamp_page(page: int, count: int, page_size: int) -> int:
+    """页码越界时取最后一页（同 Paginator.get_page）"""
+    last_page = max((count + page_size - 1) // page_size, 1)
+    return min(max(page, 1), last_page)
@@ -0,0 +1,160 @@
+"""
+基金筛选
+
+在预计算的基金指标（FundMetrics）上按区间条件筛选，指标列与基金类型 / 估值涨幅均有索引。
+分页使用 keyset（排序值 + 基金 ID 作为游标），翻页不做 COUNT、不跳过 OFFSET 行，
+任意页的开销与第一页相同。
+"""
+
+import base64
+import binascii
+import json
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from ..models import FundMetrics
+from .fund_metrics import METRIC_FIELDS, format_metrics
+
+# 可筛选 / 排序的字段 → 查询路径
+SCREEN_FIELDS = {
+    **{field: field for field in METRIC_FIELDS},
+    "estimate_growth": "fund__estimate_growth",
+}
+
+DEFAULT_ORDERING = "-return_1y"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ScreenerError(ValueError):
+    """筛选参数错误"""
+
+
+def screen_funds(params, cursor: str | None = None) -> dict:
+    """
+    筛选基金
+
+    Args:
+        params: 查询参数（QueryDict / dict）：
+                - {字段}_min / {字段}_max：区间条件（闭区间）
+                - fund_type：基金类型前缀（如 股票型、混合型）
+                - ordering：排序字段，前缀 - 表示降序（默认 -return_1y）
+                - page_size：每页条数（默认 20，最多 100）
+        cursor: 上一页返回的 next 游标
+
+    Returns:
+        {'results': [...], 'next': 下一页游标或 None}
+
+    Raises:
+        ScreenerError: 参数不合法
+    """
+    ordering = params.get("ordering") or DEFAULT_ORDERING
+    descending = ordering.startswith("-")
+    order_field = ordering.lstrip("-")
+    if order_field not in SCREEN_FIELDS:
+        raise ScreenerError(f"不支持的排序字段: {order_field}")
+    order_path = SCREEN_FIELDS[order_field]
+
+    page_size = _parse_page_size(params.get("page_size"))
+
+    # 排序字段为空的基金不参与排序
+    queryset = FundMetrics.objects.filter(
+        _range_filters(params), **{f"{order_path}__isnull": False}
+    )
+    fund_type = params.get("fund_type")
+    if fund_type:
+        queryset = queryset.filter(fund__fund_type__startswith=fund_type)
+
+    # 排序值与基金 ID 同向，(指标, 基金) 复合索引正反向扫描都能直接命中；
+    # 游标条件写成 f <= v AND (f < v OR id < last)，前半段是可走索引的范围条件
+    if cursor:
+        value, fund_id = _decode_cursor(cursor, ordering)
+        if descending:
+            queryset = queryset.filter(
+                Q(**{f"{order_path}__lt": value}) | Q(fund_id__lt=fund_id),
+                **{f"{order_path}__lte": value},
+            )
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{order_path}__gt": value}) | Q(fund_id__gt=fund_id),
+                **{f"{order_path}__gte": value},
+            )
+    prefix = "-" if descending else ""
+    queryset = queryset.order_by(f"{prefix}{order_path}", f"{prefix}fund_id")
+
+    rows = list(
+        queryset.values(
+            "fund_id",
+            "fund__fund_code",
+            "fund__fund_name",
+            "fund__fund_type",
+            "fund__latest_nav",
+            "fund__estimate_growth",
+            *METRIC_FIELDS,
+        )[: page_size + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = _encode_cursor(ordering, last[order_path], last["fund_id"])
+
+    return {"results": [_serialize(row) for row in rows], "next": next_cursor}
+
+
+def _range_filters(params) -> Q:
+    condition = Q()
+    for field, path in SCREEN_FIELDS.items():
+        for suffix, lookup in (("min", "gte"), ("max", "lte")):
+            raw = params.get(f"{field}_{suffix}")
+            if raw in (None, ""):
+                continue
+            try:
+                value = Decimal(raw)
+            except InvalidOperation:
+                raise ScreenerError(f"{field}_{suffix} 必须是数字") from None
+            condition &= Q(**{f"{path}__{lookup}": value})
+    return condition
+
+
+def _parse_page_size(raw) -> int:
+    if raw in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(raw)
+    except ValueError:
+        raise ScreenerError("page_size 必须是整数") from None
+    return min(max(page_size, 1), MAX_PAGE_SIZE)
+
+
+def _encode_cursor(ordering: str, value, fund_id) -> str:
+    payload = json.dumps([ordering, str(value), str(fund_id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str, ordering: str) -> tuple:
+    """游标 → (排序值, 基金 ID)；游标与当前排序不匹配时报错"""
+    try:
+        cursor_ordering, value, fund_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, fund_id = Decimal(value), uuid.UUID(fund_id)
+    except (binascii.Error, ValueError, TypeError, AttributeError, InvalidOperation):
+        raise ScreenerError("无效的游标") from None
+    if cursor_ordering != ordering:
+        raise ScreenerError("游标与排序字段不匹配")
+    return value, fund_id
+
+
+def _serialize(row: dict) -> dict:
+    estimate_growth = row["fund__estimate_growth"]
+    latest_nav = row["fund__latest_nav"]
+    return {
+        "fund_code": row["fund__fund_code"],
+        "fund_name": row["fund__fund_name"],
+        "fund_type": row["fund__fund_type"],
+        "latest_nav": str(latest_nav) if latest_nav else None,
+        "estimate_growth": str(estimate_growth) if estimate_growth is not None else None,
+        **format_metrics(row),
+    }
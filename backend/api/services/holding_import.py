@@ -0,0 +1,145 @@
+"""
+第三方持仓导入的公共写入逻辑（养基宝 / 小倍养基）
+
+远端数据在事务外全部获取完毕后，再在一个事务内批量写入：
+- 基金：一次 in 查询 + bulk_create 补齐缺失的基金
+- 幂等检查：一次查询取出已存在的 (账户, 基金, 日期) 建仓流水
+- 流水：bulk_create 批量写入
+- 持仓：所有受影响的组合（含 overwrite 清空的）在写入结束时各重算一次
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import ROUND_DOWN, Decimal
+
+from ..models import Fund, PositionOperation
+from .recalc_queue import deferred_recalculation, mark_dirty
+
+# 并发获取远端持仓的线程数
+FETCH_WORKERS = 4
+# bulk_create 每批行数
+INSERT_BATCH_SIZE = 1000
+
+
+def fetch_concurrently(func, args: list) -> list:
+    """并发调用 func(arg)，按 args 顺序返回结果；任一调用异常时直接抛出"""
+    if not args:
+        return []
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(args))) as executor:
+        return list(executor.map(func, args))
+
+
+def write_holdings(groups: list, overwrite: bool) -> tuple[int, int]:
+    """
+    批量写入持仓流水
+
+    在 deferred_recalculation() 作用域内执行（调用方已开启时并入调用方的作用域）：
+    受影响的组合在作用域结束时统一重算，并失效写入日期起的估值快照。
+
+    Args:
+        groups: [(子账户, 持仓列表), ...]，持仓字段同 source.fetch_holdings 的返回
+        overwrite: True = 先清空子账户已有流水；False = 跳过同账户+基金+日期已存在的建仓记录
+
+    Returns:
+        (写入条数, 跳过条数)
+    """
+    with deferred_recalculation():
+        skipped = 0
+        entries = []
+        for account, holdings in groups:
+            for holding in holdings:
+                fund_code = holding.get("fund_code", "").strip()
+                if not fund_code:
+                    skipped += 1
+                    continue
+                entries.append((account, fund_code, holding))
+
+        accounts = [account for account, _ in groups]
+        if overwrite:
+            PositionOperation.objects.filter(account__in=accounts).delete()
+
+        fund_map = _resolve_funds(entries)
+
+        existing = set()
+        if not overwrite and entries:
+            existing = set(
+                PositionOperation.objects.filter(
+                    account__in=accounts,
+                    fund__in=list(fund_map.values()),
+                    operation_type="BUY",
+                ).values_list("account_id", "fund_id", "operation_date")
+            )
+
+        operations = []
+        for account, fund_code, holding in entries:
+            fund = fund_map[fund_code]
+            op_date = holding["operation_date"]
+            # 幂等（非 overwrite 模式）：同账户+基金+日期已存在则跳过（含本批次内重复）
+            key = (account.id, fund.id, op_date)
+            if not overwrite:
+                if key in existing:
+                    skipped += 1
+                    continue
+                existing.add(key)
+
+            operations.append(_build_operation(account, fund, holding))
+
+        PositionOperation.objects.bulk_create(operations, batch_size=INSERT_BATCH_SIZE)
+        for op in operations:
+            mark_dirty(op.account_id, op.fund_id, op.operation_date)
+
+    return len(operations), skipped
+
+
+def _resolve_funds(entries: list) -> dict:
+    """一次查询取出已有基金，缺失的批量创建，返回 fund_code → Fund"""
+    names = {}
+    for _, fund_code, holding in entries:
+        names.setdefault(fund_code, holding.get("fund_name", fund_code))
+    if not names:
+        return {}
+
+    fund_map = {fund.fund_code: fund for fund in Fund.objects.filter(fund_code__in=names)}
+    missing = [code for code in names if code not in fund_map]
+    if missing:
+        Fund.objects.bulk_create(
+            [Fund(fund_code=code, fund_name=names[code]) for code in missing],
+            ignore_conflicts=True,
+        )
+        # ignore_conflicts 不回填主键，重新查询
+        fund_map.update(
+            {fund.fund_code: fund for fund in Fund.objects.filter(fund_code__in=missing)}
+        )
+    return fund_map
+
+
+def _build_operation(account, fund, holding: dict) -> PositionOperation:
+    """构造建仓流水（nav/share/amount 截断到合法精度）"""
+    nav = Decimal(str(holding["nav"])).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
+    share = Decimal(str(holding["share"])).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
+    source_market_value = None
+    if share > 0 and nav > 0:
+        amount = (share * nav).quantize(Decimal("0.01"), rounding=ROUND_DOWN)
+    else:
+        imported_market_value = Decimal(str(holding["amount"])).quantize(
+            Decimal("0.01"), rounding=ROUND_DOWN
+        )
+        if imported_market_value > 0:
+            source_market_value = imported_market_value
+            earnings = Decimal(str(holding.get("earnings", 0)))
+            amount = max(source_market_value - earnings, Decimal(0)).quantize(
+                Decimal("0.01"), rounding=ROUND_DOWN
+            )
+        else:
+            amount = Decimal(0)
+
+    return PositionOperation(
+        account=account,
+        fund=fund,
+        operation_type="BUY",
+        operation_date=holding["operation_date"],
+        before_15=True,
+        share=share,
+        nav=nav,
+        amount=amount,
+        source_market_value=source_market_value,
+    )
@@ -2,20 +2,19 @@
 小倍养基持仓导入服务
 
 逻辑：
-1. 获取账户列表，建立 accountId → 账户名映射
+1. 事务外获取账户列表与持仓（共用一个带登录态的数据源实例，依次调用），
+   建立 accountId → 账户名映射
 2. 确保父账户（小倍养基）存在
 3. 按 accountId 分组，每个账户创建对应子账户
    - accountId=None 或 0 → 子账户名「默认账户」
-4. 创建 Fund + PositionOperation
+4. 批量创建 Fund + PositionOperation，受影响的持仓各重算一次
    - overwrite=False：同账户+基金+日期已存在则跳过
    - overwrite=True：清空该账户所有持仓流水后重新导入
 """
 
-from decimal import ROUND_DOWN, Decimal
-
-from django.db import transaction
-
-from ..models import Account, Fund, PositionOperation
+from ..models import Account
+from .holding_import import write_holdings
+from .recalc_queue import deferred_recalculation
 
 PARENT_ACCOUNT_NAME = "小倍养基"
 DEFAULT_SUB_ACCOUNT_NAME = "默认账户"
@@ -29,8 +28,13 @@ def import_from_xiaobeiyangji(user, source, overwrite: bool = False) -> dict:
         "holdings_skipped": 0,
     }
 
-    with transaction.atomic():
-        # 1. 父账户
+    # 1. 获取远端数据（事务外）
+    raw_accounts = source.fetch_accounts()
+    holdings = source.fetch_holdings()
+
+    # 写入阶段在一个事务内完成
+    with deferred_recalculation():
+        # 2. 父账户
         parent_account, parent_created = Account.objects.get_or_create(
             user=user,
             name=PARENT_ACCOUNT_NAME,
@@ -41,28 +45,26 @@ def import_from_xiaobeiyangji(user, source, overwrite: bool = False) -> dict:
         else:
             result["accounts_skipped"] += 1
 
-        # 2. 账户列表：建立 accountId → 名称映射
-        raw_accounts = source.fetch_accounts()
+        if not holdings:
+            return result
+
+        # 3. 账户列表：建立 accountId → 名称映射
         account_id_to_name = {
             str(a["accountId"]): a["name"]
             for a in raw_accounts
             if a.get("accountId") not in (None, 0, "0")
         }
 
-        # 3. 获取持仓
-        holdings = source.fetch_holdings()
-        if not holdings:
-            return result
-
         # 4. 按 account_id 分组
-        groups: dict = {}
+        grouped: dict = {}
         for h in holdings:
             aid = h.get("account_id")
             key = str(aid) if aid not in (None, 0, "0") else None
-            groups.setdefault(key, []).append(h)
+            grouped.setdefault(key, []).append(h)
 
-        # 5. 逐组导入
-        for aid_key, group_holdings in groups.items():
+        # 5. 每组对应一个子账户
+        groups = []
+        for aid_key, group_holdings in grouped.items():
             sub_name = (
                 account_id_to_name.get(aid_key, DEFAULT_SUB_ACCOUNT_NAME)
                 if aid_key
@@ -79,63 +81,11 @@ def import_from_xiaobeiyangji(user, source, overwrite: bool = False) -> dict:
             else:
                 result["accounts_skipped"] += 1
 
-            if overwrite:
-                PositionOperation.objects.filter(account=sub_account).delete()
-
-            for holding in group_holdings:
-                fund_code = holding.get("fund_code", "").strip()
-                if not fund_code:
-                    result["holdings_skipped"] += 1
-                    continue
-
-                fund, _ = Fund.objects.get_or_create(
-                    fund_code=fund_code,
-                    defaults={"fund_name": holding.get("fund_name", fund_code)},
-                )
-
-                op_date = holding["operation_date"]
-                if not overwrite:
-                    exists = PositionOperation.objects.filter(
-                        account=sub_account,
-                        fund=fund,
-                        operation_date=op_date,
-                        operation_type="BUY",
-                    ).exists()
-                    if exists:
-                        result["holdings_skipped"] += 1
-                        continue
-
-                nav = Decimal(str(holding["nav"])).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
-                share = Decimal(str(holding["share"])).quantize(
-                    Decimal("0.0001"), rounding=ROUND_DOWN
-                )
-                source_market_value = None
-                if share > 0 and nav > 0:
-                    amount = (share * nav).quantize(Decimal("0.01"), rounding=ROUND_DOWN)
-                else:
-                    imported_market_value = Decimal(str(holding["amount"])).quantize(
-                        Decimal("0.01"), rounding=ROUND_DOWN
-                    )
-                    if imported_market_value > 0:
-                        source_market_value = imported_market_value
-                        earnings = Decimal(str(holding.get("earnings", 0)))
-                        amount = max(source_market_value - earnings, Decimal(0)).quantize(
-                            Decimal("0.01"), rounding=ROUND_DOWN
-                        )
-                    else:
-                        amount = Decimal(0)
+            groups.append((sub_account, group_holdings))
 
-                PositionOperation.objects.create(
-                    account=sub_account,
-                    fund=fund,
-                    operation_type="BUY",
-                    operation_date=op_date,
-                    before_15=True,
-                    share=share,
-                    nav=nav,
-                    amount=amount,
-                    source_market_value=source_market_value,
-                )
-                result["holdings_created"] += 1
+        # 6. 批量写入流水（受影响的持仓在作用域结束时各重算一次）
+        created, skipped = write_holdings(groups, overwrite)
+        result["holdings_created"] += created
+        result["holdings_skipped"] += skipped
 
     return result
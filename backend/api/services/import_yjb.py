@@ -4,17 +4,15 @@
 逻辑：
 1. 获取养基宝账户列表
 2. 在本地创建父账户（养基宝）+ 子账户（各券商/平台）
-3. 获取每个账户的持仓
-4. 创建 Fund + PositionOperation
+3. 获取每个账户的持仓（事务外并发获取）
+4. 批量创建 Fund + PositionOperation，受影响的持仓各重算一次
    - overwrite=False：同账户+基金+日期已存在则跳过
    - overwrite=True：清空该账户所有持仓流水后重新导入
 """
 
-from decimal import ROUND_DOWN, Decimal
-
-from django.db import transaction
-
-from ..models import Account, Fund, PositionOperation
+from ..models import Account
+from .holding_import import fetch_concurrently, write_holdings
+from .recalc_queue import deferred_recalculation
 
 PARENT_ACCOUNT_NAME = "养基宝"
 
@@ -23,6 +21,9 @@ def import_from_yangjibao(user, source, overwrite: bool = False) -> dict:
     """
     从养基宝导入账户和持仓数据
 
+    先在事务外获取账户列表并并发获取各账户持仓，再在一个事务内批量写入，
+    网络耗时不会占用数据库事务。
+
     Args:
         user: Django User 对象
         source: YangJiBaoSource 实例（已登录）
@@ -43,25 +44,27 @@ def import_from_yangjibao(user, source, overwrite: bool = False) -> dict:
         "holdings_skipped": 0,
     }
 
-    with transaction.atomic():
-        # 1. 确保父账户存在
+    # 1. 获取远端数据（事务外，各账户持仓并发获取）
+    yjb_accounts = source.fetch_accounts()
+    holdings_list = fetch_concurrently(
+        lambda yjb_account: source.fetch_holdings(yjb_account["account_id"]), yjb_accounts
+    )
+
+    # 写入阶段在一个事务内完成
+    with deferred_recalculation():
+        # 2. 确保父账户存在
         parent_account, _ = Account.objects.get_or_create(
             user=user,
             name=PARENT_ACCOUNT_NAME,
             defaults={"parent": None, "is_default": False},
         )
 
-        # 2. 获取养基宝账户列表
-        yjb_accounts = source.fetch_accounts()
-
-        for yjb_account in yjb_accounts:
-            account_id = yjb_account["account_id"]
-            account_name = yjb_account["name"]
-
-            # 3. 创建/更新子账户（确保 parent 字段正确）
+        # 3. 创建/更新子账户（确保 parent 字段正确）
+        groups = []
+        for yjb_account, holdings in zip(yjb_accounts, holdings_list, strict=True):
             sub_account, created = Account.objects.update_or_create(
                 user=user,
-                name=account_name,
+                name=yjb_account["name"],
                 defaults={"parent": parent_account, "is_default": False},
             )
 
@@ -70,70 +73,11 @@ def import_from_yangjibao(user, source, overwrite: bool = False) -> dict:
             else:
                 result["accounts_skipped"] += 1
 
-            # 4. overwrite 模式：清空该子账户所有持仓流水
-            if overwrite:
-                PositionOperation.objects.filter(account=sub_account).delete()
-
-            # 5. 获取该账户的持仓
-            holdings = source.fetch_holdings(account_id)
-
-            for holding in holdings:
-                fund_code = holding.get("fund_code", "").strip()
-                if not fund_code:
-                    result["holdings_skipped"] += 1
-                    continue
-
-                # 6. 创建/获取基金
-                fund, _ = Fund.objects.get_or_create(
-                    fund_code=fund_code,
-                    defaults={"fund_name": holding.get("fund_name", fund_code)},
-                )
-
-                # 7. 幂等（非 overwrite 模式）：同账户+基金+日期已存在则跳过
-                op_date = holding["operation_date"]
-                if not overwrite:
-                    exists = PositionOperation.objects.filter(
-                        account=sub_account,
-                        fund=fund,
-                        operation_date=op_date,
-                        operation_type="BUY",
-                    ).exists()
-                    if exists:
-                        result["holdings_skipped"] += 1
-                        continue
-
-                # 8. nav/share/amount 截断到合法精度
-                nav = Decimal(str(holding["nav"])).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
-                share = Decimal(str(holding["share"])).quantize(
-                    Decimal("0.0001"), rounding=ROUND_DOWN
-                )
-                source_market_value = None
-                if share > 0 and nav > 0:
-                    amount = (share * nav).quantize(Decimal("0.01"), rounding=ROUND_DOWN)
-                else:
-                    imported_market_value = Decimal(str(holding["amount"])).quantize(
-                        Decimal("0.01"), rounding=ROUND_DOWN
-                    )
-                    if imported_market_value > 0:
-                        source_market_value = imported_market_value
-                        earnings = Decimal(str(holding.get("earnings", 0)))
-                        amount = max(source_market_value - earnings, Decimal(0)).quantize(
-                            Decimal("0.01"), rounding=ROUND_DOWN
-                        )
-                    else:
-                        amount = Decimal(0)
+            groups.append((sub_account, holdings))
 
-                PositionOperation.objects.create(
-                    account=sub_account,
-                    fund=fund,
-                    operation_type="BUY",
-                    operation_date=op_date,
-                    before_15=True,
-                    share=share,
-                    nav=nav,
-                    amount=amount,
-                    source_market_value=source_market_value,
-                )
-                result["holdings_created"] += 1
+        # 4. 批量写入流水（受影响的持仓在作用域结束时各重算一次）
+        created, skipped = write_holdings(groups, overwrite)
+        result["holdings_created"] += created
+        result["holdings_skipped"] += skipped
 
     return result
@@ -0,0 +1,82 @@
+"""
+历史净值流式导出
+
+按块从数据库读取（QuerySet.iterator），逐行生成 CSV / NDJSON 文本，
+导出数百万行时服务端内存占用保持恒定。
+"""
+
+import csv
+import json
+
+from ..models import FundNavHistory
+
+# 导出字段（CSV 表头 / NDJSON 键名）
+EXPORT_FIELDS = ["fund_code", "nav_date", "unit_nav", "accumulated_nav", "daily_growth"]
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+# 每次从数据库读取的行数
+EXPORT_CHUNK_SIZE = 2000
+
+
+def build_export_queryset(fund_codes=None, start_date=None, end_date=None):
+    """
+    构建导出查询
+
+    按 (fund_id, nav_date) 排序，可直接利用唯一索引，避免大表排序。
+    """
+    queryset = FundNavHistory.objects.all()
+    if fund_codes:
+        queryset = queryset.filter(fund__fund_code__in=fund_codes)
+    if start_date:
+        queryset = queryset.filter(nav_date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(nav_date__lte=end_date)
+
+    return queryset.order_by("fund_id", "nav_date").values_list(
+        "fund__fund_code", "nav_date", "unit_nav", "accumulated_nav", "daily_growth"
+    )
+
+
+def iter_export_lines(queryset, export_format: str = "csv"):
+    """
+    逐行生成导出文本
+
+    Args:
+        queryset: build_export_queryset 返回的 values_list 查询
+        export_format: csv / ndjson
+
+    Yields:
+        str: 一行文本（含换行符）；CSV 第一行为表头
+    """
+    rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    if export_format == "ndjson":
+        for row in rows:
+            yield json.dumps(dict(zip(EXPORT_FIELDS, _format_row(row), strict=True))) + "\n"
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(["" if v is None else v for v in _format_row(row)])
+
+
+def _format_row(row) -> list:
+    """日期转 ISO 字符串，Decimal 转字符串（与 API 返回格式一致）"""
+    fund_code, nav_date, unit_nav, accumulated_nav, daily_growth = row
+    return [
+        fund_code,
+        nav_date.isoformat(),
+        str(unit_nav),
+        None if accumulated_nav is None else str(accumulated_nav),
+        None if daily_growth is None else str(daily_growth),
+    ]
+
+
+class _Echo:
+    """csv.writer 的伪文件对象：writerow 直接返回格式化后的行"""
+
+    def write(self, value):
+        return value
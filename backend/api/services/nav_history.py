@@ -1,17 +1,37 @@
 """
 基金历史净值同步服务
+
+增量同步依赖 FundNavCoverage 水位表：
+- 记录每只基金已入库净值的首尾日期与缺失的交易日区间
+- 同步时只拉取缺口 + 最新水位之后的区间，缺口自动修复，无需强制全量
+- 连续多次修复无进展的缺口视为数据源本身缺失，不再重试
+
+上游数据逐条流式读取、按块批量写入，全量同步的内存占用与历史长度无关。
 """
 
+import itertools
 import logging
+from collections.abc import Iterable, Iterator
 from datetime import date, timedelta
 
 from django.db import transaction
 
-from ..models import Fund, FundNavHistory
+from ..models import Fund, FundNavCoverage, FundNavHistory
 from ..sources import SourceRegistry
+from ..sources.base import BaseEstimateSource
+from ..utils.trading_calendar import get_trading_days
+from .fund_metrics import mark_fund_metrics_stale
+from .valuation_snapshot import invalidate_fund_snapshots
 
 logger = logging.getLogger(__name__)
 
+# 缺口修复连续无进展达到该次数后，认定为数据源缺失
+MAX_REPAIR_ATTEMPTS = 3
+# 相距不超过该天数的缺失区间合并为一次请求
+MERGE_GAP_DAYS = 31
+# 历史净值分块写入的行数
+NAV_WRITE_CHUNK_SIZE = 500
+
 
 def sync_nav_history(
     fund_code: str,
@@ -24,7 +44,7 @@ def sync_nav_history(
 
     Args:
         fund_code: 基金代码
-        start_date: 开始日期（可选，默认从最后一条记录开始）
+        start_date: 开始日期（可选，默认按覆盖水位只同步缺失区间）
         end_date: 结束日期（可选，默认今天）
         force: 是否强制全量同步
 
@@ -32,64 +52,439 @@ def sync_nav_history(
         新增/更新的记录数
     """
     try:
-        fund = Fund.objects.get(fund_code=fund_code)
+        fund = Fund.objects.select_related("nav_coverage").get(fund_code=fund_code)
     except Fund.DoesNotExist:
         raise ValueError(f"基金不存在：{fund_code}")
 
-    # 如果不是强制同步，从最后一条记录开始
-    if not force and not start_date:
-        last_record = FundNavHistory.objects.filter(fund=fund).first()
-        if last_record:
-            start_date = last_record.nav_date + timedelta(days=1)
+    return _sync_fund(fund, start_date, end_date, force)
 
+
+def _sync_fund(fund, start_date, end_date, force) -> int:
+    """同步单只基金（fund 需已 select_related nav_coverage）"""
     if not end_date:
         end_date = date.today()
 
-    # 从数据源获取数据
+    coverage = _get_coverage(fund)
+    pending_gaps = _expand_ranges(coverage.gaps)
+
+    if force or start_date:
+        # 显式区间 / 强制全量：按调用方指定的范围拉取
+        ranges = [(start_date, end_date)]
+    else:
+        ranges = _missing_ranges(coverage, end_date)
+
+    count = 0
+    written_days = set()
+    for range_start, range_end in ranges:
+        rows = _iter_nav_data(fund.fund_code, range_start, range_end)
+        written = 0
+        # 流式分块写入，内存占用不随历史长度增长
+        for chunk in _chunked(rows, NAV_WRITE_CHUNK_SIZE):
+            count += _write_nav_chunk(fund, chunk)
+            written += len(chunk)
+            written_days.update(item["nav_date"] for item in chunk)
+        if not written:
+            logger.info(f"没有新的历史净值数据：{fund.fund_code}")
+
+    if count:
+        logger.info(f"同步历史净值完成：{fund.fund_code}，新增 {count} 条记录")
+
+    # 本次请求区间覆盖到的待修复缺口
+    attempted = {
+        d
+        for d in pending_gaps
+        if any((s is None or s <= d) and (e is None or d <= e) for s, e in ranges)
+    }
+    if count or attempted:
+        # 强制全量同步时按全部已入库数据重新校验，否则只并入本次写入的日期
+        refresh_nav_coverage(
+            fund,
+            coverage,
+            repaired_days=attempted,
+            written_days=None if force else written_days,
+        )
+
+    # 无论是否有新数据，都回写最新净值到 Fund 表
+    last_date = coverage.last_nav_date
+    if last_date and (fund.latest_nav is None or last_date > (fund.latest_nav_date or date.min)):
+        latest = FundNavHistory.objects.filter(fund=fund, nav_date=last_date).first()
+        if latest:
+            fund.latest_nav = latest.unit_nav
+            fund.latest_nav_date = latest.nav_date
+            fund.save(update_fields=["latest_nav", "latest_nav_date"])
+
+    return count
+
+
+def _iter_nav_data(fund_code: str, start_date: date | None, end_date: date | None) -> Iterator:
+    """从数据源逐条获取历史净值（eastmoney → danjuan fallback）"""
     source = SourceRegistry.get_source("eastmoney")
-    nav_data = source.fetch_nav_history(fund_code, start_date, end_date)
+    rows = _iter_source_nav(source, fund_code, start_date, end_date)
+    first = next(rows, None)
 
     # eastmoney 无数据 → fallback 到蛋卷基金
-    if not nav_data:
+    if first is None:
         logger.info(f"eastmoney 无 {fund_code} 净值数据，尝试 danjuan fallback")
         danjuan = SourceRegistry.get_source("danjuan")
         if danjuan:
             try:
-                nav_data = danjuan.fetch_nav_history(fund_code, start_date, end_date)
+                rows = _iter_source_nav(danjuan, fund_code, start_date, end_date)
+                first = next(rows, None)
             except Exception as e:
                 logger.warning(f"danjuan fallback 失败：{fund_code}, 错误：{e}")
-                nav_data = []
 
-    count = 0
-    if not nav_data:
-        logger.info(f"没有新的历史净值数据：{fund_code}")
+    if first is None:
+        return iter(())
+    return itertools.chain([first], rows)
+
+
+def _iter_source_nav(source, fund_code: str, start_date, end_date) -> Iterator:
+    """数据源实现了流式接口时逐条读取，否则退回列表接口"""
+    if isinstance(source, BaseEstimateSource):
+        return iter(source.iter_nav_history(fund_code, start_date, end_date))
+    return iter(source.fetch_nav_history(fund_code, start_date, end_date) or [])
+
+
+def _chunked(rows: Iterable, size: int) -> Iterator[list]:
+    """按固定大小切分迭代器"""
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
+def _write_nav_chunk(fund, chunk: list[dict]) -> int:
+    """
+    批量写入一块历史净值（已存在的日期覆盖更新）
+
+    Returns:
+        新增的记录数
+    """
+    # 同一块内重复日期以最后一条为准，避免 upsert 同一行两次
+    by_date = {item["nav_date"]: item for item in chunk}
+    existing = set(
+        FundNavHistory.objects.filter(fund=fund, nav_date__in=by_date).values_list(
+            "nav_date", flat=True
+        )
+    )
+    objs = [
+        FundNavHistory(
+            fund=fund,
+            nav_date=nav_date,
+            unit_nav=item["unit_nav"],
+            accumulated_nav=item.get("accumulated_nav"),
+            daily_growth=item.get("daily_growth"),
+        )
+        for nav_date, item in by_date.items()
+    ]
+    with transaction.atomic():
+        FundNavHistory.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["fund", "nav_date"],
+            update_fields=["unit_nav", "accumulated_nav", "daily_growth", "updated_at"],
+        )
+        invalidate_fund_snapshots({fund.pk: min(by_date)})
+        mark_fund_metrics_stale([fund.pk])
+    return len(by_date.keys() - existing)
+
+
+def _get_coverage(fund) -> FundNavCoverage:
+    """获取覆盖水位，不存在时根据已入库数据重建"""
+    try:
+        return fund.nav_coverage
+    except FundNavCoverage.DoesNotExist:
+        coverage = FundNavCoverage(fund=fund)
+        refresh_nav_coverage(fund, coverage)
+        return coverage
+
+
+def _missing_ranges(coverage: FundNavCoverage, end_date: date) -> list[tuple]:
+    """计算需要拉取的区间：待修复缺口 + 最新水位之后"""
+    ranges = [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in coverage.gaps]
+
+    if coverage.last_nav_date is None:
+        return [(None, end_date)]
+    if coverage.last_nav_date < end_date:
+        ranges.append((coverage.last_nav_date + timedelta(days=1), end_date))
+
+    # 相邻区间合并，减少上游请求次数
+    merged = []
+    for range_start, range_end in sorted(ranges):
+        if merged and (range_start - merged[-1][1]).days <= MERGE_GAP_DAYS:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+        else:
+            merged.append((range_start, range_end))
+    return merged
+
+
+def refresh_nav_coverage(
+    fund,
+    coverage: FundNavCoverage | None = None,
+    repaired_days: set | None = None,
+    written_days: set | None = None,
+) -> FundNavCoverage:
+    """
+    更新覆盖水位
+
+    已有水位且传入本次写入的日期时增量推进（同 record_confirmed_navs），
+    不再重新读取全部已入库日期；首次建立水位或显式修复（不传 written_days）时
+    根据全部已入库净值从头校验。
+
+    Args:
+        fund: 基金对象
+        coverage: 已有水位对象（可选，不传则读取/新建）
+        repaired_days: 本次尝试修复的缺口交易日（用于判断修复是否有进展）
+        written_days: 本次同步写入的净值日期（可选，传入时增量推进）
+
+    Returns:
+        FundNavCoverage: 已保存的水位对象
+    """
+    if coverage is None:
+        coverage = FundNavCoverage.objects.filter(fund=fund).first() or FundNavCoverage(fund=fund)
+
+    upstream_days = _expand_ranges(coverage.upstream_gaps)
+
+    if written_days is not None and coverage.last_nav_date is not None:
+        if written_days:
+            _advance_coverage(coverage, written_days)
+        nav_dates = written_days
+        trading_days = None
+        missing = _expand_ranges(coverage.gaps)
     else:
-        # 批量导入
-        count = 0
-        with transaction.atomic():
-            for item in nav_data:
-                _, created = FundNavHistory.objects.update_or_create(
-                    fund=fund,
-                    nav_date=item["nav_date"],
-                    defaults={
-                        "unit_nav": item["unit_nav"],
-                        "accumulated_nav": item.get("accumulated_nav"),
-                        "daily_growth": item.get("daily_growth"),
-                    },
+        nav_dates = set(FundNavHistory.objects.filter(fund=fund).values_list("nav_date", flat=True))
+        if nav_dates:
+            coverage.first_nav_date = min(nav_dates)
+            coverage.last_nav_date = max(nav_dates)
+            trading_days = get_trading_days(coverage.first_nav_date, coverage.last_nav_date)
+            missing = {d for d in trading_days if d not in nav_dates and d not in upstream_days}
+        else:
+            coverage.first_nav_date = None
+            coverage.last_nav_date = None
+            trading_days = []
+            missing = set()
+
+    # 修复无进展：缺口一个都没补上
+    if repaired_days:
+        if repaired_days & nav_dates:
+            coverage.repair_attempts = 0
+        else:
+            coverage.repair_attempts += 1
+
+        if coverage.repair_attempts >= MAX_REPAIR_ATTEMPTS:
+            stale = repaired_days & missing
+            logger.info(f"{fund.fund_code} 有 {len(stale)} 个交易日数据源无数据，不再重试")
+            upstream_days |= stale
+            missing -= stale
+            if upstream_days:
+                coverage.upstream_gaps = _collapse_ranges(
+                    get_trading_days(min(upstream_days), max(upstream_days)), upstream_days
                 )
-                if created:
-                    count += 1
+            coverage.repair_attempts = 0
+            if trading_days is None:
+                coverage.gaps = _collapse_days(missing)
 
-        logger.info(f"同步历史净值完成：{fund_code}，新增 {count} 条记录")
+    if trading_days is not None:
+        coverage.gaps = _collapse_ranges(trading_days, missing)
+    coverage.save()
+    return coverage
 
-    # 无论是否有新数据，都回写最新净值到 Fund 表
-    latest = FundNavHistory.objects.filter(fund=fund).order_by("-nav_date").first()
-    if latest and (fund.latest_nav is None or latest.nav_date > (fund.latest_nav_date or date.min)):
-        fund.latest_nav = latest.unit_nav
-        fund.latest_nav_date = latest.nav_date
-        fund.save(update_fields=["latest_nav", "latest_nav_date"])
 
-    return count
+def _collapse_ranges(trading_days: list[date], missing: set) -> list[list[str]]:
+    """将缺失交易日折叠为连续区间 [[start, end], ...]"""
+    ranges = []
+    run = None
+    for d in trading_days:
+        if d in missing:
+            if run:
+                run[1] = d.isoformat()
+            else:
+                run = [d.isoformat(), d.isoformat()]
+        elif run:
+            ranges.append(run)
+            run = None
+    if run:
+        ranges.append(run)
+    return ranges
+
+
+def _collapse_days(missing: set) -> list[list[str]]:
+    """将缺失交易日折叠为连续区间（相邻两个缺失日之间没有其他交易日即视为连续）"""
+    ranges = []
+    prev = None
+    for d in sorted(missing):
+        if prev and not _has_trading_day_between(prev, d):
+            ranges[-1][1] = d.isoformat()
+        else:
+            ranges.append([d.isoformat(), d.isoformat()])
+        prev = d
+    return ranges
+
+
+def _has_trading_day_between(start: date, end: date) -> bool:
+    """(start, end) 开区间内是否存在交易日"""
+    current = start + timedelta(days=1)
+    while current < end:
+        if get_trading_days(current, current):
+            return True
+        current += timedelta(days=1)
+    return False
+
+
+def _expand_ranges(ranges: list) -> set:
+    """将区间列表展开为交易日集合"""
+    days = set()
+    for range_start, range_end in ranges:
+        days.update(
+            get_trading_days(date.fromisoformat(range_start), date.fromisoformat(range_end))
+        )
+    return days
+
+
+def record_confirmed_navs(navs: list[tuple]) -> int:
+    """
+    批量追加确认净值到历史表（批量净值更新时调用）
+
+    同一 (基金, 日期) 已存在时覆盖更新（本次缺失的累计净值 / 日增长率保留已入库的值）；
+    已有覆盖水位的基金同步推进水位。本次写入的是基金第一条净值时创建空水位，
+    下次同步按空水位全量回填历史，而不是按这一条数据重建出首尾同一天的水位。
+
+    Args:
+        navs: [(fund, nav_info), ...]，nav_info 需包含 unit_nav / nav_date，
+              可选 accumulated_nav / daily_growth。没有单位净值的记录跳过
+              （nav 为累计净值，不能写入单位净值列）
+
+    Returns:
+        写入（新增或更新）的记录数
+    """
+    rows = {}
+    for fund, nav_info in navs:
+        unit_nav = nav_info.get("unit_nav")
+        if not unit_nav or not nav_info.get("nav_date"):
+            continue
+        # 同一基金同一日期只保留最后一条，避免 upsert 同一行两次
+        rows[(fund.pk, nav_info["nav_date"])] = FundNavHistory(
+            fund=fund,
+            nav_date=nav_info["nav_date"],
+            unit_nav=unit_nav,
+            accumulated_nav=nav_info.get("accumulated_nav"),
+            daily_growth=nav_info.get("daily_growth"),
+        )
+    if not rows:
+        return 0
+
+    _keep_existing_fields(rows)
+    backfill = _funds_without_history({fund_id for fund_id, _ in rows})
+
+    with transaction.atomic():
+        FundNavHistory.objects.bulk_create(
+            list(rows.values()),
+            batch_size=NAV_WRITE_CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=["fund", "nav_date"],
+            update_fields=["unit_nav", "accumulated_nav", "daily_growth", "updated_at"],
+        )
+        _advance_coverages(rows.keys())
+        FundNavCoverage.objects.bulk_create(
+            [FundNavCoverage(fund_id=fund_id) for fund_id in backfill], ignore_conflicts=True
+        )
+        stale = {}
+        for fund_id, nav_date in rows:
+            if fund_id not in stale or nav_date < stale[fund_id]:
+                stale[fund_id] = nav_date
+        invalidate_fund_snapshots(stale)
+        mark_fund_metrics_stale(stale)
+
+    return len(rows)
+
+
+def _keep_existing_fields(rows: dict) -> None:
+    """本次缺失的可选字段沿用已入库的值，避免 upsert 用 None 覆盖历史同步写入的数据"""
+    partial = {
+        key: row for key, row in rows.items() if None in (row.accumulated_nav, row.daily_growth)
+    }
+    if not partial:
+        return
+
+    existing = FundNavHistory.objects.filter(
+        fund_id__in={fund_id for fund_id, _ in partial},
+        nav_date__in={nav_date for _, nav_date in partial},
+    ).values_list("fund_id", "nav_date", "accumulated_nav", "daily_growth")
+    for fund_id, nav_date, accumulated_nav, daily_growth in existing:
+        row = partial.get((fund_id, nav_date))
+        if row is None:
+            continue
+        if row.accumulated_nav is None:
+            row.accumulated_nav = accumulated_nav
+        if row.daily_growth is None:
+            row.daily_growth = daily_growth
+
+
+def _funds_without_history(fund_ids) -> set:
+    """没有覆盖水位、也没有任何已入库净值的基金"""
+    return set(
+        Fund.objects.filter(
+            id__in=fund_ids, nav_coverage__isnull=True, nav_history__isnull=True
+        ).values_list("id", flat=True)
+    )
+
+
+def _advance_coverages(fund_dates) -> None:
+    """根据新写入的 (fund_id, nav_date) 增量推进覆盖水位"""
+    dates_by_fund = {}
+    for fund_id, nav_date in fund_dates:
+        dates_by_fund.setdefault(fund_id, set()).add(nav_date)
+
+    coverages = FundNavCoverage.objects.filter(fund_id__in=list(dates_by_fund))
+    changed = []
+    for coverage in coverages:
+        if _advance_coverage(coverage, dates_by_fund[coverage.fund_id]):
+            changed.append(coverage)
+
+    if changed:
+        FundNavCoverage.objects.bulk_update(
+            changed,
+            ["first_nav_date", "last_nav_date", "gaps"],
+            batch_size=NAV_WRITE_CHUNK_SIZE,
+        )
+
+
+def _advance_coverage(coverage: FundNavCoverage, nav_dates: set) -> bool:
+    """将新日期并入覆盖水位，返回是否有变化"""
+    if coverage.last_nav_date is None:
+        # 还没有同步过历史：保持空水位，下次同步全量拉取
+        return False
+
+    first, last = coverage.first_nav_date, coverage.last_nav_date
+    new_first = min(first, *nav_dates)
+    new_last = max(last, *nav_dates)
+    inside = {d for d in nav_dates if first <= d <= last}
+    if new_first == first and new_last == last and not inside:
+        return False
+
+    missing = _expand_ranges(coverage.gaps) - inside
+    upstream_days = _expand_ranges(coverage.upstream_gaps)
+    # 水位外新增的区间：两端之间未入库的交易日记为缺口
+    if new_first < first:
+        missing |= {
+            d
+            for d in get_trading_days(new_first, first - timedelta(days=1))
+            if d not in nav_dates and d not in upstream_days
+        }
+    if new_last > last:
+        missing |= {
+            d
+            for d in get_trading_days(last + timedelta(days=1), new_last)
+            if d not in nav_dates and d not in upstream_days
+        }
+
+    gaps = _collapse_days(missing)
+    if new_first == first and new_last == last and gaps == coverage.gaps:
+        return False
+
+    coverage.first_nav_date = new_first
+    coverage.last_nav_date = new_last
+    coverage.gaps = gaps
+    return True
 
 
 def batch_sync_nav_history(
@@ -108,10 +503,19 @@ def batch_sync_nav_history(
     Returns:
         {fund_code: {'success': bool, 'count': int, 'error': str}} 字典
     """
+    # 一次查询取出所有基金及其覆盖水位
+    funds = {
+        f.fund_code: f
+        for f in Fund.objects.select_related("nav_coverage").filter(fund_code__in=fund_codes)
+    }
+
     results = {}
     for fund_code in fund_codes:
         try:
-            count = sync_nav_history(fund_code, start_date, end_date)
+            fund = funds.get(fund_code)
+            if fund is None:
+                raise ValueError(f"基金不存在：{fund_code}")
+            count = _sync_fund(fund, start_date, end_date, force=False)
             results[fund_code] = {"success": True, "count": count}
         except Exception as e:
             logger.error(f"同步历史净值失败：{fund_code}, 错误：{e}")
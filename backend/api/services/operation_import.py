@@ -0,0 +1,148 @@
+"""
+操作流水批量导入
+
+券商对账单导入、历史回填等场景一次提交成百上千条流水：
+账户 / 基金各用一次 in 查询预取后在内存中校验，全部通过后在一个事务内 bulk_create，
+每个受影响的 (账户, 基金) 组合只重算一次持仓。
+"""
+
+import csv
+import io
+import logging
+
+from django.db import transaction
+
+from ..models import Account, Fund, PositionOperation
+
+logger = logging.getLogger(__name__)
+
+# CSV 表头（before_15 可省略，默认 true）
+IMPORT_FIELDS = [
+    "account",
+    "fund_code",
+    "operation_type",
+    "operation_date",
+    "before_15",
+    "amount",
+    "share",
+    "nav",
+]
+# 单次导入的最大行数
+MAX_IMPORT_ROWS = 5000
+# bulk_create 每批行数
+INSERT_BATCH_SIZE = 1000
+
+
+def parse_csv_rows(content: bytes | str) -> list[dict]:
+    """
+    解析 CSV 文本为行字典
+
+    空单元格视为未提供（使用字段默认值）；兼容带 BOM 的 UTF-8（Excel 导出）。
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    reader = csv.DictReader(io.StringIO(content))
+    return [
+        {
+            key.strip(): value.strip()
+            for key, value in row.items()
+            if key and value not in (None, "")
+        }
+        for row in reader
+    ]
+
+
+def validate_operations(rows: list[dict], user) -> tuple[list[PositionOperation], list[dict]]:
+    """
+    校验导入行
+
+    Args:
+        rows: 行字典列表（字段见 IMPORT_FIELDS）
+        user: 当前用户；非管理员只能导入自己的账户
+
+    Returns:
+        (待写入的 PositionOperation 列表, 错误列表 [{'row': 行号(从 1 开始), 'errors': {...}}])
+    """
+    from ..serializers import PositionOperationImportRowSerializer
+
+    # 逐行做格式校验，格式合法的行才参与存在性校验
+    row_errors = []
+    valid_rows = []
+    for index, row in enumerate(rows):
+        serializer = PositionOperationImportRowSerializer(data=row)
+        if serializer.is_valid():
+            row_errors.append({})
+            valid_rows.append((index, serializer.validated_data))
+        else:
+            row_errors.append(serializer.errors)
+
+    account_ids = {row["account"] for _, row in valid_rows}
+    fund_codes = {row["fund_code"] for _, row in valid_rows}
+    accounts = Account.objects.filter(id__in=account_ids)
+    if not user.is_staff:
+        accounts = accounts.filter(user=user)
+    account_map = {account.id: account for account in accounts}
+    fund_map = {fund.fund_code: fund for fund in Fund.objects.filter(fund_code__in=fund_codes)}
+
+    operations = []
+    for index, row in valid_rows:
+        errors = {}
+        account = account_map.get(row["account"])
+        if account is None:
+            errors["account"] = "账户不存在"
+        elif account.parent_id is None:
+            errors["account"] = "持仓操作只能在子账户上进行，父账户不能进行持仓操作"
+        fund = fund_map.get(row["fund_code"])
+        if fund is None:
+            errors["fund_code"] = "基金不存在"
+
+        if errors:
+            row_errors[index] = errors
+            continue
+
+        operations.append(
+            PositionOperation(
+                account=account,
+                fund=fund,
+                operation_type=row["operation_type"],
+                operation_date=row["operation_date"],
+                before_15=row["before_15"],
+                amount=row["amount"],
+                share=row["share"],
+                nav=row["nav"],
+            )
+        )
+
+    errors = [
+        {"row": index + 1, "errors": error} for index, error in enumerate(row_errors) if error
+    ]
+    return operations, errors
+
+
+def import_operations(operations: list[PositionOperation]) -> dict:
+    """
+    写入已校验的流水并重算持仓
+
+    bulk_create 不经过 PositionOperation.save()，持仓在写入后按组合统一重算，
+    各账户自最早导入日期起的估值快照一并失效。
+
+    Returns:
+        {'created': 写入条数, 'positions': 重算的组合数}
+    """
+    from .position_bulk import recalculate_pairs
+    from .valuation_snapshot import invalidate_snapshots
+
+    pairs = {(op.account_id, op.fund_id) for op in operations}
+    stale = {}
+    for op in operations:
+        since = stale.get(op.account_id)
+        if since is None or op.operation_date < since:
+            stale[op.account_id] = op.operation_date
+
+    with transaction.atomic():
+        PositionOperation.objects.bulk_create(operations, batch_size=INSERT_BATCH_SIZE)
+        stats = recalculate_pairs(pairs)
+        invalidate_snapshots(stale)
+
+    logger.info(f"批量导入操作流水 {len(operations)} 条，重算持仓 {stats['pairs']} 个")
+    return {"created": len(operations), "positions": stats["pairs"]}
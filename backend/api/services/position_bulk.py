@@ -0,0 +1,221 @@
+"""
+持仓批量重算引擎
+
+一次查询按 (account, fund, date, created_at) 流式读取全部流水，
+在内存中回放（与 recalculate_position 共用计算逻辑），
+结果按块批量 upsert / delete 写回，可按账户分片到多个进程并行。
+"""
+
+import itertools
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections, transaction
+
+from ..models import Position, PositionOperation
+from .account_summary import mark_accounts_dirty
+
+logger = logging.getLogger(__name__)
+
+# 流水读取 / 持仓写入的块大小
+READ_CHUNK_SIZE = 5000
+WRITE_CHUNK_SIZE = 1000
+
+_OPERATION_FIELDS = (
+    "account_id",
+    "fund_id",
+    "operation_type",
+    "operation_date",
+    "share",
+    "amount",
+    "source_market_value",
+)
+
+
+def bulk_recalculate_positions(account_ids=None, workers: int = 1) -> dict:
+    """
+    批量重算持仓
+
+    只处理有流水的 (账户, 基金) 组合：回放后有持仓的 upsert，清仓的删除。
+
+    Args:
+        account_ids: 可选，只重算这些账户
+        workers: 进程数；>1 时按账户分片并行（需要支持 fork 的平台）
+
+    Returns:
+        {'pairs': 处理的组合数, 'updated': upsert 数, 'deleted': 删除数}
+    """
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        return _recalculate_parallel(account_ids, workers)
+    return _recalculate_shard(account_ids)
+
+
+def recalculate_pairs(pairs) -> dict:
+    """
+    批量重算指定的 (账户, 基金) 组合
+
+    与 bulk_recalculate_positions 共用回放与写入逻辑；
+    已没有任何流水的组合视为清仓，删除其持仓记录。
+
+    Args:
+        pairs: 可迭代的 (account_id, fund_id)，ID 可以是 UUID 或字符串
+
+    Returns:
+        {'pairs': 处理的组合数, 'updated': upsert 数, 'deleted': 删除数}
+    """
+    pairs = {(uuid.UUID(str(a)), uuid.UUID(str(f))) for a, f in pairs}
+    if not pairs:
+        return {"pairs": 0, "updated": 0, "deleted": 0}
+    return _recalculate_shard(None, pairs=pairs)
+
+
+def _recalculate_parallel(account_ids, workers: int) -> dict:
+    """按账户分片，多进程并行重算"""
+    operations = PositionOperation.objects.all()
+    if account_ids is not None:
+        operations = operations.filter(account_id__in=account_ids)
+    all_accounts = sorted(operations.values_list("account_id", flat=True).distinct())
+    if not all_accounts:
+        return {"pairs": 0, "updated": 0, "deleted": 0}
+
+    shards = [all_accounts[i::workers] for i in range(workers)]
+    shards = [shard for shard in shards if shard]
+
+    # 子进程不能复用父进程的数据库连接
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        results = list(executor.map(_run_shard, shards))
+
+    return {key: sum(r[key] for r in results) for key in ("pairs", "updated", "deleted")}
+
+
+def _run_shard(account_ids) -> dict:
+    """子进程入口：使用独立的数据库连接"""
+    connections.close_all()
+    try:
+        return _recalculate_shard(account_ids)
+    finally:
+        connections.close_all()
+
+
+def _recalculate_shard(account_ids, pairs=None) -> dict:
+    """单进程重算：流式回放 + 分块写入（pairs 非空时只处理这些组合）"""
+    from . import _apply_operation, _has_holding, _holding_nav, _new_state
+
+    operations = PositionOperation.objects.all()
+    positions = Position.objects.all()
+    if account_ids is not None:
+        operations = operations.filter(account_id__in=account_ids)
+        positions = positions.filter(account_id__in=account_ids)
+    if pairs is not None:
+        account_set = {account_id for account_id, _ in pairs}
+        fund_set = {fund_id for _, fund_id in pairs}
+        operations = operations.filter(account_id__in=account_set, fund_id__in=fund_set)
+        positions = positions.filter(account_id__in=account_set, fund_id__in=fund_set)
+
+    rows = (
+        operations.order_by("account_id", "fund_id", "operation_date", "created_at")
+        .values_list(*_OPERATION_FIELDS, named=True)
+        .iterator(chunk_size=READ_CHUNK_SIZE)
+    )
+    existing = {
+        (account_id, fund_id): position_id
+        for account_id, fund_id, position_id in positions.values_list("account_id", "fund_id", "id")
+    }
+
+    stats = {"pairs": 0, "updated": 0, "deleted": 0}
+    touched = set()
+    to_upsert = []
+    to_delete = []
+
+    with transaction.atomic():
+        seen = set()
+        for (account_id, fund_id), ops in itertools.groupby(
+            rows, key=lambda r: (r.account_id, r.fund_id)
+        ):
+            if pairs is not None:
+                # 账户集合 × 基金集合的笛卡尔积可能包含未标记的组合
+                if (account_id, fund_id) not in pairs:
+                    continue
+                seen.add((account_id, fund_id))
+
+            state = _new_state()
+            last_operation_date = None
+            for op in ops:
+                _apply_operation(state, op)
+                last_operation_date = op.operation_date
+
+            stats["pairs"] += 1
+            touched.add(account_id)
+            if _has_holding(state):
+                to_upsert.append(
+                    Position(
+                        account_id=account_id,
+                        fund_id=fund_id,
+                        holding_share=state["share"],
+                        holding_cost=state["cost"],
+                        holding_nav=_holding_nav(state),
+                        source_market_value=state["smv"],
+                        last_operation_date=last_operation_date,
+                    )
+                )
+            elif (account_id, fund_id) in existing:
+                to_delete.append(existing[(account_id, fund_id)])
+
+            if len(to_upsert) >= WRITE_CHUNK_SIZE:
+                stats["updated"] += _flush_upserts(to_upsert)
+            if len(to_delete) >= WRITE_CHUNK_SIZE:
+                stats["deleted"] += _flush_deletes(to_delete)
+
+        if pairs is not None:
+            # 流水已全部删除的组合
+            for key in pairs - seen:
+                stats["pairs"] += 1
+                touched.add(key[0])
+                if key in existing:
+                    to_delete.append(existing[key])
+
+        stats["updated"] += _flush_upserts(to_upsert)
+        stats["deleted"] += _flush_deletes(to_delete)
+        mark_accounts_dirty(touched)
+
+    logger.info(
+        f"批量重算持仓完成：{stats['pairs']} 个组合，"
+        f"更新 {stats['updated']} 个，删除 {stats['deleted']} 个"
+    )
+    return stats
+
+
+def _flush_upserts(to_upsert: list) -> int:
+    """批量写入持仓（按 account + fund 冲突时更新）"""
+    if not to_upsert:
+        return 0
+    Position.objects.bulk_create(
+        to_upsert,
+        update_conflicts=True,
+        unique_fields=["account", "fund"],
+        update_fields=[
+            "holding_share",
+            "holding_cost",
+            "holding_nav",
+            "source_market_value",
+            "last_operation_date",
+            "updated_at",
+        ],
+    )
+    count = len(to_upsert)
+    to_upsert.clear()
+    return count
+
+
+def _flush_deletes(to_delete: list) -> int:
+    """批量删除已清仓的持仓"""
+    if not to_delete:
+        return 0
+    Position.objects.filter(id__in=to_delete).delete()
+    count = len(to_delete)
+    to_delete.clear()
+    return count
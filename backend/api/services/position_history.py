@@ -5,12 +5,28 @@
 1. 回放流水，计算每日持仓（份额和成本）
 2. 查询每日净值
 3. 计算每日市值 = Σ(份额 × 净值)
+
+第 3 步按 基金 × 日期 对齐成 NumPy 矩阵整体计算（净值缺失的日期沿用上一个净值日），
+只在输出时转回 Decimal。
+
+过去日期的结果落表为每日估值快照（AccountValuationSnapshot），
+查询时只读取快照区间，当天及缺失快照的日期现场计算。
 """
 
+import itertools
+import uuid
+from bisect import bisect_right
 from datetime import date, timedelta
 from decimal import Decimal
 
+import numpy as np
+from django.db.models import Min
+
 from ..models import Fund, FundNavHistory, PositionOperation
+from .valuation_snapshot import load_snapshots, save_snapshots
+
+# 区间起点向前多取的净值天数，覆盖春节等长假休市，保证起点能前向填充到净值
+NAV_LOOKBACK_DAYS = 15
 
 
 def calculate_account_history(account_id: str, days: int = 30) -> list[dict]:
@@ -28,44 +44,158 @@ def calculate_account_history(account_id: str, days: int = 30) -> list[dict]:
             ...
         ]
     """
+    account_id = uuid.UUID(str(account_id))
+    return calculate_accounts_history([account_id], days).get(account_id, [])
+
+
+def calculate_accounts_history(account_ids: list, days: int = 30) -> dict:
+    """
+    批量计算多个子账户的历史市值（快照、流水、净值各一次查询）
+
+    参数:
+        account_ids: 子账户 ID 列表
+        days: 天数（默认 30）
+
+    返回:
+        {account_id: [{'date': ..., 'value': ..., 'cost': ...}, ...]}，没有流水的账户不返回
+    """
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
-
-    # 1. 获取所有操作流水（包括查询范围之前的操作）
-    operations = (
-        PositionOperation.objects.filter(account_id=account_id, operation_date__lte=end_date)
-        .select_related("fund")
-        .order_by("operation_date")
+    yesterday = end_date - timedelta(days=1)
+
+    first_dates = dict(
+        PositionOperation.objects.filter(account_id__in=account_ids, operation_date__lte=end_date)
+        .order_by()
+        .values("account_id")
+        .annotate(first_date=Min("operation_date"))
+        .values_list("account_id", "first_date")
+    )
+    if not first_dates:
+        return {}
+
+    # 1. 读取过去日期的快照（首笔流水之前的日期恒为 0，不需要快照）
+    snapshots = load_snapshots(first_dates, start_date, yesterday)
+    missing = {}
+    for account_id, first_date in first_dates.items():
+        account_snapshots = snapshots.get(account_id, {})
+        days_missing = [
+            day
+            for day in _date_range(max(start_date, first_date), yesterday)
+            if day not in account_snapshots
+        ]
+        if days_missing:
+            missing[account_id] = days_missing[0]
+
+    # 2. 从最早的缺失日期（没有缺失时只有当天）开始现场计算，缺失快照的账户补写过去日期
+    live_start = min(missing.values(), default=end_date)
+    live_rows = compute_accounts_rows(first_dates, live_start, end_date)
+    save_snapshots(
+        {
+            account_id: [row for row in live_rows.get(account_id, []) if row["date"] < end_date]
+            for account_id in missing
+        }
     )
 
-    if not operations.exists():
-        return []
+    result = {}
+    for account_id in first_dates:
+        rows = {row["date"]: row for row in live_rows.get(account_id, [])}
+        account_snapshots = snapshots.get(account_id, {})
+        history = []
+        for day in _date_range(start_date, end_date):
+            row = rows.get(day) or account_snapshots.get(day)
+            history.append(
+                {
+                    "date": day.isoformat(),
+                    "value": float(row["value"]) if row else 0.0,
+                    "cost": float(row["cost"]) if row else 0.0,
+                }
+            )
+        result[account_id] = history
+    return result
 
-    # 2. 回放流水，计算每日持仓
-    daily_positions = _replay_operations(operations, start_date, end_date)
+
+def combine_histories(histories) -> list[dict]:
+    """
+    按日期累加多个账户的历史市值（父账户 / 用户全部账户的合计曲线）
+
+    参数:
+        histories: calculate_accounts_history 返回的各账户序列（日期区间相同）
+    """
+    totals = {}
+    for history in histories:
+        for row in history:
+            total = totals.setdefault(row["date"], {"date": row["date"], "value": 0.0, "cost": 0.0})
+            total["value"] += row["value"]
+            total["cost"] += row["cost"]
+    return [
+        {"date": day, "value": round(total["value"], 4), "cost": round(total["cost"], 4)}
+        for day, total in sorted(totals.items())
+    ]
+
+
+def compute_history_rows(account_id, start_date, end_date) -> list[dict]:
+    """
+    回放流水计算区间内每天的市值（不读写快照）
+
+    返回:
+        [{'date': date, 'value': Decimal, 'cost': Decimal, 'breakdown': {...}}, ...]
+        breakdown 为 {fund_id: {'share': str, 'cost': str, 'value': str}}，
+        没有流水时返回空列表
+    """
+    return compute_accounts_rows([account_id], start_date, end_date).get(account_id, [])
+
+
+def compute_accounts_rows(account_ids, start_date, end_date) -> dict:
+    """
+    批量回放多个账户的流水：一次查询读取全部流水，净值按所有基金的并集一次加载
+
+    返回:
+        {account_id: compute_history_rows 格式的列表}，没有流水的账户不返回
+    """
+    # 1. 获取所有操作流水（包括查询范围之前的操作）
+    operations = PositionOperation.objects.filter(
+        account_id__in=account_ids, operation_date__lte=end_date
+    ).order_by("account_id", "operation_date", "created_at")
+
+    # 2. 回放流水，计算每个账户的每日持仓
+    positions_by_account = {
+        account_id: _replay_operations(ops)
+        for account_id, ops in itertools.groupby(operations, key=lambda op: op.account_id)
+    }
+    if not positions_by_account:
+        return {}
 
     # 3. 获取所有基金 ID
-    fund_ids = set(daily_positions.keys())
+    fund_ids = set()
+    for daily_positions in positions_by_account.values():
+        fund_ids.update(daily_positions.keys())
 
     # 4. 查询每日净值
-    daily_nav = _get_daily_nav(fund_ids, start_date, end_date)
+    daily_nav, latest_nav = _get_daily_nav(fund_ids, start_date, end_date)
 
     # 5. 计算每日市值
-    result = _calculate_daily_value(daily_positions, daily_nav, start_date, end_date)
+    return {
+        account_id: _calculate_daily_value(
+            daily_positions, daily_nav, latest_nav, start_date, end_date
+        )
+        for account_id, daily_positions in positions_by_account.items()
+    }
 
-    return result
 
+def _date_range(start_date, end_date):
+    """逐日遍历闭区间 [start_date, end_date]"""
+    current_date = start_date
+    while current_date <= end_date:
+        yield current_date
+        current_date += timedelta(days=1)
 
-def _replay_operations(operations, start_date, end_date):
+
+def _replay_operations(operations):
     """
     回放流水，计算每日持仓
 
-    返回: {
-        fund_id: {
-            date(2026, 2, 1): {'share': Decimal('100'), 'cost': Decimal('1000')},
-            date(2026, 2, 2): {'share': Decimal('150'), 'cost': Decimal('1500')},
-        }
-    }
+    返回: {fund_id: _StepSeries}，变化点为各操作日期操作后的持仓：
+        {'share': Decimal('100'), 'cost': Decimal('1000')}
     """
     # 当前持仓状态 {fund_id: {'share': Decimal, 'cost': Decimal}}
     current_positions = {}
@@ -110,144 +240,155 @@ def _replay_operations(operations, start_date, end_date):
             "cost": current_positions[fund_id]["cost"],
         }
 
-    # 填充日期：为每个基金填充查询范围内的所有日期
-    return _fill_dates(daily_positions, start_date, end_date)
+    # 填充日期：为每个基金生成按日期取值的持仓序列
+    return _fill_dates(daily_positions)
 
 
-def _fill_dates(daily_positions, start_date, end_date):
+class _StepSeries:
     """
-    填充日期：为每个基金填充查询范围内的所有日期
+    按变化点存储的逐日序列
 
-    逻辑：
-    - 如果某日有操作，使用操作后的持仓
-    - 如果某日无操作，使用最近一次操作后的持仓
-    - 如果该日之前没有任何操作，持仓为 0
+    只保存发生变化的日期及变化后的值，按日期取值时二分查找当日或之前最近的变化点，
+    之前没有变化点时返回 default。内存与变化点数量成正比，与查询天数无关。
     """
-    filled_positions = {}
 
-    for fund_id, positions in daily_positions.items():
-        filled_positions[fund_id] = {}
+    __slots__ = ("dates", "default", "values")
 
-        # 获取所有操作日期（排序）
-        operation_dates = sorted(positions.keys())
+    def __init__(self, points: dict, default):
+        self.dates = sorted(points)
+        self.values = [points[day] for day in self.dates]
+        self.default = default
 
-        # 遍历查询范围内的每一天
-        current_date = start_date
-        while current_date <= end_date:
-            # 找到当日或之前最近的一次操作
-            latest_position = None
-            for op_date in operation_dates:
-                if op_date <= current_date:
-                    latest_position = positions[op_date]
-                else:
-                    break
+    def get(self, day):
+        index = bisect_right(self.dates, day)
+        return self.values[index - 1] if index else self.default
 
-            # 如果找到了操作，使用该持仓；否则持仓为 0
-            if latest_position:
-                filled_positions[fund_id][current_date] = latest_position
-            else:
-                filled_positions[fund_id][current_date] = {
-                    "share": Decimal("0"),
-                    "cost": Decimal("0"),
-                }
 
-            current_date += timedelta(days=1)
+def _fill_dates(daily_positions):
+    """
+    填充日期：每个基金的持仓转为按日期取值的前向填充序列
 
-    return filled_positions
+    逻辑：
+    - 如果某日有操作，使用操作后的持仓
+    - 如果某日无操作，使用最近一次操作后的持仓
+    - 如果该日之前没有任何操作，持仓为 0
+    """
+    empty = {"share": Decimal("0"), "cost": Decimal("0")}
+    return {
+        fund_id: _StepSeries(positions, empty) for fund_id, positions in daily_positions.items()
+    }
 
 
 def _get_daily_nav(fund_ids: set[str], start_date, end_date):
     """
-    查询每日净值
+    查询每日净值（区间起点向前多取 NAV_LOOKBACK_DAYS 天，用于起点的前向填充）
 
-    返回: {
-        fund_id: {
-            date(2026, 2, 1): Decimal('1.2345'),
-            date(2026, 2, 2): Decimal('1.2400'),
-        }
-    }
+    返回: (
+        {fund_id: {date(2026, 2, 1): Decimal('1.2345'), ...}},  # 历史净值
+        {fund_id: Decimal('1.2400')},  # Fund.latest_nav，缺少历史净值的日期使用
+    )
     """
     # 查询历史净值
     nav_records = FundNavHistory.objects.filter(
-        fund_id__in=fund_ids, nav_date__gte=start_date, nav_date__lte=end_date
-    ).select_related("fund")
+        fund_id__in=fund_ids,
+        nav_date__gte=start_date - timedelta(days=NAV_LOOKBACK_DAYS),
+        nav_date__lte=end_date,
+    ).values_list("fund_id", "nav_date", "unit_nav")
 
     # 组织成字典
     daily_nav = {}
-    for record in nav_records:
-        fund_id = str(record.fund_id)
-        if fund_id not in daily_nav:
-            daily_nav[fund_id] = {}
-        daily_nav[fund_id][record.nav_date] = record.unit_nav
+    for fund_id, nav_date, unit_nav in nav_records:
+        daily_nav.setdefault(str(fund_id), {})[nav_date] = unit_nav
 
     # 查询 Fund.latest_nav 作为 fallback
-    funds = Fund.objects.filter(id__in=fund_ids)
-    fund_latest_nav = {str(f.id): f.latest_nav for f in funds if f.latest_nav}
-
-    # 填充缺失的净值（使用 latest_nav）
-    for fund_id in fund_ids:
-        if fund_id not in daily_nav:
-            daily_nav[fund_id] = {}
-
-        # 为每个日期填充净值（如果缺失，使用 latest_nav）
-        if fund_id in fund_latest_nav:
-            current_date = start_date
-            while current_date <= end_date:
-                # 如果当日没有历史净值，使用 latest_nav
-                if current_date not in daily_nav[fund_id]:
-                    daily_nav[fund_id][current_date] = fund_latest_nav[fund_id]
-                current_date += timedelta(days=1)
+    latest_nav = {
+        str(fund_id): nav
+        for fund_id, nav in Fund.objects.filter(id__in=fund_ids).values_list("id", "latest_nav")
+        if nav
+    }
 
-    return daily_nav
+    return daily_nav, latest_nav
 
 
-def _calculate_daily_value(daily_positions, daily_nav, start_date, end_date):
+def _calculate_daily_value(daily_positions, daily_nav, latest_nav, start_date, end_date):
     """
-    计算每日市值
+    计算每日市值（基金 × 日期矩阵运算）
+
+    - 份额 / 成本：按操作日期的变化点前向填充
+    - 净值：按历史净值日期前向填充（非交易日沿用上一交易日净值），
+      区间内尚无历史净值时使用 latest_nav；都没有时按成本估算市值
+    - 份额为 0 的基金不计入成本和市值
 
     返回: [
-        {'date': '2026-02-01', 'value': 10000.00, 'cost': 9500.00},
-        {'date': '2026-02-02', 'value': 10200.00, 'cost': 9500.00},
+        {'date': date(2026, 2, 1), 'value': Decimal('10000.0000'), 'cost': Decimal('9500.0000'),
+         'breakdown': {fund_id: {'share': '...', 'cost': '...', 'value': '...'}}},
+        ...
     ]
     """
-    result = []
-    current_date = start_date
+    n_days = (end_date - start_date).days + 1
+    if n_days <= 0:
+        return []
 
-    while current_date <= end_date:
-        total_value = Decimal("0")
-        total_cost = Decimal("0")
-
-        # 遍历所有基金
-        for fund_id, positions in daily_positions.items():
-            # 获取当日持仓
-            position = positions.get(current_date)
-            if not position or position["share"] == 0:
-                continue
-
-            # 成本始终计入
-            total_cost += position["cost"]
-
-            # 获取当日净值
-            nav = daily_nav.get(fund_id, {}).get(current_date)
-            if nav:
-                # 如果有净值，计算市值
-                total_value += position["share"] * nav
-            else:
-                # 如果没有净值，使用持仓净值估算市值
-                # 持仓净值 = 成本 / 份额
-                if position["share"] > 0:
-                    holding_nav = position["cost"] / position["share"]
-                    total_value += position["share"] * holding_nav
+    fund_ids = list(daily_positions)
+    day_offsets = np.arange(n_days)
+    shape = (len(fund_ids), n_days)
+    shares = np.zeros(shape)
+    costs = np.zeros(shape)
+    navs = np.full(shape, np.nan)
+    position_index = np.empty(shape, dtype=np.int64)
+
+    for row, fund_id in enumerate(fund_ids):
+        series = daily_positions[fund_id]
+        # 变化点之后追加默认值，下标 -1（当日之前无变化点）恰好取到它
+        points = [*series.values, series.default]
+        position_index[row] = _step_index(series.dates, start_date, day_offsets)
+        shares[row] = np.array([float(p["share"]) for p in points])[position_index[row]]
+        costs[row] = np.array([float(p["cost"]) for p in points])[position_index[row]]
+
+        fund_navs = daily_nav.get(fund_id, {})
+        nav_dates = sorted(fund_navs)
+        fallback = latest_nav.get(fund_id)
+        nav_points = [float(fund_navs[day]) for day in nav_dates]
+        nav_points.append(float(fallback) if fallback else np.nan)
+        navs[row] = np.array(nav_points)[_step_index(nav_dates, start_date, day_offsets)]
+
+    held = shares != 0
+    has_nav = ~np.isnan(navs) & (navs != 0)
+    # 没有净值时按持仓净值（成本 / 份额）估算，即市值 = 成本
+    estimated = np.where(shares > 0, costs, 0.0)
+    fund_values = np.where(held, np.where(has_nav, shares * navs, estimated), 0.0)
+    total_values = fund_values.sum(axis=0)
+    total_costs = np.where(held, costs, 0.0).sum(axis=0)
 
-        # 添加到结果
+    result = []
+    for offset in range(n_days):
+        breakdown = {}
+        for row in np.flatnonzero(held[:, offset]):
+            fund_id = fund_ids[row]
+            series = daily_positions[fund_id]
+            point = series.values[position_index[row, offset]]
+            breakdown[fund_id] = {
+                "share": str(point["share"]),
+                "cost": str(point["cost"]),
+                "value": _to_decimal_str(fund_values[row, offset]),
+            }
         result.append(
             {
-                "date": current_date.isoformat(),
-                "value": float(total_value),
-                "cost": float(total_cost),
+                "date": start_date + timedelta(days=offset),
+                "value": Decimal(_to_decimal_str(total_values[offset])),
+                "cost": Decimal(_to_decimal_str(total_costs[offset])),
+                "breakdown": breakdown,
             }
         )
+    return result
 
-        current_date += timedelta(days=1)
 
-    return result
+def _step_index(dates: list, start_date, day_offsets):
+    """每天对应的变化点下标（当日或之前最近的一个），之前没有变化点时为 -1"""
+    offsets = np.array([(day - start_date).days for day in dates], dtype=np.int64)
+    return np.searchsorted(offsets, day_offsets, side="right") - 1
+
+
+def _to_decimal_str(value: float) -> str:
+    """浮点结果保留 4 位小数输出"""
+    return f"{value:.4f}"
@@ -0,0 +1,89 @@
+"""
+持仓重算调度
+
+删除流水时 post_delete 信号会为每条流水触发一次全量回放，
+批量删除同一基金的 N 条流水就要回放 N 次。
+在 deferred_recalculation() 作用域内，信号只登记受影响的 (账户, 基金) 组合，
+作用域结束时（与数据变更处于同一事务）每个组合只重算一次；
+组合数达到阈值时改为事务提交后交给 Celery 异步重算。
+登记时附带流水日期的，作用域结束时一并失效对应账户自该日期起的估值快照。
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from fundval.config import config
+
+from .valuation_snapshot import invalidate_snapshots
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+@contextmanager
+def deferred_recalculation():
+    """
+    延迟持仓重算作用域
+
+    作用域内的数据变更处于同一事务中；通过 mark_dirty 登记的组合在退出时统一重算。
+    可嵌套，只有最外层作用域退出时执行；作用域内抛出异常时事务回滚，不做重算。
+    """
+    if getattr(_local, "pending", None) is not None:
+        yield
+        return
+
+    _local.pending = set()
+    _local.stale = {}
+    try:
+        with transaction.atomic():
+            yield
+            pending, _local.pending = _local.pending, None
+            invalidate_snapshots(_local.stale)
+            _flush(pending)
+    finally:
+        _local.pending = None
+        _local.stale = None
+
+
+def mark_dirty(account_id, fund_id, operation_date=None) -> bool:
+    """
+    登记需要重算的组合
+
+    Args:
+        operation_date: 变更流水的日期（可选），用于失效该日期起的估值快照
+
+    Returns:
+        bool: 处于 deferred_recalculation 作用域内返回 True（已登记），
+              否则返回 False，由调用方立即重算
+    """
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        return False
+    pending.add((account_id, fund_id))
+    if operation_date is not None:
+        since = _local.stale.get(account_id)
+        if since is None or operation_date < since:
+            _local.stale[account_id] = operation_date
+    return True
+
+
+def _flush(pending: set) -> None:
+    """重算登记的组合（超过阈值时提交后异步执行）"""
+    if not pending:
+        return
+
+    threshold = int(config.get("position_recalc_async_threshold", 0) or 0)
+    if threshold and len(pending) >= threshold:
+        from ..tasks import recalculate_positions
+
+        payload = [[str(account_id), str(fund_id)] for account_id, fund_id in pending]
+        transaction.on_commit(lambda: recalculate_positions.delay(payload))
+        logger.info(f"持仓重算已转为异步任务：{len(payload)} 个组合")
+        return
+
+    from .position_bulk import recalculate_pairs
+
+    recalculate_pairs(pending)
@@ -0,0 +1,172 @@
+"""
+账户每日估值快照
+
+历史市值曲线按天预计算落表（每个子账户每天一行：市值、成本、各基金明细），
+历史查询只按区间读取快照，当天及缺失快照的日期现场计算（见 position_history）。
+
+快照在以下情况失效（删除受影响日期及之后的行，下次查询或回填时重新计算）：
+- 新增 / 删除流水：该账户自流水日期起
+- 写入历史净值：持有该基金的账户自净值日期起
+"""
+
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Min, Q
+
+from ..models import AccountValuationSnapshot, PositionOperation
+
+logger = logging.getLogger(__name__)
+
+# bulk_create 每批行数
+WRITE_BATCH_SIZE = 1000
+
+_AMOUNT_QUANT = Decimal("0.0001")
+
+
+def load_snapshots(account_ids, start_date, end_date) -> dict:
+    """
+    读取多个账户区间内的快照（一次查询）
+
+    Returns:
+        {account_id: {date: {'value': Decimal, 'cost': Decimal}}}
+    """
+    snapshots = {}
+    for row in AccountValuationSnapshot.objects.filter(
+        account_id__in=account_ids, snapshot_date__gte=start_date, snapshot_date__lte=end_date
+    ).values("account_id", "snapshot_date", "value", "cost"):
+        snapshots.setdefault(row["account_id"], {})[row["snapshot_date"]] = row
+    return snapshots
+
+
+def save_snapshots(rows_by_account: dict) -> int:
+    """
+    写入快照（同一账户同一日期已存在时覆盖）
+
+    Args:
+        rows_by_account: {account_id: compute_history_rows 的返回}
+
+    Returns:
+        写入的行数
+    """
+    snapshots = [
+        AccountValuationSnapshot(
+            account_id=account_id,
+            snapshot_date=row["date"],
+            value=row["value"].quantize(_AMOUNT_QUANT),
+            cost=row["cost"].quantize(_AMOUNT_QUANT),
+            breakdown=row["breakdown"],
+        )
+        for account_id, rows in rows_by_account.items()
+        for row in rows
+    ]
+    if not snapshots:
+        return 0
+    AccountValuationSnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=WRITE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["account", "snapshot_date"],
+        update_fields=["value", "cost", "breakdown", "updated_at"],
+    )
+    return len(snapshots)
+
+
+def invalidate_snapshots(stale: dict) -> None:
+    """
+    删除流水变更后失效的快照
+
+    Args:
+        stale: {account_id: 最早受影响的日期}
+    """
+    if not stale:
+        return
+    condition = Q()
+    for account_id, since in stale.items():
+        condition |= Q(account_id=account_id, snapshot_date__gte=since)
+    AccountValuationSnapshot.objects.filter(condition).delete()
+
+
+def invalidate_fund_snapshots(stale: dict) -> None:
+    """
+    删除历史净值变更后失效的快照（持有该基金的账户）
+
+    Args:
+        stale: {fund_id: 最早受影响的净值日期}
+    """
+    if not stale:
+        return
+    # 按日期分组：批量净值更新通常只涉及一两个日期
+    funds_by_date = {}
+    for fund_id, since in stale.items():
+        funds_by_date.setdefault(since, []).append(fund_id)
+
+    condition = Q()
+    for since, fund_ids in funds_by_date.items():
+        condition |= Q(
+            account_id__in=PositionOperation.objects.filter(fund_id__in=fund_ids).values(
+                "account_id"
+            ),
+            snapshot_date__gte=since,
+        )
+    AccountValuationSnapshot.objects.filter(condition).delete()
+
+
+def snapshot_accounts(snapshot_date: date | None = None) -> int:
+    """
+    为所有有流水的子账户写入指定日期的快照（默认当天，每晚净值更新后执行）
+
+    Returns:
+        写入的快照数
+    """
+    from .position_history import compute_accounts_rows
+
+    snapshot_date = snapshot_date or date.today()
+    account_ids = (
+        PositionOperation.objects.filter(operation_date__lte=snapshot_date)
+        .order_by()
+        .values_list("account_id", flat=True)
+        .distinct()
+    )
+
+    count = save_snapshots(compute_accounts_rows(account_ids, snapshot_date, snapshot_date))
+    logger.info(f"写入 {snapshot_date} 账户估值快照 {count} 个")
+    return count
+
+
+def backfill_snapshots(days: int, account_id=None) -> dict:
+    """
+    回填最近 days 天（不含当天）的快照，每个账户回放一次流水
+
+    Args:
+        days: 回填天数
+        account_id: 指定账户（可选，不指定则回填所有有流水的子账户）
+
+    Returns:
+        {'accounts': 账户数, 'snapshots': 写入的快照数}
+    """
+    from .position_history import compute_history_rows
+
+    end_date = date.today() - timedelta(days=1)
+    start_date = end_date - timedelta(days=days - 1)
+
+    operations = PositionOperation.objects.filter(operation_date__lte=end_date)
+    if account_id:
+        operations = operations.filter(account_id=account_id)
+    first_dates = {
+        row["account_id"]: row["first_date"]
+        for row in operations.order_by()
+        .values("account_id")
+        .annotate(first_date=Min("operation_date"))
+    }
+
+    stats = {"accounts": 0, "snapshots": 0}
+    for target_id, first_date in first_dates.items():
+        # 首笔流水之前的日期恒为 0，不写快照
+        rows = compute_history_rows(target_id, max(start_date, first_date), end_date)
+        with transaction.atomic():
+            stats["snapshots"] += save_snapshots({target_id: rows})
+        stats["accounts"] += 1
+    return stats
@@ -150,6 +150,17 @@ class BaseEstimateSource(ABC):
     ) -> list:
         """获取历史净值"""
 
+    def iter_nav_history(
+        self, fund_code: str, start_date: date | None = None, end_date: date | None = None
+    ):
+        """
+        逐条产出历史净值（非必选实现）
+
+        默认基于 fetch_nav_history 的列表结果。
+        单只基金历史数据量大的数据源可 override 为流式解析。
+        """
+        yield from self.fetch_nav_history(fund_code, start_date, end_date) or []
+
     def fetch_market_quote(self, fund_code: str) -> dict:
         """
         获取场内实时价格（非必选实现）
@@ -10,6 +10,7 @@ from decimal import Decimal
 
 import requests
 
+from ..utils.json_stream import iter_json_array
 from .base import BaseEstimateSource
 
 logger = logging.getLogger(__name__)
@@ -33,6 +34,8 @@ class EastMoneySource(BaseEstimateSource):
     # 移动端 API（作为 Web API 的 fallback，提升净值覆盖率）
     MOBILE_NAV_HISTORY_URL = "https://fundmobapi.eastmoney.com/FundMNewApi/FundMNHisNetList"
     MOBILE_REALTIME_NAV_URL = "https://fundmobapi.eastmoney.com/FundMNewApi/FundMNFInfo"
+    # 流式读取历史净值时每次读取的字节数
+    STREAM_CHUNK_SIZE = 64 * 1024
 
     MOBILE_HEADERS = {
         "User-Agent": (
@@ -260,7 +263,8 @@ class EastMoneySource(BaseEstimateSource):
         使用 FundMNFInfo 批量接口，取单只基金的最新净值。
 
         Returns:
-            dict: {'fund_code': str, 'nav': Decimal, 'nav_date': date}
+            dict: {'fund_code': str, 'nav': Decimal, 'nav_date': date,
+                   'unit_nav', 'accumulated_nav', 'daily_growth'}
             失败返回 None
         """
         try:
@@ -306,6 +310,7 @@ class EastMoneySource(BaseEstimateSource):
                 "fund_code": fund_code,
                 "nav": Decimal(str(nav_str)),
                 "nav_date": datetime.strptime(date_str, "%Y-%m-%d").date(),
+                **self.parse_mnfinfo_nav_fields(item),
             }
 
         except requests.RequestException as e:
@@ -318,6 +323,30 @@ class EastMoneySource(BaseEstimateSource):
             logger.warning(f"移动端净值查询失败（未知）：{fund_code}, 错误：{e}")
             return None
 
+    @staticmethod
+    def parse_mnfinfo_nav_fields(item: dict) -> dict:
+        """
+        解析 FundMNFInfo 记录中写入历史净值所需的字段
+
+        Returns:
+            {'unit_nav': NAV, 'accumulated_nav': ACCNAV, 'daily_growth': NAVCHGRT}
+            缺失或无法解析（如 "--"）的字段为 None
+        """
+
+        def to_decimal(value):
+            if value in (None, "", "--"):
+                return None
+            try:
+                return Decimal(str(value))
+            except Exception:
+                return None
+
+        return {
+            "unit_nav": to_decimal(item.get("NAV")),
+            "accumulated_nav": to_decimal(item.get("ACCNAV")),
+            "daily_growth": to_decimal(item.get("NAVCHGRT")),
+        }
+
     def fetch_fund_list(self) -> list:
         """
         从天天基金获取基金列表
@@ -597,23 +626,7 @@ class EastMoneySource(BaseEstimateSource):
             失败返回空列表
         """
         try:
-            params = {
-                "FCODE": fund_code,
-                "IsShareNet": "true",
-                "MobileKey": "1",
-                "appType": "ttjj",
-                "appVersion": "6.2.8",
-                "cToken": "1",
-                "deviceid": "1",
-                "pageIndex": "1",
-                "pageSize": "100000",
-                "plat": "Iphone",
-                "product": "EFund",
-                "serverVersion": "6.2.8",
-                "uToken": "1",
-                "userId": "1",
-                "version": "6.2.8",
-            }
+            params = self._mobile_nav_history_params(fund_code)
             response = requests.get(
                 self.MOBILE_NAV_HISTORY_URL,
                 params=params,
@@ -633,47 +646,9 @@ class EastMoneySource(BaseEstimateSource):
 
             result = []
             for item in items:
-                # 必需字段：FSRQ（日期）和 DWJZ（单位净值）
-                date_str = item.get("FSRQ")
-                nav_str = item.get("DWJZ")
-                if not date_str or not nav_str:
-                    continue
-
-                try:
-                    nav_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                except (ValueError, TypeError):
-                    continue
-
-                # 日期过滤
-                if start_date and nav_date < start_date:
-                    continue
-                if end_date and nav_date > end_date:
-                    continue
-
-                accumulated_nav = None
-                ljjz_str = item.get("LJJZ")
-                if ljjz_str:
-                    try:
-                        accumulated_nav = Decimal(str(ljjz_str))
-                    except Exception:
-                        pass
-
-                daily_growth = None
-                jzzzl_str = item.get("JZZZL")
-                if jzzzl_str:
-                    try:
-                        daily_growth = Decimal(str(jzzzl_str))
-                    except Exception:
-                        pass
-
-                result.append(
-                    {
-                        "nav_date": nav_date,
-                        "unit_nav": Decimal(str(nav_str)),
-                        "accumulated_nav": accumulated_nav,
-                        "daily_growth": daily_growth,
-                    }
-                )
+                row = self._parse_mobile_nav_item(item, start_date, end_date)
+                if row:
+                    result.append(row)
 
             return result
 
@@ -687,6 +662,113 @@ class EastMoneySource(BaseEstimateSource):
             logger.warning(f"移动端历史净值获取失败（未知）：{fund_code}, 错误：{e}")
             return []
 
+    def iter_nav_history(
+        self,
+        fund_code: str,
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ):
+        """
+        流式获取基金历史净值（FundMNHisNetList）
+
+        全量历史可能有上万条，这里按块读取响应体并增量解析，
+        逐条产出与 fetch_nav_history 相同格式的记录，内存占用不随历史长度增长。
+        失败时记录日志并结束迭代（已产出的记录仍有效）。
+        """
+        try:
+            with requests.get(
+                self.MOBILE_NAV_HISTORY_URL,
+                params=self._mobile_nav_history_params(fund_code),
+                headers=self.MOBILE_HEADERS,
+                timeout=30,
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)
+                for item in iter_json_array(chunks, "Datas"):
+                    row = self._parse_mobile_nav_item(item, start_date, end_date)
+                    if row:
+                        yield row
+
+        except requests.RequestException as e:
+            logger.warning(f"移动端历史净值获取失败（网络）：{fund_code}, 错误：{e}")
+        except (json.JSONDecodeError, ValueError, TypeError) as e:
+            logger.warning(f"移动端历史净值获取失败（解析）：{fund_code}, 错误：{e}")
+
+    @staticmethod
+    def _mobile_nav_history_params(fund_code: str) -> dict:
+        """FundMNHisNetList 请求参数"""
+        return {
+            "FCODE": fund_code,
+            "IsShareNet": "true",
+            "MobileKey": "1",
+            "appType": "ttjj",
+            "appVersion": "6.2.8",
+            "cToken": "1",
+            "deviceid": "1",
+            "pageIndex": "1",
+            "pageSize": "100000",
+            "plat": "Iphone",
+            "product": "EFund",
+            "serverVersion": "6.2.8",
+            "uToken": "1",
+            "userId": "1",
+            "version": "6.2.8",
+        }
+
+    @staticmethod
+    def _parse_mobile_nav_item(
+        item, start_date: date | None = None, end_date: date | None = None
+    ) -> dict | None:
+        """
+        解析 FundMNHisNetList 单条记录
+
+        Returns:
+            标准化后的净值记录；字段缺失、格式错误或不在日期范围内返回 None
+        """
+        if not isinstance(item, dict):
+            return None
+
+        # 必需字段：FSRQ（日期）和 DWJZ（单位净值）
+        date_str = item.get("FSRQ")
+        nav_str = item.get("DWJZ")
+        if not date_str or not nav_str:
+            return None
+
+        try:
+            nav_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except (ValueError, TypeError):
+            return None
+
+        # 日期过滤
+        if start_date and nav_date < start_date:
+            return None
+        if end_date and nav_date > end_date:
+            return None
+
+        accumulated_nav = None
+        ljjz_str = item.get("LJJZ")
+        if ljjz_str:
+            try:
+                accumulated_nav = Decimal(str(ljjz_str))
+            except Exception:
+                pass
+
+        daily_growth = None
+        jzzzl_str = item.get("JZZZL")
+        if jzzzl_str:
+            try:
+                daily_growth = Decimal(str(jzzzl_str))
+            except Exception:
+                pass
+
+        return {
+            "nav_date": nav_date,
+            "unit_nav": Decimal(str(nav_str)),
+            "accumulated_nav": accumulated_nav,
+            "daily_growth": daily_growth,
+        }
+
     def fetch_index_holdings(self, fund_code: str) -> list:
         """
         获取基金持仓成分股（含实时行情）
@@ -221,6 +221,7 @@ def capture_intraday_snapshots():
     from django.utils import timezone
 
     from api.models import EstimateSnapshot, Fund, Position
+    from api.services.account_summary import deferred_summary_refresh
     from api.sources import SourceRegistry
     from api.utils.trading_calendar import is_trading_day
 
@@ -266,33 +267,82 @@ def capture_intraday_snapshots():
             s.set_token(cred.token)
         sources.append(s)
 
+    # 估值变化涉及的账户汇总在循环结束后统一刷新
     count = 0
-    for fund in funds:
-        for source in sources:
-            try:
-                data = source.fetch_estimate(fund.fund_code)
-                if data and data.get("estimate_nav"):
-                    EstimateSnapshot.objects.create(
-                        fund=fund,
-                        source=source.get_source_name(),
-                        timestamp=now,
-                        estimate_nav=data["estimate_nav"],
-                        estimate_growth=data.get("estimate_growth"),
-                    )
-                    # 同时更新 Fund 表的估值缓存
-                    fund.estimate_nav = data["estimate_nav"]
-                    fund.estimate_growth = data.get("estimate_growth")
-                    fund.estimate_time = now
-                    fund.save(update_fields=["estimate_nav", "estimate_growth", "estimate_time"])
-                    count += 1
-                    break
-            except Exception:
-                continue
+    with deferred_summary_refresh():
+        for fund in funds:
+            for source in sources:
+                try:
+                    data = source.fetch_estimate(fund.fund_code)
+                    if data and data.get("estimate_nav"):
+                        EstimateSnapshot.objects.create(
+                            fund=fund,
+                            source=source.get_source_name(),
+                            timestamp=now,
+                            estimate_nav=data["estimate_nav"],
+                            estimate_growth=data.get("estimate_growth"),
+                        )
+                        # 同时更新 Fund 表的估值缓存
+                        fund.estimate_nav = data["estimate_nav"]
+                        fund.estimate_growth = data.get("estimate_growth")
+                        fund.estimate_time = now
+                        fund.save(
+                            update_fields=["estimate_nav", "estimate_growth", "estimate_time"]
+                        )
+                        count += 1
+                        break
+                except Exception:
+                    continue
+
+    # 估值涨幅变化后重建涨幅榜快照
+    if count:
+        from api.services.fund_ranking import rebuild_rankings
+
+        rebuild_rankings(["gain"])
 
     logger.info(f"已抓取 {count} 个基金的估值快照")
     return f"已抓取 {count} 个快照"
 
 
+@shared_task
+def refresh_fund_metrics():
+    """
+    每晚重算基金收益风险指标
+
+    在净值更新之后执行，只重算写入了新历史净值的基金（以及还没有指标的基金）。
+    """
+    from api.services.fund_metrics import refresh_fund_metrics as refresh
+
+    count = refresh()
+    return f"已刷新 {count} 只基金指标"
+
+
+@shared_task
+def rebuild_fund_rankings():
+    """
+    每晚重建基金排行榜快照
+
+    在净值更新与准确率审计之后执行（人气榜、准度榜只在这里重建，涨幅榜盘中随估值抓取重建）。
+    """
+    from api.services.fund_ranking import rebuild_rankings
+
+    count = rebuild_rankings()
+    return f"已重建排行榜 {count} 行"
+
+
+@shared_task
+def snapshot_account_valuations():
+    """
+    每晚写入当日账户估值快照
+
+    在净值更新之后执行，历史市值查询直接读取快照，只有当天现场计算。
+    """
+    from api.services.valuation_snapshot import snapshot_accounts
+
+    count = snapshot_accounts()
+    return f"已写入 {count} 个估值快照"
+
+
 @shared_task
 def generate_investment_reports():
     """
@@ -386,3 +436,24 @@ def generate_investment_reports():
     summary = f"{generated} reports generated, {skip_ai} skipped (no AI config), {skip_disabled} skipped (disabled)"
     logger.info(summary)
     return summary
+
+
+@shared_task
+def recalculate_positions(pairs):
+    """
+    异步重算持仓
+
+    批量删除流水涉及的组合数超过 position_recalc_async_threshold 时，
+    由 api.services.recalc_queue 在事务提交后投递。
+
+    Args:
+        pairs: [[account_id, fund_id], ...]
+    """
+    from api.services.position_bulk import recalculate_pairs
+
+    stats = recalculate_pairs(pairs)
+    summary = (
+        f"重算 {stats['pairs']} 个组合，更新 {stats['updated']} 个，删除 {stats['deleted']} 个"
+    )
+    logger.info(summary)
+    return summary
@@ -54,6 +54,10 @@ urlpatterns = [
         "positions/operations/batch_delete/",
         viewsets.PositionOperationViewSet.as_view({"post": "batch_delete"}),
     ),
+    path(
+        "positions/operations/bulk_import/",
+        viewsets.PositionOperationViewSet.as_view({"post": "bulk_import"}),
+    ),
     path(
         "positions/operations/<uuid:pk>/",
         viewsets.PositionOperationViewSet.as_view({"get": "retrieve", "delete": "destroy"}),
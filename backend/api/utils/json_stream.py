@@ -0,0 +1,148 @@
+"""
+流式 JSON 解析
+
+用于解析上游返回的大体量 JSON（如全量历史净值），
+按块读取响应体，逐个产出目标数组中的元素，不在内存中构建完整的对象树。
+"""
+
+import codecs
+import json
+from collections.abc import Iterable, Iterator
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(chunks: Iterable[bytes | str], key: str) -> Iterator:
+    """
+    逐个产出顶层对象中 key 对应数组的元素
+
+    形如 {"Datas": [{...}, {...}], "ErrCode": 0} 的响应，
+    iter_json_array(chunks, "Datas") 依次产出数组中的每个元素。
+    已产出的元素会从缓冲区中丢弃，内存占用只与单个元素大小相关。
+
+    Args:
+        chunks: 响应体分块（bytes 按 UTF-8 增量解码，跨块的多字节字符可正确处理）
+        key: 顶层对象中的数组字段名
+
+    Returns:
+        元素生成器；key 不存在或对应值不是数组时不产出任何元素
+
+    Raises:
+        json.JSONDecodeError: 响应体不是合法 JSON
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    source = iter(chunks)
+
+    def read() -> str | None:
+        """读取下一块文本，数据读完返回 None"""
+        for chunk in source:
+            text = utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                return text
+        tail = utf8.decode(b"", final=True)
+        return tail or None
+
+    # 阶段一：在顶层对象中定位 "key": [
+    buf = ""
+    pos = 0
+    depth = 0
+    in_string = False
+    escaped = False
+    string_start = 0
+    last_key = None
+    found = False
+    while not found:
+        if pos >= len(buf):
+            text = read()
+            if text is None:
+                return
+            # 只保留当前未闭合字符串（可能是目标 key）的内容
+            if in_string:
+                buf = buf[string_start:] + text
+                pos -= string_start
+                string_start = 0
+            else:
+                buf = text
+                pos = 0
+
+        ch = buf[pos]
+        pos += 1
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                if depth == 1:
+                    last_key = buf[string_start : pos - 1]
+        elif ch == '"':
+            in_string = True
+            string_start = pos
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth <= 0:
+                return
+        elif ch == ":" and depth == 1 and last_key == key:
+            found = True
+        elif ch == ",":
+            last_key = None
+
+    buf = buf[pos:]
+    pos = 0
+
+    def fill() -> bool:
+        """向缓冲区追加数据，数据读完返回 False"""
+        nonlocal buf
+        text = read()
+        if text is None:
+            return False
+        buf += text
+        return True
+
+    def skip_whitespace() -> bool:
+        """跳过空白，返回缓冲区中是否还有字符"""
+        nonlocal buf, pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return True
+            buf, pos = "", 0
+            if not fill():
+                return False
+
+    if not skip_whitespace() or buf[pos] != "[":
+        return
+    pos += 1
+
+    # 阶段二：逐个解码数组元素
+    while True:
+        if not skip_whitespace():
+            raise json.JSONDecodeError("数组未闭合", buf, pos)
+        if buf[pos] == "]":
+            return
+        if buf[pos] == ",":
+            pos += 1
+            if not skip_whitespace():
+                raise json.JSONDecodeError("数组未闭合", buf, pos)
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # 元素跨块：继续读取后重试
+                if fill():
+                    continue
+                raise
+            # 数字等标量恰好停在缓冲区末尾时可能被截断，补读确认
+            if end == len(buf) and fill():
+                continue
+            break
+
+        yield item
+        buf = buf[end:]
+        pos = 0
@@ -52,3 +52,30 @@ def get_last_trading_day(d: date) -> date:
 
     # 如果 30 天内都没有交易日，返回原日期（理论上不会发生）
     return d
+
+
+def get_trading_days(start: date, end: date) -> list[date]:
+    """
+    获取区间内的所有交易日（含首尾）
+
+    周末调休的"工作日"交易所不开市，因此额外排除周六日。
+    chinese_calendar 不支持的年份无法判断节假日，这些日期不计入交易日。
+
+    Args:
+        start: 开始日期
+        end: 结束日期
+
+    Returns:
+        list[date]: 升序排列的交易日列表，start > end 时返回空列表
+    """
+    days = []
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            try:
+                if is_trading_day(current):
+                    days.append(current)
+            except NotImplementedError:
+                pass
+        current += timedelta(days=1)
+    return days
@@ -185,12 +185,30 @@ def _replace_placeholders(template: str, context_data: dict) -> str:
     return template
 
 
+def _fund_metrics_text(fund) -> str:
+    """持仓明细追加预计算的基金指标（近 1 年收益、最大回撤），没有指标时为空"""
+    from .models import FundMetrics
+
+    try:
+        metrics = fund.metrics
+    except FundMetrics.DoesNotExist:
+        return ""
+
+    parts = []
+    if metrics.return_1y is not None:
+        parts.append(f"近1年 {metrics.return_1y:.2f}%")
+    if metrics.max_drawdown is not None:
+        parts.append(f"最大回撤 {metrics.max_drawdown:.2f}%")
+    return f", {', '.join(parts)}" if parts else ""
+
+
 def build_report_context(user, period="weekly"):
     """构建投资报告占位符上下文数据"""
     from datetime import timedelta
     from decimal import Decimal
 
     from .models import Account, Position
+    from .services.account_metrics import compute_account_metrics
 
     today = timezone.localdate()
 
@@ -224,10 +242,13 @@ def build_report_context(user, period="weekly"):
     total_cost = Decimal("0")
     total_pnl = Decimal("0")
 
+    # 一次遍历预加载的持仓，算出所有账户的汇总指标
+    metrics = compute_account_metrics(accounts)
+
     for acc in accounts:
-        val = Decimal(acc.holding_value or 0)
-        cost = Decimal(acc.holding_cost or 0)
-        pnl = Decimal(acc.pnl or 0)
+        val = Decimal(metrics[acc.id]["holding_value"] or 0)
+        cost = Decimal(metrics[acc.id]["holding_cost"] or 0)
+        pnl = Decimal(metrics[acc.id]["pnl"] or 0)
         total_value += val
         total_cost += cost
         total_pnl += pnl
@@ -236,7 +257,9 @@ def build_report_context(user, period="weekly"):
     pnl_rate = f"{(total_pnl / total_cost * 100):.2f}%" if total_cost > 0 else "0%"
 
     # 持仓明细
-    positions = Position.objects.filter(account__user=user).select_related("account", "fund")
+    positions = Position.objects.filter(account__user=user).select_related(
+        "account", "fund", "fund__metrics"
+    )
     if not positions.exists():
         return {
             "account_summary": "\n".join(account_summary),
@@ -257,7 +280,7 @@ def build_report_context(user, period="weekly"):
         position_lines.append(
             f"- {pos.fund.fund_name}({pos.fund.fund_code}): "
             f"{pos.holding_share:.4f}份, 成本 ¥{pos.holding_cost:.2f}, "
-            f"市值 ¥{market_value:.2f}, 盈亏 ¥{pnl_val:.2f}({pnl_r})"
+            f"市值 ¥{market_value:.2f}, 盈亏 ¥{pnl_val:.2f}({pnl_r})" + _fund_metrics_text(pos.fund)
         )
         fund_perf.append((pos.fund.fund_name, pnl_val, pnl_r))
 
@@ -21,7 +21,6 @@ from .models import (
     Account,
     AIConfig,
     AIPromptTemplate,
-    EstimateAccuracy,
     Fund,
     FundNavHistory,
     NotificationChannel,
@@ -36,6 +35,7 @@ from .serializers import (
     AccountSerializer,
     AIConfigSerializer,
     AIPromptTemplateSerializer,
+    FundNavHistoryRowSerializer,
     FundNavHistorySerializer,
     FundSerializer,
     NotificationChannelSerializer,
@@ -48,6 +48,8 @@ from .serializers import (
     WatchlistSerializer,
 )
 from .services import recalculate_all_positions
+from .services.account_summary import deferred_summary_refresh
+from .services.recalc_queue import deferred_recalculation
 from .sources import SourceRegistry
 
 logger = logging.getLogger(__name__)
@@ -228,159 +230,82 @@ class FundViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="rankings")
     def rankings(self, request):
-        """GET /api/funds/rankings/?type=gain&category=股票型 — 排行榜"""
-        from django.core.paginator import Paginator
-        from django.db.models import Avg, Count
+        """GET /api/funds/rankings/?type=gain&category=股票型 — 排行榜（读取预建快照）"""
+        from .services.fund_ranking import load_ranking
 
         rank_type = request.query_params.get("type", "gain")
         category = request.query_params.get("category", "")
         page = int(request.query_params.get("page", 1))
         page_size = 20
 
-        if rank_type == "popular":
-            queryset = (
-                Fund.objects.annotate(pos_count=Count("positions"))
-                .filter(pos_count__gt=0)
-                .order_by("-pos_count")
-            )
-        elif rank_type == "accuracy":
-            from django.db.models.functions import Abs
-
-            queryset = (
-                Fund.objects.annotate(avg_error=Avg(Abs("accuracy_records__error_rate")))
-                .filter(avg_error__isnull=False)
-                .order_by("avg_error")
-            )
-        else:
-            queryset = Fund.objects.exclude(estimate_growth__isnull=True).order_by(
-                "-estimate_growth"
-            )
-
-        if category:
-            queryset = queryset.filter(fund_type__icontains=category)
-
-        paginator = Paginator(queryset, page_size)
-        page_obj = paginator.get_page(page)
+        count, rankings = load_ranking(rank_type, category, page, page_size)
 
         results = []
-        for f in page_obj:
+        for ranking in rankings:
+            f = ranking.fund
+            # 涨幅榜返回快照中的排序值，保证一页内的涨幅与名次一致（重建前不随实时估值变化）
+            growth = f.estimate_growth
+            if rank_type not in ("popular", "accuracy"):
+                growth = ranking.value.quantize(Decimal("0.0001"))
             item = {
                 "fund_code": f.fund_code,
                 "fund_name": f.fund_name,
                 "fund_type": f.fund_type,
                 "latest_nav": str(f.latest_nav) if f.latest_nav else None,
-                "estimate_growth": (str(f.estimate_growth) if f.estimate_growth else None),
+                "estimate_growth": (str(growth) if growth else None),
             }
             if rank_type == "popular":
-                item["pos_count"] = getattr(f, "pos_count", 0)
+                item["pos_count"] = int(ranking.value)
             if rank_type == "accuracy":
-                item["avg_error"] = str(round(getattr(f, "avg_error", 0) or 0, 4))
+                item["avg_error"] = str(round(ranking.value, 4))
             results.append(item)
 
-        return Response({"count": paginator.count, "results": results})
+        return Response({"count": count, "results": results})
+
+    @action(detail=False, methods=["get"], url_path="screen")
+    def screen(self, request):
+        """GET /api/funds/screen/?return_1y_min=10&max_drawdown_min=-20&ordering=-sharpe — 基金筛选"""
+        from .services.fund_screener import ScreenerError, screen_funds
+
+        try:
+            data = screen_funds(request.query_params, cursor=request.query_params.get("cursor"))
+        except ScreenerError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
 
     @action(detail=False, methods=["get"], url_path="compare")
     def compare(self, request):
         """GET /api/funds/compare/?codes=000001,161725 — 多基金对比"""
-        from datetime import date, timedelta
+        from .services.fund_metrics import EMPTY_METRICS, EMPTY_RETURNS, load_fund_metrics
 
         codes_str = request.query_params.get("codes", "")
         codes = [c.strip() for c in codes_str.split(",") if c.strip()]
 
+        max_funds = int(config.get("fund_compare_max_funds", 20) or 20)
         if len(codes) < 2:
             return Response({"error": "至少选择 2 只基金"}, status=status.HTTP_400_BAD_REQUEST)
-        if len(codes) > 5:
-            return Response({"error": "最多对比 5 只基金"}, status=status.HTTP_400_BAD_REQUEST)
-
-        funds = Fund.objects.filter(fund_code__in=codes)
-        fund_map = {f.fund_code: f for f in funds}
-
-        today = date.today()
-        periods = {"1m": 30, "3m": 90, "6m": 180, "1y": 365}
-
-        def calc_returns(nav_list):
-            result = {}
-            for period_name, days in periods.items():
-                cutoff = today - timedelta(days=days)
-                start_nav = None
-                for n in nav_list:
-                    if n.nav_date <= cutoff:
-                        start_nav = n
-                end_nav = nav_list[-1] if nav_list else None
-                if start_nav and end_nav and start_nav.unit_nav > 0:
-                    result[period_name] = str(
-                        round(
-                            (end_nav.unit_nav - start_nav.unit_nav) / start_nav.unit_nav * 100,
-                            2,
-                        )
-                    )
-                else:
-                    result[period_name] = None
-            return result
-
-        def calc_metrics(nav_list):
-            if len(nav_list) < 60:
-                return {"max_drawdown": None, "volatility": None, "sharpe": None}
-
-            vals = [float(n.unit_nav) for n in nav_list]
-            # 最大回撤
-            peak = vals[0]
-            max_dd = 0.0
-            for v in vals:
-                if v > peak:
-                    peak = v
-                dd = (peak - v) / peak if peak > 0 else 0
-                if dd > max_dd:
-                    max_dd = dd
-
-            # 波动率（年化标准差，按 252 个交易日）
-            daily_returns = [(vals[i] - vals[i - 1]) / vals[i - 1] for i in range(1, len(vals))]
-            if len(daily_returns) < 2:
-                return {
-                    "max_drawdown": str(round(-max_dd * 100, 2)),
-                    "volatility": None,
-                    "sharpe": None,
-                }
-
-            mean = sum(daily_returns) / len(daily_returns)
-            variance = sum((r - mean) ** 2 for r in daily_returns) / (len(daily_returns) - 1)
-            annual_vol = (variance**0.5) * (252**0.5)
-
-            # 夏普比率 (无风险利率 2%)
-            avg_daily = mean
-            annual_return = avg_daily * 252
-            sharpe = (annual_return - 0.02) / annual_vol if annual_vol > 0 else None
+        if len(codes) > max_funds:
+            return Response(
+                {"error": f"最多对比 {max_funds} 只基金"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
-            return {
-                "max_drawdown": str(round(-max_dd * 100, 2)),
-                "volatility": str(round(annual_vol * 100, 2)),
-                "sharpe": str(round(sharpe, 2)) if sharpe is not None else None,
-            }
+        fund_map = {f.fund_code: f for f in Fund.objects.filter(fund_code__in=codes)}
+        computed = load_fund_metrics([f.id for f in fund_map.values()])
 
         result = []
         for code in codes:
             fund = fund_map.get(code)
             if not fund:
                 continue
-            nav_list = list(
-                FundNavHistory.objects.filter(fund=fund, nav_date__lte=today).order_by("nav_date")
-            )
-
-            returns = calc_returns(nav_list) if nav_list else dict.fromkeys(periods)
-            metrics = (
-                calc_metrics(nav_list)
-                if nav_list
-                else {"max_drawdown": None, "volatility": None, "sharpe": None}
-            )
-
+            values = computed.get(fund.id, {})
             result.append(
                 {
                     "fund_code": fund.fund_code,
                     "fund_name": fund.fund_name,
                     "fund_type": fund.fund_type or "未知",
                     "latest_nav": str(fund.latest_nav) if fund.latest_nav else None,
-                    "returns": returns,
-                    "metrics": metrics,
+                    "returns": values.get("returns", dict(EMPTY_RETURNS)),
+                    "metrics": values.get("metrics", dict(EMPTY_METRICS)),
                 }
             )
 
@@ -495,47 +420,16 @@ class FundViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=True, methods=["get"])
     def accuracy(self, request, fund_code=None):
-        """获取基金各数据源准确率"""
-        fund = self.get_object()
-        days = int(request.query_params.get("days", 100))
-
-        # 获取最近 N 天的准确率记录
-        records = EstimateAccuracy.objects.filter(fund=fund, error_rate__isnull=False).order_by(
-            "-estimate_date"
-        )[:days]
-
-        # 按数据源分组统计
-        result = {}
-        for record in records:
-            source_name = record.source_name
-            if source_name not in result:
-                result[source_name] = {
-                    "records": [],
-                    "total_error": Decimal("0"),
-                    "count": 0,
-                }
+        """获取基金各数据源准确率（读取滚动汇总，附最近记录明细）"""
+        from .services.accuracy_rollup import load_fund_accuracy, recent_records, resolve_window
 
-            result[source_name]["records"].append(
-                {
-                    "date": record.estimate_date,
-                    "estimate_nav": record.estimate_nav,
-                    "actual_nav": record.actual_nav,
-                    "error_rate": record.error_rate,
-                }
-            )
-            result[source_name]["total_error"] += record.error_rate
-            result[source_name]["count"] += 1
+        fund = self.get_object()
+        window = resolve_window(request.query_params)
 
-        # 计算平均误差率
+        result = load_fund_accuracy(fund, window)
+        records = recent_records(fund, result.keys(), window) if result else {}
         for source_name, data in result.items():
-            if data["count"] > 0:
-                data["avg_error_rate"] = data["total_error"] / data["count"]
-            else:
-                data["avg_error_rate"] = Decimal("0")
-
-            data["record_count"] = data["count"]
-            del data["total_error"]
-            del data["count"]
+            data["records"] = records.get(source_name, [])
 
         return Response(result)
 
@@ -647,7 +541,7 @@ class FundViewSet(viewsets.ReadOnlyModelViewSet):
                     else:
                         source._token = credential.token
 
-            with ThreadPoolExecutor(max_workers=5) as executor:
+            with ThreadPoolExecutor(max_workers=5) as executor, deferred_summary_refresh():
                 futures = {
                     executor.submit(source.fetch_estimate, code): code for code in need_fetch
                 }
@@ -744,10 +638,11 @@ class FundViewSet(viewsets.ReadOnlyModelViewSet):
         fund_map = {f.fund_code: f for f in funds}
 
         results = {}
+        confirmed = []
         source = SourceRegistry.get_source("eastmoney")
 
         # 并发获取净值
-        with ThreadPoolExecutor(max_workers=5) as executor:
+        with ThreadPoolExecutor(max_workers=5) as executor, deferred_summary_refresh():
             futures = {
                 executor.submit(source.fetch_realtime_nav, code): code
                 for code in fund_codes
@@ -761,6 +656,8 @@ class FundViewSet(viewsets.ReadOnlyModelViewSet):
                     fund = fund_map.get(code)
 
                     if fund and data:
+                        confirmed.append((fund, data))
+
                         # 核心修正：绝不覆盖较新的日期
                         new_date = data.get("nav_date")
                         if not fund.latest_nav_date or (
@@ -789,6 +686,15 @@ class FundViewSet(viewsets.ReadOnlyModelViewSet):
                         "error": f"获取净值失败: {e!s}",
                     }
 
+        # 确认净值一次性追加到历史表
+        if confirmed:
+            from .services.nav_history import record_confirmed_navs
+
+            try:
+                record_confirmed_navs(confirmed)
+            except Exception as e:
+                logger.warning(f"写入历史净值失败: {e}")
+
         return Response(results)
 
     @action(detail=False, methods=["post"], permission_classes=[AllowAny])
@@ -833,7 +739,7 @@ class FundViewSet(viewsets.ReadOnlyModelViewSet):
         today = date_type.today()
 
         # 并发获取当日净值
-        with ThreadPoolExecutor(max_workers=5) as executor:
+        with ThreadPoolExecutor(max_workers=5) as executor, deferred_summary_refresh():
             futures = {
                 executor.submit(source.fetch_today_nav, code): code
                 for code in fund_codes
@@ -1111,14 +1017,8 @@ class AccountViewSet(viewsets.ModelViewSet):
         """只返回当前用户的账户（优化查询）"""
         queryset = Account.objects.filter(user=self.request.user)
 
-        # 优化：预加载子账户和持仓数据
-        queryset = queryset.prefetch_related(
-            "children",  # 预加载子账户
-            "children__positions",  # 预加载子账户的持仓
-            "children__positions__fund",  # 预加载持仓的基金
-            "positions",  # 预加载自己的持仓
-            "positions__fund",  # 预加载持仓的基金
-        )
+        # 优化：预加载子账户（汇总指标读取 AccountSummary，无需预加载持仓）
+        queryset = queryset.prefetch_related("children")
 
         return queryset
 
@@ -1279,7 +1179,8 @@ class PositionViewSet(viewsets.ReadOnlyModelViewSet):
         # 删除所有操作流水
         operations = PositionOperation.objects.filter(account_id=account_id, fund_id=fund_id)
         operation_count = operations.count()
-        operations.delete()
+        with deferred_recalculation():
+            operations.delete()
 
         logger.info(
             f"Cleared position: user={request.user.username}, "
@@ -1287,7 +1188,7 @@ class PositionViewSet(viewsets.ReadOnlyModelViewSet):
             f"operations_deleted={operation_count}"
         )
 
-        # 删除操作后会自动触发持仓重算（通过 signal）
+        # 删除结束后统一重算一次（signal 在作用域内只登记组合）
         # 持仓会变为 0 份额或被删除
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -1297,33 +1198,63 @@ class PositionViewSet(viewsets.ReadOnlyModelViewSet):
         获取账户历史市值
 
         GET /api/positions/history/?account_id=xxx&days=30
+        GET /api/positions/history/?scope=user&days=30  （当前用户全部子账户）
 
-        响应:
+        子账户响应:
         [
             {'date': '2026-02-01', 'value': 10000.00, 'cost': 9500.00},
             {'date': '2026-02-02', 'value': 10200.00, 'cost': 9500.00},
             ...
         ]
+
+        父账户 / 全部账户响应（合计曲线 + 各子账户曲线，一次请求完成）:
+        {
+            'total': [{'date': ..., 'value': ..., 'cost': ...}, ...],
+            'accounts': [{'account_id': ..., 'account_name': ..., 'history': [...]}, ...]
+        }
+        没有流水的子账户返回与合计曲线日期对齐的全 0 序列
         """
-        from .services.position_history import calculate_account_history
+        from .services.position_history import (
+            calculate_account_history,
+            calculate_accounts_history,
+            combine_histories,
+        )
 
         account_id = request.query_params.get("account_id")
+        scope = request.query_params.get("scope")
         days = int(request.query_params.get("days", 30))
 
-        if not account_id:
+        if scope == "user":
+            children = Account.objects.filter(user=request.user, parent__isnull=False)
+        elif not account_id:
             return Response({"error": "缺少 account_id 参数"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # 验证账户归属
-        account = get_object_or_404(Account, id=account_id, user=request.user)
-
-        # 只支持子账户
-        if account.parent is None:
-            return Response({"error": "暂不支持父账户历史查询"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # 计算历史市值
-        result = calculate_account_history(account_id, days)
-
-        return Response(result)
+        else:
+            # 验证账户归属
+            account = get_object_or_404(Account, id=account_id, user=request.user)
+
+            # 子账户：返回单条曲线
+            if account.parent is not None:
+                return Response(calculate_account_history(account.id, days))
+            children = account.children.all()
+
+        # 父账户 / 全部账户：所有子账户一次计算
+        children = list(children.order_by("created_at"))
+        histories = calculate_accounts_history([child.id for child in children], days)
+        total = combine_histories(histories.values())
+        empty = [{"date": row["date"], "value": 0.0, "cost": 0.0} for row in total]
+        return Response(
+            {
+                "total": total,
+                "accounts": [
+                    {
+                        "account_id": str(child.id),
+                        "account_name": child.name,
+                        "history": histories.get(child.id, empty),
+                    }
+                    for child in children
+                ],
+            }
+        )
 
 
 class PositionOperationViewSet(viewsets.ModelViewSet):
@@ -1407,8 +1338,9 @@ class PositionOperationViewSet(viewsets.ModelViewSet):
             f"count={deleted_count}, ids={operation_ids}"
         )
 
-        # 删除操作（会自动触发持仓重算）
-        operations.delete()
+        # 删除操作：涉及的每个 (账户, 基金) 组合在删除结束后只重算一次
+        with deferred_recalculation():
+            operations.delete()
 
         return Response(
             {
@@ -1417,6 +1349,64 @@ class PositionOperationViewSet(viewsets.ModelViewSet):
             }
         )
 
+    @action(detail=False, methods=["post"])
+    def bulk_import(self, request):
+        """
+        批量导入操作流水
+
+        POST /api/positions/operations/bulk_import/
+
+        - JSON: {"operations": [{account, fund_code, operation_type, ...}, ...]}
+        - CSV: multipart/form-data 上传 file 字段，表头见 IMPORT_FIELDS
+
+        全部行校验通过才写入（一个事务），每个受影响的持仓只重算一次；
+        任意一行失败返回 400 及逐行错误，不写入任何数据。
+        """
+        import csv
+
+        from .services.operation_import import (
+            MAX_IMPORT_ROWS,
+            import_operations,
+            parse_csv_rows,
+            validate_operations,
+        )
+
+        upload = request.FILES.get("file")
+        if upload is not None:
+            try:
+                rows = parse_csv_rows(upload.read())
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response(
+                    {"error": f"CSV 解析失败: {e!s}"}, status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            rows = request.data.get("operations")
+            if not isinstance(rows, list):
+                return Response(
+                    {"error": "operations 必须是列表"}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+        if not rows:
+            return Response({"error": "导入数据不能为空"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > MAX_IMPORT_ROWS:
+            return Response(
+                {"error": f"单次最多导入 {MAX_IMPORT_ROWS} 条"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        operations, errors = validate_operations(rows, request.user)
+        if errors:
+            return Response(
+                {"error": f"{len(errors)} 行数据校验失败", "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = import_operations(operations)
+        return Response(
+            {**result, "message": f"成功导入 {result['created']} 条操作记录"},
+            status=status.HTTP_201_CREATED,
+        )
+
 
 class WatchlistViewSet(viewsets.ModelViewSet):
     """自选列表 ViewSet"""
@@ -1518,27 +1508,10 @@ class SourceViewSet(viewsets.ViewSet):
 
     @action(detail=True, methods=["get"], url_path="accuracy")
     def accuracy(self, request, pk=None):
-        """获取数据源整体准确率"""
-        source_name = pk
-        days = int(request.query_params.get("days", 100))
-
-        # 获取最近 N 天的准确率记录（按记录数量，不按日期）
-        records = EstimateAccuracy.objects.filter(
-            source_name=source_name, error_rate__isnull=False
-        ).order_by("-estimate_date")[:days]
+        """获取数据源整体准确率（读取滚动汇总）"""
+        from .services.accuracy_rollup import load_source_accuracy, resolve_window
 
-        if not records.exists():
-            return Response({"avg_error_rate": 0, "record_count": 0})
-
-        total_error = sum(r.error_rate for r in records)
-        count = len(records)
-
-        return Response(
-            {
-                "avg_error_rate": total_error / count if count > 0 else 0,
-                "record_count": count,
-            }
-        )
+        return Response(load_source_accuracy(pk, resolve_window(request.query_params)))
 
 
 class UserViewSet(viewsets.ViewSet):
@@ -1581,34 +1554,63 @@ class UserViewSet(viewsets.ViewSet):
         permission_classes=[IsAuthenticated],
     )
     def summary(self, request):
-        """获取用户资产汇总"""
+        """
+        获取用户资产汇总
+
+        在数据库中按 持仓 × 基金 聚合（Sum / F 表达式），与持仓数量无关，固定两次查询。
+        """
+        from django.db.models import Case, Count, F, Q, Sum, When
+        from django.db.models.functions import Coalesce
+
         user = request.user
 
         # 统计账户数
         account_count = Account.objects.filter(user=user).count()
 
-        # 统计持仓数和总成本
-        positions = Position.objects.filter(account__user=user)
-        position_count = positions.count()
-        total_cost = sum(p.holding_cost for p in positions)
-
-        # 计算总市值和总盈亏
-        total_value = Decimal("0")
-        total_pnl = Decimal("0")
-
-        for position in positions:
-            if position.fund.latest_nav:
-                value = position.fund.latest_nav * position.holding_share
-                total_value += value
-                total_pnl += position.pnl
+        money = models.DecimalField(max_digits=30, decimal_places=4)
+        nav_value = F("fund__latest_nav") * F("holding_share")
+        has_nav = Q(fund__latest_nav__isnull=False) & ~Q(fund__latest_nav=0)
+
+        totals = Position.objects.filter(account__user=user).aggregate(
+            position_count=Count("id"),
+            total_cost=Sum("holding_cost", output_field=money),
+            # 总市值 / 总盈亏：只统计有最新净值的持仓
+            total_value=Sum(nav_value, filter=has_nav, output_field=money),
+            total_pnl=Sum(
+                Coalesce("source_market_value", nav_value, output_field=money) - F("holding_cost"),
+                filter=has_nav,
+                output_field=money,
+            ),
+            # 预估市值：缺失估值时回退来源市值
+            estimate_value=Sum(
+                Case(
+                    When(
+                        fund__estimate_nav__isnull=False,
+                        then=F("fund__estimate_nav") * F("holding_share"),
+                    ),
+                    When(source_market_value__isnull=False, then=F("source_market_value")),
+                    output_field=money,
+                ),
+                output_field=money,
+            ),
+            # 今日盈亏：跳过缺失估值或净值的持仓
+            today_pnl=Sum(
+                F("holding_share") * (F("fund__estimate_nav") - F("fund__latest_nav")),
+                filter=Q(fund__estimate_nav__isnull=False, fund__latest_nav__isnull=False),
+                output_field=money,
+            ),
+        )
 
+        zero = Decimal("0")
         return Response(
             {
                 "account_count": account_count,
-                "position_count": position_count,
-                "total_cost": total_cost,
-                "total_value": total_value,
-                "total_pnl": total_pnl,
+                "position_count": totals["position_count"],
+                "total_cost": totals["total_cost"] or zero,
+                "total_value": totals["total_value"] or zero,
+                "total_pnl": totals["total_pnl"] or zero,
+                "estimate_value": totals["estimate_value"] or zero,
+                "today_pnl": totals["today_pnl"] or zero,
             }
         )
 
@@ -1660,24 +1662,78 @@ class FundNavHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         if not fund_codes:
             return Response({"error": "缺少 fund_codes 参数"}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = {}
-        for fund_code in fund_codes:
-            queryset = FundNavHistory.objects.filter(fund__fund_code=fund_code)
+        # 一次查询取出所有基金的数据，再按基金分组
+        queryset = FundNavHistory.objects.filter(fund__fund_code__in=fund_codes)
 
-            # 单日查询
-            if nav_date:
-                queryset = queryset.filter(nav_date=nav_date)
-            else:
-                # 时间段查询
-                if start_date:
-                    queryset = queryset.filter(nav_date__gte=start_date)
-                if end_date:
-                    queryset = queryset.filter(nav_date__lte=end_date)
+        # 单日查询
+        if nav_date:
+            queryset = queryset.filter(nav_date=nav_date)
+        else:
+            # 时间段查询
+            if start_date:
+                queryset = queryset.filter(nav_date__gte=start_date)
+            if end_date:
+                queryset = queryset.filter(nav_date__lte=end_date)
 
-            serializer = self.get_serializer(queryset, many=True)
-            results[fund_code] = serializer.data
+        rows = queryset.values(*FundNavHistoryRowSerializer.ROW_FIELDS)
 
-        return Response(results)
+        grouped = {fund_code: [] for fund_code in fund_codes}
+        for row in FundNavHistoryRowSerializer(rows, many=True).data:
+            grouped[row["fund_code"]].append(row)
+
+        return Response(grouped)
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """
+        流式导出历史净值
+
+        GET /api/nav-history/export/?fund_codes=000001,000002&start_date=2024-01-01
+            &end_date=2024-12-31&export_format=csv
+
+        - fund_codes: 可选，逗号分隔；不传导出全部基金
+        - start_date / end_date: 可选
+        - export_format: csv（默认）/ ndjson
+        """
+        from datetime import datetime
+
+        from django.http import StreamingHttpResponse
+
+        from .services.nav_export import EXPORT_FORMATS, build_export_queryset, iter_export_lines
+
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"不支持的导出格式：{export_format}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        dates = {}
+        for key in ("start_date", "end_date"):
+            value = request.query_params.get(key)
+            if not value:
+                continue
+            try:
+                dates[key] = datetime.strptime(value, "%Y-%m-%d").date()
+            except ValueError:
+                return Response(
+                    {"error": f"{key} 格式错误，应为 YYYY-MM-DD"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        fund_codes = [
+            code.strip()
+            for code in request.query_params.get("fund_codes", "").split(",")
+            if code.strip()
+        ]
+        queryset = build_export_queryset(fund_codes, **dates)
+
+        response = StreamingHttpResponse(
+            iter_export_lines(queryset, export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="nav_history.{export_format}"'
+        return response
 
     @action(detail=False, methods=["post"])
     def sync(self, request):
@@ -2482,8 +2538,8 @@ class AdminViewSet(viewsets.ViewSet):
             from .services import recalculate_all_positions
 
             try:
-                recalculate_all_positions()
-                return Response({"status": "completed", "task_name": task_name})
+                stats = recalculate_all_positions()
+                return Response({"status": "completed", "task_name": task_name, **stats})
             except Exception as e:
                 logger.error(f"重算全部持仓失败: {e}")
                 return Response(
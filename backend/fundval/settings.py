@@ -209,7 +209,19 @@ CELERY_BEAT_SCHEDULE = {
     },
     "update-fund-today-nav-task": {
         "task": "api.tasks.update_fund_today_nav",
-        "schedule": crontab(minute=30, hour="21,23"),  # 21:30 和 23:00
+        "schedule": crontab(minute=30, hour="21,23"),  # 21:30 和 23:30
+    },
+    "refresh-fund-metrics": {
+        "task": "api.tasks.refresh_fund_metrics",
+        "schedule": crontab(minute=45, hour=23),  # 每天 23:45，23:30 净值更新之后
+    },
+    "rebuild-fund-rankings": {
+        "task": "api.tasks.rebuild_fund_rankings",
+        "schedule": crontab(minute=50, hour=23),  # 每天 23:50，23:30 净值更新与准确率审计之后
+    },
+    "snapshot-account-valuations": {
+        "task": "api.tasks.snapshot_account_valuations",
+        "schedule": crontab(minute=55, hour=23),  # 每天 23:55，23:30 净值更新之后
     },
     "check-notification-rules": {
         "task": "api.tasks.check_notification_rules",
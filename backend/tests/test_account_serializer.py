@@ -5,6 +5,8 @@
 1. 父账户返回 children 列表
 2. 子账户返回汇总字段
 3. 父账户汇总字段正确
+4. 汇总指标引擎单次计算、结果与逐项计算一致
+5. 账户汇总物化表随流水 / 净值 / 估值增量刷新
 """
 
 from decimal import Decimal
@@ -216,3 +218,274 @@ class TestAccountSerializerWithSummary:
         # 验证汇总字段为 0
         assert Decimal(data["holding_cost"]) == Decimal(0)
         assert Decimal(data["holding_value"]) == Decimal(0)
+
+
+@pytest.mark.django_db
+class TestAccountMetricsEngine:
+    """测试账户汇总指标引擎"""
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="testuser", password="pass")
+
+    @pytest.fixture
+    def tree(self, user):
+        """父账户下两个子账户，覆盖缺失估值 / 缺失净值 / 金额型持仓"""
+        from api.models import Account, Fund, Position
+
+        parent = Account.objects.create(user=user, name="父账户")
+        child1 = Account.objects.create(user=user, name="子账户1", parent=parent)
+        child2 = Account.objects.create(user=user, name="子账户2", parent=parent)
+
+        full = Fund.objects.create(
+            fund_code="000001",
+            fund_name="基金1",
+            latest_nav=Decimal("1.5000"),
+            estimate_nav=Decimal("1.6000"),
+        )
+        no_estimate = Fund.objects.create(
+            fund_code="000002", fund_name="基金2", latest_nav=Decimal("2.0000")
+        )
+        no_nav = Fund.objects.create(fund_code="000003", fund_name="基金3")
+
+        Position.objects.create(
+            account=child1, fund=full, holding_share=Decimal(100), holding_cost=Decimal(120)
+        )
+        Position.objects.create(
+            account=child1, fund=no_estimate, holding_share=Decimal(50), holding_cost=Decimal(90)
+        )
+        Position.objects.create(
+            account=child2,
+            fund=no_nav,
+            holding_share=Decimal(0),
+            holding_cost=Decimal(1000),
+            source_market_value=Decimal(1100),
+        )
+        return parent, child1, child2
+
+    def test_metrics_values(self, tree):
+        """引擎结果符合各指标定义，父账户为子账户之和"""
+        from api.services.account_metrics import compute_account_metrics
+
+        parent, child1, child2 = tree
+        metrics = compute_account_metrics([parent])
+
+        assert set(metrics) == {parent.id, child1.id, child2.id}
+
+        m1 = metrics[child1.id]
+        assert m1["holding_cost"] == Decimal(210)
+        assert m1["holding_value"] == Decimal(250)  # 150 + 100
+        assert m1["pnl"] == Decimal(40)
+        assert m1["pnl_rate"] == Decimal("0.1905")
+        assert m1["estimate_value"] == Decimal(160)  # 缺失估值且无来源市值的持仓跳过
+        assert m1["estimate_pnl"] == Decimal(-50)
+        assert m1["today_pnl"] == Decimal(10)
+        assert m1["today_pnl_rate"] == Decimal("0.0400")
+
+        m2 = metrics[child2.id]
+        assert m2["holding_value"] == Decimal(1100)
+        assert m2["estimate_value"] == Decimal(1100)
+        assert m2["today_pnl"] == Decimal(0)
+
+        mp = metrics[parent.id]
+        assert mp["holding_cost"] == Decimal(1210)
+        assert mp["holding_value"] == Decimal(1350)
+        assert mp["estimate_value"] == Decimal(1260)
+        assert mp["today_pnl"] == Decimal(10)
+        assert mp["pnl_rate"] == Decimal("0.1157")
+
+    def test_model_properties_match_engine(self, tree):
+        """Account 属性与引擎结果一致"""
+        from api.services.account_metrics import METRIC_FIELDS, compute_account_metrics
+
+        parent, child1, _ = tree
+        metrics = compute_account_metrics([parent])
+
+        for account in (parent, child1):
+            for name in METRIC_FIELDS:
+                assert getattr(account, name) == metrics[account.id][name], name
+
+    def test_serializer_computes_metrics_once(self, user, tree):
+        """序列化账户列表只读取一次汇总，不触发 Account 属性"""
+        from unittest.mock import patch
+
+        from api.models import Account
+        from api.serializers import AccountSerializer
+        from api.services import account_summary
+
+        accounts = Account.objects.filter(user=user)
+
+        with (
+            patch.object(
+                account_summary,
+                "load_account_metrics",
+                wraps=account_summary.load_account_metrics,
+            ) as mock_engine,
+            patch.object(Account, "metrics", property(lambda self: pytest.fail("不应访问属性"))),
+        ):
+            data = AccountSerializer(accounts, many=True).data
+
+        assert mock_engine.call_count == 1
+        parent_data = next(a for a in data if a["name"] == "父账户")
+        assert Decimal(parent_data["holding_value"]) == Decimal(1350)
+        assert Decimal(parent_data["children"][0]["holding_cost"]) in (Decimal(210), Decimal(1000))
+
+
+@pytest.mark.django_db
+class TestAccountSummaryTable:
+    """测试账户汇总物化表"""
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="testuser", password="pass")
+
+    @pytest.fixture
+    def parent(self, user):
+        from api.models import Account
+
+        return Account.objects.create(user=user, name="父账户")
+
+    @pytest.fixture
+    def child(self, user, parent):
+        from api.models import Account
+
+        return Account.objects.create(user=user, name="子账户", parent=parent)
+
+    @pytest.fixture
+    def fund(self):
+        from api.models import Fund
+
+        return Fund.objects.create(
+            fund_code="000001",
+            fund_name="基金1",
+            latest_nav=Decimal("1.5000"),
+            estimate_nav=Decimal("1.6000"),
+        )
+
+    def _buy(self, account, fund, share="100", nav="1.0000", day=1):
+        from datetime import date
+
+        from api.models import PositionOperation
+
+        return PositionOperation.objects.create(
+            account=account,
+            fund=fund,
+            operation_type="BUY",
+            operation_date=date(2024, 1, day),
+            before_15=True,
+            amount=(Decimal(share) * Decimal(nav)).quantize(Decimal("0.01")),
+            share=Decimal(share),
+            nav=Decimal(nav),
+        )
+
+    def _summary(self, account):
+        from api.models import AccountSummary
+
+        return AccountSummary.objects.get(account=account)
+
+    def test_operation_refreshes_summary(self, child, fund):
+        """新增流水后汇总行写入，追加流水增量刷新"""
+        self._buy(child, fund)
+        summary = self._summary(child)
+        assert summary.holding_cost == Decimal(100)
+        assert summary.holding_value == Decimal(150)
+        assert summary.estimate_value == Decimal(160)
+        assert summary.today_pnl == Decimal(10)
+
+        self._buy(child, fund, share="100", nav="1.2000", day=2)
+        summary = self._summary(child)
+        assert summary.holding_cost == Decimal(220)
+        assert summary.holding_value == Decimal(300)
+
+    def test_operation_delete_refreshes_summary(self, child, fund):
+        """删除流水清仓后汇总行归零"""
+        op = self._buy(child, fund)
+        op.delete()
+
+        summary = self._summary(child)
+        assert summary.holding_cost == 0
+        assert summary.holding_value == 0
+
+    def test_fund_save_refreshes_summary(self, child, fund):
+        """净值 / 估值更新后刷新持有该基金的账户，无关字段不触发"""
+        from unittest.mock import patch
+
+        from api.services import account_summary
+
+        self._buy(child, fund)
+
+        fund.estimate_nav = Decimal("1.7000")
+        fund.save(update_fields=["estimate_nav"])
+        assert self._summary(child).estimate_value == Decimal(170)
+
+        fund.latest_nav = Decimal("1.8000")
+        fund.save(update_fields=["latest_nav"])
+        assert self._summary(child).holding_value == Decimal(180)
+
+        with patch.object(account_summary, "refresh_account_summaries") as mock_refresh:
+            fund.fund_name = "新名称"
+            fund.save(update_fields=["fund_name"])
+        mock_refresh.assert_not_called()
+
+    def test_deferred_scope_refreshes_once(self, user, child, fund):
+        """作用域内多次更新只在退出时刷新一次"""
+        from unittest.mock import patch
+
+        from api.models import Fund
+        from api.services import account_summary
+
+        other = Fund.objects.create(fund_code="000002", fund_name="基金2")
+        self._buy(child, fund)
+        self._buy(child, other)
+
+        with (
+            patch.object(
+                account_summary,
+                "refresh_account_summaries",
+                wraps=account_summary.refresh_account_summaries,
+            ) as mock_refresh,
+            account_summary.deferred_summary_refresh(),
+        ):
+            for f, nav in ((fund, "2.0000"), (other, "3.0000")):
+                f.latest_nav = Decimal(nav)
+                f.save(update_fields=["latest_nav"])
+            mock_refresh.assert_not_called()
+
+        assert mock_refresh.call_count == 1
+        assert self._summary(child).holding_value == Decimal(500)
+
+    def test_update_nav_refreshes_summary(self, child, fund):
+        """update_nav 批量写入净值后刷新汇总"""
+        from datetime import date
+        from io import StringIO
+        from unittest.mock import patch
+
+        from django.core.management import call_command
+
+        self._buy(child, fund)
+        with patch("api.management.commands.update_nav.fetch_batch_nav") as mock_fetch:
+            mock_fetch.return_value = {
+                "000001": {"nav": Decimal("2.0000"), "nav_date": date(2024, 1, 2)},
+            }
+            call_command("update_nav", "--backend", "batch", stdout=StringIO())
+
+        assert self._summary(child).holding_value == Decimal(200)
+
+    def test_serializer_reads_summary_rows(self, user, parent, child, fund):
+        """序列化器读取汇总行，父账户由子账户行累加；缺失的行现场补齐"""
+        from api.models import Account, AccountSummary
+        from api.serializers import AccountSerializer
+
+        self._buy(child, fund)
+        AccountSummary.objects.filter(account=child).update(holding_value=Decimal(999))
+
+        data = AccountSerializer(Account.objects.filter(user=user), many=True).data
+        parent_data = next(a for a in data if a["name"] == "父账户")
+        assert Decimal(parent_data["holding_value"]) == Decimal(999)
+        assert Decimal(parent_data["children"][0]["holding_value"]) == Decimal(999)
+
+        AccountSummary.objects.all().delete()
+        data = AccountSerializer(parent).data
+        assert Decimal(data["holding_value"]) == Decimal(150)
+        assert AccountSummary.objects.filter(account=child).exists()
+        assert not AccountSummary.objects.filter(account=parent).exists()
@@ -0,0 +1,260 @@
+"""
+测试估值准确率滚动汇总（EstimateAccuracyRollup）
+
+测试点：
+1. 按 (数据源, 基金) 计算最近 20/60/250 条的记录数、平均误差、平均绝对误差、均方根误差
+2. 数据源整体行统计最近 N 个审计日期内的全部记录，与直接对原始记录统计一致；停止审计的基金不计入
+3. 准确率审计只增量更新涉及的组合
+4. 准确率接口读取汇总行（数据源接口单次查询），没有汇总时首次读取补建；没有审计记录 / 未知数据源不重建
+5. 重建命令
+"""
+
+import math
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from api.models import EstimateAccuracy, EstimateAccuracyRollup, Fund, FundNavHistory
+from api.services.accuracy_rollup import update_accuracy_rollups
+from django.core.management import call_command
+from django.test import Client
+
+END = date(2026, 6, 30)
+
+
+def _create_records(fund, errors, source_name="eastmoney", end=END):
+    """按日期倒序写入已审计记录，errors[0] 为最新一天"""
+    EstimateAccuracy.objects.bulk_create(
+        [
+            EstimateAccuracy(
+                source_name=source_name,
+                fund=fund,
+                estimate_date=end - timedelta(days=i),
+                estimate_nav=Decimal("1.0000"),
+                actual_nav=Decimal("1.0000"),
+                error_rate=Decimal(str(error)),
+            )
+            for i, error in enumerate(errors)
+        ]
+    )
+
+
+def _stats(errors):
+    count = len(errors)
+    return (
+        sum(errors) / count,
+        sum(abs(e) for e in errors) / count,
+        math.sqrt(sum(e * e for e in errors) / count),
+    )
+
+
+def _assert_row(row, errors):
+    mean_error, mean_abs_error, rmse = _stats(errors)
+    assert row.record_count == len(errors)
+    assert float(row.mean_error) == pytest.approx(mean_error, abs=1e-8)
+    assert float(row.mean_abs_error) == pytest.approx(mean_abs_error, abs=1e-8)
+    assert float(row.rmse) == pytest.approx(rmse, abs=1e-8)
+
+
+@pytest.mark.django_db
+class TestUpdateAccuracyRollups:
+    def test_fund_windows(self):
+        """各窗口只统计最近 N 条，记录不足时按实际条数"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        errors = [round((-1) ** i * 0.0001 * (i % 7 + 1), 6) for i in range(80)]
+        _create_records(fund, errors)
+
+        assert update_accuracy_rollups([("eastmoney", fund.id)]) == 1
+
+        rows = {row.window_days: row for row in EstimateAccuracyRollup.objects.filter(fund=fund)}
+        assert set(rows) == {20, 60, 250}
+        _assert_row(rows[20], errors[:20])
+        _assert_row(rows[60], errors[:60])
+        _assert_row(rows[250], errors)
+
+    def test_source_rollup_matches_raw(self):
+        """数据源整体行与对各基金窗口内原始记录直接统计一致"""
+        f1 = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        f2 = Fund.objects.create(fund_code="000002", fund_name="基金B")
+        errors1 = [0.001, -0.002, 0.003] * 10
+        errors2 = [-0.0005, 0.0015] * 5
+        _create_records(f1, errors1)
+        _create_records(f2, errors2)
+        _create_records(f1, [0.01] * 5, source_name="sina")
+
+        update_accuracy_rollups([("eastmoney", f1.id), ("eastmoney", f2.id), ("sina", f1.id)])
+
+        source_rows = EstimateAccuracyRollup.objects.filter(fund__isnull=True)
+        assert source_rows.count() == 6
+        _assert_row(
+            source_rows.get(source_name="eastmoney", window_days=20), errors1[:20] + errors2
+        )
+        _assert_row(source_rows.get(source_name="eastmoney", window_days=60), errors1 + errors2)
+        _assert_row(source_rows.get(source_name="sina", window_days=20), [0.01] * 5)
+
+    def test_source_rollup_covers_unvisited_funds(self):
+        """只补建一只基金后，数据源整体行仍覆盖所有已审计的基金"""
+        from api.services.accuracy_rollup import load_fund_accuracy
+
+        funds = [Fund.objects.create(fund_code=f"00000{i}", fund_name=f"基金{i}") for i in range(3)]
+        for fund, error in zip(funds, [0.01, 0.02, 0.03], strict=True):
+            _create_records(fund, [error])
+
+        load_fund_accuracy(funds[0], 20)
+
+        resp = Client().get("/api/sources/eastmoney/accuracy/", {"window": 20})
+        data = resp.json()
+        assert data["record_count"] == 3
+        assert data["avg_error_rate"] == pytest.approx(0.02)
+
+    def test_source_window_is_recent_audit_dates(self):
+        """整体窗口按数据源最近 N 个审计日期截取，早已停止审计的基金不计入"""
+        active = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        stopped = Fund.objects.create(fund_code="000002", fund_name="基金B")
+        _create_records(active, [0.001] * 25)
+        _create_records(stopped, [0.05] * 30, end=END - timedelta(days=365))
+
+        update_accuracy_rollups([("eastmoney", active.id), ("eastmoney", stopped.id)])
+
+        source_rows = EstimateAccuracyRollup.objects.filter(fund__isnull=True)
+        _assert_row(source_rows.get(window_days=20), [0.001] * 20)
+        _assert_row(source_rows.get(window_days=60), [0.001] * 25 + [0.05] * 30)
+        # 基金行仍按各自最近 N 条
+        _assert_row(EstimateAccuracyRollup.objects.get(fund=stopped, window_days=20), [0.05] * 20)
+
+    def test_pair_without_records_removed(self):
+        """已没有审计记录的组合删除旧汇总行"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_records(fund, [0.001] * 3)
+        update_accuracy_rollups([("eastmoney", fund.id)])
+        EstimateAccuracy.objects.all().delete()
+
+        update_accuracy_rollups([("eastmoney", fund.id)])
+
+        assert not EstimateAccuracyRollup.objects.exists()
+
+
+@pytest.mark.django_db
+class TestAuditUpdatesRollups:
+    @patch("requests.get")
+    def test_audit_updates_only_affected_pairs(self, mock_get):
+        """审计写入误差率后只重算涉及的基金，数据源整体行同步更新"""
+        target_date = date.today() - timedelta(days=1)
+        f1 = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        f2 = Fund.objects.create(fund_code="000002", fund_name="基金B")
+        _create_records(f1, [0.001] * 10, end=target_date - timedelta(days=1))
+        _create_records(f2, [0.002] * 10, end=target_date - timedelta(days=1))
+        update_accuracy_rollups([("eastmoney", f1.id), ("eastmoney", f2.id)])
+        f2_updated_at = EstimateAccuracyRollup.objects.get(fund=f2, window_days=20).updated_at
+
+        EstimateAccuracy.objects.create(
+            source_name="eastmoney",
+            fund=f1,
+            estimate_date=target_date,
+            estimate_nav=Decimal("1.0100"),
+        )
+        FundNavHistory.objects.create(fund=f1, nav_date=target_date, unit_nav=Decimal("1.0000"))
+
+        call_command("calculate_accuracy", stdout=StringIO())
+
+        mock_get.assert_not_called()
+        _assert_row(
+            EstimateAccuracyRollup.objects.get(fund=f1, window_days=20), [0.01] + [0.001] * 10
+        )
+        assert (
+            EstimateAccuracyRollup.objects.get(fund=f2, window_days=20).updated_at == f2_updated_at
+        )
+        _assert_row(
+            EstimateAccuracyRollup.objects.get(fund__isnull=True, window_days=20),
+            [0.01] + [0.001] * 10 + [0.002] * 10,
+        )
+
+
+@pytest.mark.django_db
+class TestAccuracyEndpoints:
+    def test_source_accuracy_single_query(self, django_assert_num_queries):
+        """数据源准确率为单行读取"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        errors = [0.001, -0.003] * 20
+        _create_records(fund, errors)
+        update_accuracy_rollups([("eastmoney", fund.id)])
+
+        with django_assert_num_queries(1):
+            resp = Client().get("/api/sources/eastmoney/accuracy/", {"window": 20})
+
+        data = resp.json()
+        assert data["window"] == 20
+        assert data["record_count"] == 20
+        assert data["avg_error_rate"] == pytest.approx(-0.001)
+        assert data["mean_abs_error"] == pytest.approx(0.002)
+        assert data["rmse"] == pytest.approx(math.sqrt(0.000005))
+
+    def test_source_without_records(self, django_assert_num_queries):
+        """没有已审计记录的数据源返回 0，不触发重建；未知数据源名只读取汇总行"""
+        with django_assert_num_queries(2):
+            resp = Client().get("/api/sources/sina/accuracy/")
+        assert resp.json() == {"window": 60, "avg_error_rate": 0, "record_count": 0}
+
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_records(fund, [0.001], source_name="unknown")
+        with django_assert_num_queries(1):
+            resp = Client().get("/api/sources/unknown/accuracy/")
+        assert resp.json()["record_count"] == 0
+        assert not EstimateAccuracyRollup.objects.exists()
+
+    def test_source_row_built_on_first_read(self):
+        """已有审计记录但还没有整体行时首次读取补建，不删除基金行"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_records(fund, [0.001] * 3)
+        update_accuracy_rollups([("eastmoney", fund.id)])
+        EstimateAccuracyRollup.objects.filter(fund__isnull=True).delete()
+        fund_row_ids = set(
+            EstimateAccuracyRollup.objects.filter(fund=fund).values_list("id", flat=True)
+        )
+
+        resp = Client().get("/api/sources/eastmoney/accuracy/", {"window": 20})
+
+        assert resp.json()["record_count"] == 3
+        assert (
+            set(EstimateAccuracyRollup.objects.filter(fund=fund).values_list("id", flat=True))
+            == fund_row_ids
+        )
+
+    def test_fund_accuracy_backfills_on_first_read(self):
+        """基金还没有汇总时首次读取补建，明细按窗口截取"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_records(fund, [0.001] * 30)
+        _create_records(fund, [0.002] * 5, source_name="sina")
+
+        resp = Client().get(f"/api/funds/{fund.fund_code}/accuracy/", {"window": 20})
+
+        data = resp.json()
+        assert set(data) == {"eastmoney", "sina"}
+        assert data["eastmoney"]["record_count"] == 20
+        assert len(data["eastmoney"]["records"]) == 20
+        assert data["eastmoney"]["records"][0]["date"] == END.isoformat()
+        assert data["sina"]["record_count"] == 5
+        assert EstimateAccuracyRollup.objects.filter(fund=fund).count() == 6
+
+
+@pytest.mark.django_db
+class TestRebuildAccuracyRollupsCommand:
+    def test_rebuild(self):
+        """全量重建所有组合，--source 只重建指定数据源"""
+        f1 = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        f2 = Fund.objects.create(fund_code="000002", fund_name="基金B")
+        _create_records(f1, [0.001] * 3)
+        _create_records(f2, [0.002] * 3)
+        _create_records(f1, [0.003] * 3, source_name="sina")
+
+        out = StringIO()
+        call_command("rebuild_accuracy_rollups", stdout=out)
+        assert "3 组" in out.getvalue()
+        assert EstimateAccuracyRollup.objects.filter(fund__isnull=True).count() == 6
+
+        out = StringIO()
+        call_command("rebuild_accuracy_rollups", "--source", "sina", stdout=out)
+        assert "1 组" in out.getvalue()
+        assert EstimateAccuracyRollup.objects.count() == 9 + 6
@@ -82,11 +82,12 @@ class TestSourceAccuracyAPI:
         assert response.data["record_count"] == 20
 
     def test_get_source_accuracy_with_days(self, client, accuracy_records):
-        """测试获取指定天数的准确率"""
+        """旧的 days 参数映射到不小于它的最小滚动窗口"""
         response = client.get("/api/sources/eastmoney/accuracy/?days=5")
         assert response.status_code == 200
-        # 最近5天，每天2条记录
-        assert response.data["record_count"] <= 10
+        # 窗口为数据源最近 20 个审计日期，10 天每天 2 条全部在窗口内
+        assert response.data["window"] == 20
+        assert response.data["record_count"] == 20
 
 
 @pytest.mark.django_db
@@ -230,6 +231,62 @@ class TestUserSummaryAPI:
         # 持仓数：2
         assert response.data["position_count"] == 2
 
+    def test_user_summary_values(self, client, user, user_data, create_child_account):
+        """测试市值、盈亏、预估市值、今日盈亏的数据库聚合结果"""
+        from api.models import Fund, Position
+
+        fund1, fund2 = user_data["funds"]
+        fund1.estimate_nav = Decimal("1.6000")
+        fund1.save()
+
+        # 无最新净值的金额型持仓：不计入市值 / 盈亏，计入预估市值
+        fund3 = Fund.objects.create(fund_code="000003", fund_name="基金3")
+        Position.objects.create(
+            account=create_child_account(user, "账户3"),
+            fund=fund3,
+            holding_share=Decimal("0"),
+            holding_cost=Decimal("500"),
+            source_market_value=Decimal("600"),
+        )
+
+        client.force_authenticate(user=user)
+        response = client.get("/api/users/me/summary/")
+        assert response.status_code == 200
+
+        data = response.data
+        assert data["position_count"] == 3
+        assert Decimal(data["total_cost"]) == Decimal("3500")
+        # 150 + 400
+        assert Decimal(data["total_value"]) == Decimal("550")
+        # (150 - 1000) + (400 - 2000)
+        assert Decimal(data["total_pnl"]) == Decimal("-2450")
+        # 160 + 600（基金2 无估值且无来源市值，跳过）
+        assert Decimal(data["estimate_value"]) == Decimal("760")
+        # 100 × (1.6 - 1.5)
+        assert Decimal(data["today_pnl"]) == Decimal("10")
+
+    def test_user_summary_query_count_constant(self, client, user, user_data):
+        """测试查询次数与持仓数量无关"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get("/api/users/me/summary/")
+
+        assert response.status_code == 200
+        assert len(ctx.captured_queries) == 2
+
+    def test_user_summary_empty(self, client, user):
+        """测试无持仓时汇总为 0"""
+        client.force_authenticate(user=user)
+        response = client.get("/api/users/me/summary/")
+
+        assert response.status_code == 200
+        assert response.data["position_count"] == 0
+        assert Decimal(response.data["total_value"]) == Decimal("0")
+        assert Decimal(response.data["today_pnl"]) == Decimal("0")
+
     def test_get_user_summary_unauthenticated(self, client):
         """测试未认证用户不能查看汇总"""
         response = client.get("/api/users/me/summary/")
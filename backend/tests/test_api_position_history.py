@@ -5,9 +5,11 @@
 1. 正常查询，返回历史数据
 2. 缺少 account_id，返回 400
 3. 查询其他用户账户，返回 404
-4. 查询父账户，返回 400
+4. 查询父账户，返回合计曲线与各子账户曲线（没有流水的子账户为对齐的全 0 序列）
 5. 自定义天数，返回正确数量
 6. 未认证用户，返回 401
+7. 查询当前用户全部账户（scope=user）
+8. 多个子账户一次计算，查询数不随子账户数量增长
 """
 
 from datetime import date, timedelta
@@ -137,15 +139,98 @@ class TestPositionHistoryAPI:
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
-    def test_position_history_parent_account(self, auth_client, parent_account):
-        """查询父账户，返回 400"""
+    def _buy(self, account, fund, days_ago, amount):
+        from api.models import PositionOperation
+
+        PositionOperation.objects.create(
+            account=account,
+            fund=fund,
+            operation_type="BUY",
+            operation_date=date.today() - timedelta(days=days_ago),
+            amount=Decimal(amount),
+            share=Decimal(amount),
+            nav=Decimal("1.0000"),
+            before_15=True,
+        )
+
+    def test_position_history_parent_account(self, auth_client, user, parent_account, fund):
+        """查询父账户，返回合计曲线与各子账户曲线"""
+        from api.models import Account
+
+        child1 = Account.objects.create(user=user, name="子账户1", parent=parent_account)
+        child2 = Account.objects.create(user=user, name="子账户2", parent=parent_account)
+        empty = Account.objects.create(user=user, name="子账户3", parent=parent_account)
+        self._buy(child1, fund, days_ago=5, amount="1000.00")
+        self._buy(child2, fund, days_ago=2, amount="500.00")
+
         response = auth_client.get(
-            "/api/positions/history/", {"account_id": str(parent_account.id)}
+            "/api/positions/history/", {"account_id": str(parent_account.id), "days": 10}
         )
 
-        assert response.status_code == status.HTTP_400_BAD_REQUEST
-        assert "error" in response.json()
-        assert "暂不支持父账户" in response.json()["error"]
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        accounts = {item["account_name"]: item for item in data["accounts"]}
+        assert set(accounts) == {"子账户1", "子账户2", "子账户3"}
+        assert accounts["子账户3"]["account_id"] == str(empty.id)
+        # 没有流水的子账户：与合计曲线日期对齐的全 0 序列
+        assert accounts["子账户3"]["history"] == [
+            {"date": row["date"], "value": 0, "cost": 0} for row in data["total"]
+        ]
+        assert len(accounts["子账户1"]["history"]) == 11
+
+        total = data["total"]
+        assert len(total) == 11
+        assert total[-1]["cost"] == 1500.00
+        assert total[-1]["value"] == 2250.00  # 1500 份 × latest_nav 1.5
+        assert total[-4]["cost"] == 1000.00  # 子账户2 尚未买入
+        assert total[0]["cost"] == 0
+
+    def test_position_history_user_scope(self, auth_client, user, other_child_account, fund):
+        """scope=user 汇总当前用户所有子账户，不包含其他用户"""
+        from api.models import Account
+
+        parent1 = Account.objects.create(user=user, name="父账户1")
+        parent2 = Account.objects.create(user=user, name="父账户2")
+        child1 = Account.objects.create(user=user, name="子账户1", parent=parent1)
+        child2 = Account.objects.create(user=user, name="子账户2", parent=parent2)
+        self._buy(child1, fund, days_ago=3, amount="100.00")
+        self._buy(child2, fund, days_ago=3, amount="200.00")
+        self._buy(other_child_account, fund, days_ago=3, amount="900.00")
+
+        response = auth_client.get("/api/positions/history/", {"scope": "user", "days": 5})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert {item["account_name"] for item in data["accounts"]} == {"子账户1", "子账户2"}
+        assert data["total"][-1]["cost"] == 300.00
+
+    def test_position_history_parent_query_count(self, auth_client, user, parent_account, fund):
+        """父账户历史的查询数不随子账户数量增长"""
+        from api.models import Account
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def query_count():
+            with CaptureQueriesContext(connection) as ctx:
+                response = auth_client.get(
+                    "/api/positions/history/", {"account_id": str(parent_account.id), "days": 30}
+                )
+            assert response.status_code == status.HTTP_200_OK
+            return len(ctx.captured_queries)
+
+        def add_children(count):
+            for _ in range(count):
+                child = Account.objects.create(
+                    user=user, name=f"子账户{Account.objects.count()}", parent=parent_account
+                )
+                self._buy(child, fund, days_ago=10, amount="100.00")
+
+        add_children(2)
+        query_count()  # 首次查询补写快照
+        small = query_count()
+        add_children(6)
+        query_count()
+        assert query_count() == small
 
     def test_position_history_custom_days(self, auth_client, child_account, fund):
         """自定义天数，返回正确数量"""
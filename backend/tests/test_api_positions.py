@@ -9,6 +9,7 @@
 5. 操作详情
 6. 删除操作
 7. 重算持仓
+8. 批量导入操作流水
 """
 
 from datetime import date
@@ -676,3 +677,153 @@ class TestPositionOperationDeleteAnyAPI:
         ).first()
         if position:
             assert position.holding_share == Decimal("200")
+
+
+@pytest.mark.django_db
+class TestOperationBulkImportAPI:
+    """测试批量导入操作流水 API"""
+
+    @pytest.fixture
+    def client(self):
+        return APIClient()
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="testuser", password="pass")
+
+    @pytest.fixture
+    def account(self, user, create_child_account):
+        return create_child_account(user, "我的账户")
+
+    @pytest.fixture
+    def funds(self):
+        from api.models import Fund
+
+        return [
+            Fund.objects.create(fund_code="000001", fund_name="基金1"),
+            Fund.objects.create(fund_code="000002", fund_name="基金2"),
+        ]
+
+    def _row(self, account, fund_code, op_type, op_date, amount, share):
+        return {
+            "account": str(account.id),
+            "fund_code": fund_code,
+            "operation_type": op_type,
+            "operation_date": op_date,
+            "amount": amount,
+            "share": share,
+            "nav": "1.0000",
+        }
+
+    def test_import_json(self, client, user, account, funds):
+        """JSON 导入：写入全部流水，持仓按组合汇总"""
+        from api.models import Position, PositionOperation
+
+        rows = [
+            self._row(account, "000001", "BUY", "2024-01-02", "1000", "1000"),
+            self._row(account, "000001", "BUY", "2024-01-03", "500", "500"),
+            self._row(account, "000001", "SELL", "2024-01-04", "0", "300"),
+            self._row(account, "000002", "BUY", "2024-01-02", "200", "200"),
+        ]
+
+        client.force_authenticate(user=user)
+        response = client.post(
+            "/api/positions/operations/bulk_import/", {"operations": rows}, format="json"
+        )
+
+        assert response.status_code == 201
+        assert response.data["created"] == 4
+        assert response.data["positions"] == 2
+        assert PositionOperation.objects.filter(account=account).count() == 4
+
+        position = Position.objects.get(account=account, fund=funds[0])
+        assert position.holding_share == Decimal("1200")
+        assert position.holding_cost == Decimal("1200")
+        assert position.last_operation_date == date(2024, 1, 4)
+        assert Position.objects.get(account=account, fund=funds[1]).holding_share == Decimal("200")
+
+    def test_import_csv(self, client, user, account, funds):
+        """CSV 上传导入，before_15 可省略"""
+        from api.models import PositionOperation
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        content = (
+            "\ufeffaccount,fund_code,operation_type,operation_date,before_15,amount,share,nav\n"
+            f"{account.id},000001,BUY,2024-01-02,,1000,1000,1\n"
+            f"{account.id},000002,BUY,2024-01-02,false,500,500,1\n"
+        )
+        upload = SimpleUploadedFile("ops.csv", content.encode("utf-8"), "text/csv")
+
+        client.force_authenticate(user=user)
+        response = client.post(
+            "/api/positions/operations/bulk_import/", {"file": upload}, format="multipart"
+        )
+
+        assert response.status_code == 201
+        assert response.data["created"] == 2
+        ops = PositionOperation.objects.filter(account=account).order_by("fund__fund_code")
+        assert [op.before_15 for op in ops] == [True, False]
+
+    def test_invalid_rows_reject_whole_batch(self, client, user, account, funds):
+        """任意一行失败时返回逐行错误，不写入任何数据"""
+        from api.models import PositionOperation
+
+        rows = [
+            self._row(account, "000001", "BUY", "2024-01-02", "1000", "1000"),
+            self._row(account, "999999", "BUY", "2024-01-02", "1000", "1000"),
+            self._row(account, "000001", "HOLD", "2024-01-02", "1000", "1000"),
+        ]
+
+        client.force_authenticate(user=user)
+        response = client.post(
+            "/api/positions/operations/bulk_import/", {"operations": rows}, format="json"
+        )
+
+        assert response.status_code == 400
+        assert [e["row"] for e in response.data["errors"]] == [2, 3]
+        assert "fund_code" in response.data["errors"][0]["errors"]
+        assert "operation_type" in response.data["errors"][1]["errors"]
+        assert not PositionOperation.objects.exists()
+
+    def test_cannot_import_into_others_or_parent_account(
+        self, client, user, account, funds, create_child_account
+    ):
+        """不能导入到他人账户或父账户"""
+        other = User.objects.create_user(username="other", password="pass")
+        other_account = create_child_account(other, "他人账户")
+
+        rows = [
+            self._row(other_account, "000001", "BUY", "2024-01-02", "1000", "1000"),
+            self._row(account.parent, "000001", "BUY", "2024-01-02", "1000", "1000"),
+        ]
+
+        client.force_authenticate(user=user)
+        response = client.post(
+            "/api/positions/operations/bulk_import/", {"operations": rows}, format="json"
+        )
+
+        assert response.status_code == 400
+        assert response.data["errors"][0]["errors"]["account"] == "账户不存在"
+        assert "父账户" in response.data["errors"][1]["errors"]["account"]
+
+    def test_query_count_independent_of_row_count(self, client, user, account, funds):
+        """查询次数与导入行数无关"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def run(count, start_day):
+            rows = [
+                self._row(
+                    account, funds[i % 2].fund_code, "BUY", f"2024-02-{start_day + i:02d}", "1", "1"
+                )
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.post(
+                    "/api/positions/operations/bulk_import/", {"operations": rows}, format="json"
+                )
+            assert response.status_code == 201
+            return len(ctx.captured_queries)
+
+        client.force_authenticate(user=user)
+        assert run(4, 1) == run(20, 5)
@@ -10,6 +10,9 @@
 6. 边界情况（卖出超过持有、负数等）
 7. 盈亏计算
 8. 批量重算
+9. 追加流水增量计算（锁定持仓行）
+10. 批量重算引擎与逐个回放一致
+11. 批量删除流水合并重算
 """
 
 from datetime import date
@@ -490,3 +493,335 @@ class TestBatchRecalculation:
         # 现在两个账户都应该有持仓
         assert Position.objects.filter(account=account1).count() == 1
         assert Position.objects.filter(account=account2).count() == 1
+
+    def test_bulk_matches_per_pair_replay(self, user, fund1, fund2, create_child_account):
+        """批量引擎结果与逐个全量回放一致：清仓的删除，无流水的持仓不动"""
+        from api.models import Position, PositionOperation
+        from api.services import recalculate_all_positions, recalculate_position
+
+        account1 = create_child_account(user, "账户1")
+        account2 = create_child_account(user, "账户2")
+
+        ops = [
+            (account1, fund1, "BUY", date(2024, 1, 2), "1000", "900"),
+            (account1, fund1, "SELL", date(2024, 1, 4), "0", "333.3333"),
+            (account1, fund1, "BUY", date(2024, 1, 3), "500", "480"),
+            (account1, fund2, "BUY", date(2024, 1, 2), "800", "800"),
+            (account1, fund2, "SELL", date(2024, 1, 5), "0", "800"),
+            (account2, fund1, "BUY", date(2024, 1, 2), "300", "250.5"),
+        ]
+        for account, fund, op_type, op_date, amount, share in ops:
+            PositionOperation.objects.create(
+                account=account,
+                fund=fund,
+                operation_type=op_type,
+                operation_date=op_date,
+                amount=Decimal(amount),
+                share=Decimal(share),
+                nav=Decimal("1"),
+            )
+
+        def snapshot():
+            return {
+                (p.account_id, p.fund_id): (
+                    p.holding_share,
+                    p.holding_cost,
+                    p.holding_nav,
+                    p.source_market_value,
+                    p.last_operation_date,
+                )
+                for p in Position.objects.all()
+            }
+
+        for account, fund in [(account1, fund1), (account1, fund2), (account2, fund1)]:
+            recalculate_position(account.id, fund.id)
+        expected = snapshot()
+
+        # 打乱汇总表：篡改、残留已清仓持仓、无流水的持仓
+        Position.objects.all().update(holding_share=Decimal("1"), holding_cost=Decimal("1"))
+        Position.objects.create(account=account1, fund=fund2, holding_share=Decimal("5"))
+        orphan = Position.objects.create(account=account2, fund=fund2, holding_share=Decimal("7"))
+
+        stats = recalculate_all_positions()
+
+        result = snapshot()
+        assert result.pop((account2.id, fund2.id))[0] == orphan.holding_share
+        assert result == expected
+        assert stats == {"pairs": 3, "updated": 2, "deleted": 1}
+
+    def test_bulk_query_count_constant(self, user, fund1, fund2, create_child_account):
+        """批量引擎的查询数不随持仓数量增长"""
+        from api.models import PositionOperation
+        from api.services import recalculate_all_positions
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for i in range(5):
+            account = create_child_account(user, f"账户{i}")
+            for fund in (fund1, fund2):
+                PositionOperation.objects.create(
+                    account=account,
+                    fund=fund,
+                    operation_type="BUY",
+                    operation_date=date(2024, 1, 2),
+                    amount=Decimal("100"),
+                    share=Decimal("100"),
+                    nav=Decimal("1"),
+                )
+
+        with CaptureQueriesContext(connection) as ctx:
+            stats = recalculate_all_positions()
+
+        assert stats["pairs"] == 10
+        # 重算 6 次 + 账户汇总刷新 3 次
+        assert len(ctx.captured_queries) <= 9
+
+
+@pytest.mark.django_db
+class TestIncrementalRecalculation:
+    """追加流水增量计算测试"""
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="testuser", password="pass")
+
+    @pytest.fixture
+    def account(self, user, create_child_account):
+        return create_child_account(user, "测试账户")
+
+    @pytest.fixture
+    def fund(self):
+        from api.models import Fund
+
+        return Fund.objects.create(fund_code="000001", fund_name="基金1")
+
+    def _op(self, account, fund, op_type, op_date, amount, share):
+        from api.models import PositionOperation
+
+        return PositionOperation.objects.create(
+            account=account,
+            fund=fund,
+            operation_type=op_type,
+            operation_date=op_date,
+            amount=Decimal(amount),
+            share=Decimal(share),
+            nav=Decimal("1"),
+        )
+
+    def _snapshot(self, account, fund):
+        from api.models import Position
+
+        p = Position.objects.filter(account=account, fund=fund).first()
+        if p is None:
+            return None
+        return (p.holding_share, p.holding_cost, p.holding_nav, p.source_market_value)
+
+    def test_append_does_not_replay_history(self, account, fund):
+        """按日期追加的流水不读取历史流水"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._op(account, fund, "BUY", date(2024, 1, 2), "1000", "1000")
+        self._op(account, fund, "BUY", date(2024, 1, 3), "1100", "1000")
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._op(account, fund, "SELL", date(2024, 1, 3), "0", "300")
+
+        assert not [
+            q
+            for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and '"position_operation"."account_id" =' in q["sql"]
+        ]
+
+        from api.models import Position
+
+        position = Position.objects.get(account=account, fund=fund)
+        assert position.holding_share == Decimal("1700")
+        assert position.holding_cost == Decimal("1785.00")
+        assert position.holding_nav == Decimal("1.0500")
+        assert position.last_operation_date == date(2024, 1, 3)
+
+    def test_incremental_matches_full_replay(self, account, fund):
+        """增量结果与全量回放一致，补录更早日期的流水触发全量回放"""
+        from api.services import recalculate_position
+
+        self._op(account, fund, "BUY", date(2024, 1, 2), "1000", "900")
+        self._op(account, fund, "SELL", date(2024, 1, 4), "0", "333.3333")
+        self._op(account, fund, "BUY", date(2024, 1, 5), "777.77", "650.1234")
+        # 补录
+        self._op(account, fund, "BUY", date(2024, 1, 3), "500", "480")
+        self._op(account, fund, "SELL", date(2024, 1, 8), "0", "123.4567")
+
+        incremental = self._snapshot(account, fund)
+        recalculate_position(account.id, fund.id)
+
+        assert incremental == self._snapshot(account, fund)
+
+    def test_incremental_sell_all_deletes_position(self, account, fund):
+        """增量卖出全部份额后删除持仓"""
+        self._op(account, fund, "BUY", date(2024, 1, 2), "1000", "1000")
+        self._op(account, fund, "SELL", date(2024, 1, 3), "0", "1000")
+
+        assert self._snapshot(account, fund) is None
+
+    def test_incremental_locks_position_row(self, account, fund):
+        """增量计算在事务内锁定持仓行读取，避免并发追加丢失增量"""
+        from unittest.mock import patch
+
+        from django.db.models import QuerySet
+
+        self._op(account, fund, "BUY", date(2024, 1, 2), "1000", "1000")
+
+        original = QuerySet.select_for_update
+        with patch.object(
+            QuerySet, "select_for_update", autospec=True, side_effect=original
+        ) as mock_lock:
+            self._op(account, fund, "BUY", date(2024, 1, 3), "1100", "1000")
+
+        assert [call.args[0].model.__name__ for call in mock_lock.call_args_list] == ["Position"]
+        assert self._snapshot(account, fund)[0] == Decimal("2000")
+
+    def test_serializer_create_recalculates_once(self, account, fund):
+        """序列化器创建流水只更新一次持仓"""
+        from unittest.mock import patch
+
+        from api.serializers import PositionOperationSerializer
+
+        serializer = PositionOperationSerializer(
+            data={
+                "account": str(account.id),
+                "fund_code": fund.fund_code,
+                "operation_type": "BUY",
+                "operation_date": "2024-01-02",
+                "amount": "1000",
+                "share": "1000",
+                "nav": "1",
+            }
+        )
+        assert serializer.is_valid(), serializer.errors
+
+        from api import services
+
+        with patch.object(
+            services, "recalculate_position", wraps=services.recalculate_position
+        ) as mock_full:
+            serializer.save()
+
+        # 旧实现中 save() 与序列化器各回放一次
+        assert mock_full.call_count == 1
+
+
+@pytest.mark.django_db
+class TestDeferredRecalculation:
+    """批量删除流水合并重算测试"""
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="testuser", password="pass")
+
+    @pytest.fixture
+    def account(self, user, create_child_account):
+        return create_child_account(user, "测试账户")
+
+    @pytest.fixture
+    def fund(self):
+        from api.models import Fund
+
+        return Fund.objects.create(fund_code="000001", fund_name="基金1")
+
+    def _ops(self, account, fund, count):
+        from api.models import PositionOperation
+
+        return [
+            PositionOperation.objects.create(
+                account=account,
+                fund=fund,
+                operation_type="BUY",
+                operation_date=date(2024, 1, 2 + i),
+                amount=Decimal("100"),
+                share=Decimal("100"),
+                nav=Decimal("1"),
+            )
+            for i in range(count)
+        ]
+
+    def test_batch_delete_recalculates_each_pair_once(self, account, fund):
+        """作用域内删除多条流水，每个组合只重算一次"""
+        from unittest.mock import patch
+
+        from api import services
+        from api.models import Position, PositionOperation
+        from api.services import position_bulk
+        from api.services.recalc_queue import deferred_recalculation
+
+        ops = self._ops(account, fund, 10)
+
+        with (
+            patch.object(services, "recalculate_position") as mock_single,
+            patch.object(
+                position_bulk, "recalculate_pairs", wraps=position_bulk.recalculate_pairs
+            ) as mock_pairs,
+            deferred_recalculation(),
+        ):
+            PositionOperation.objects.filter(id__in=[op.id for op in ops[3:]]).delete()
+
+        mock_single.assert_not_called()
+        assert mock_pairs.call_count == 1
+        assert mock_pairs.call_args.args[0] == {(account.id, fund.id)}
+
+        position = Position.objects.get(account=account, fund=fund)
+        assert position.holding_share == Decimal("300")
+        assert position.holding_cost == Decimal("300")
+        assert position.last_operation_date == date(2024, 1, 4)
+
+    def test_delete_all_operations_removes_position(self, account, fund):
+        """作用域内删除全部流水后删除持仓"""
+        from api.models import Position, PositionOperation
+        from api.services.recalc_queue import deferred_recalculation
+
+        self._ops(account, fund, 3)
+
+        with deferred_recalculation():
+            PositionOperation.objects.filter(account=account, fund=fund).delete()
+
+        assert not Position.objects.filter(account=account, fund=fund).exists()
+
+    def test_exception_rolls_back_without_recalculation(self, account, fund):
+        """作用域内抛出异常时删除回滚，持仓保持不变"""
+        from api.models import Position, PositionOperation
+        from api.services.recalc_queue import deferred_recalculation
+
+        self._ops(account, fund, 3)
+
+        with pytest.raises(RuntimeError), deferred_recalculation():
+            PositionOperation.objects.filter(account=account, fund=fund).delete()
+            raise RuntimeError("中断")
+
+        assert PositionOperation.objects.filter(account=account, fund=fund).count() == 3
+        assert Position.objects.get(account=account, fund=fund).holding_share == Decimal("300")
+
+    def test_large_batch_dispatched_to_celery_on_commit(
+        self, account, fund, django_capture_on_commit_callbacks
+    ):
+        """组合数达到阈值时提交后投递异步任务"""
+        from unittest.mock import patch
+
+        from api.models import PositionOperation
+        from api.services.recalc_queue import deferred_recalculation
+
+        self._ops(account, fund, 3)
+
+        def fake_config(key, default=None):
+            return 1 if key == "position_recalc_async_threshold" else default
+
+        with (
+            patch("api.services.recalc_queue.config.get", side_effect=fake_config),
+            patch("api.tasks.recalculate_positions.delay") as mock_delay,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            with deferred_recalculation():
+                PositionOperation.objects.filter(account=account, fund=fund).delete()
+            # 事务提交前不投递
+            mock_delay.assert_not_called()
+
+        mock_delay.assert_called_once_with([[str(account.id), str(fund.id)]])
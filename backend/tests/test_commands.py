@@ -5,6 +5,8 @@
 1. 同步基金列表
 2. 更新基金净值
 3. 计算估值准确率
+4. 准确率批量计算（优先历史净值、200只/批获取、一次批量写回、逐源兜底；只取估值日期当天的单位净值；
+   回查最近几天净值晚披露的记录）
 """
 
 from datetime import date, timedelta
@@ -88,7 +90,7 @@ class TestUpdateNavCommand:
             fund_name="华夏成长混合",
         )
 
-    @patch("api.management.commands.update_nav._fetch_batch_nav")
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
     def test_update_nav_success(self, mock_fetch_batch, fund):
         """M1: 批量更新净值成功（通过 Mobile API 批量接口）"""
         mock_fetch_batch.return_value = {
@@ -123,7 +125,7 @@ class TestUpdateNavCommand:
         fund.refresh_from_db()
         assert fund.latest_nav == Decimal("1.1490")
 
-    @patch("api.management.commands.update_nav._fetch_batch_nav")
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
     def test_update_nav_api_error(self, mock_fetch_batch, fund):
         """M1: 批量 API 返回空数据时净值不更新"""
         mock_fetch_batch.return_value = {}
@@ -134,6 +136,213 @@ class TestUpdateNavCommand:
         fund.refresh_from_db()
         assert fund.latest_nav is None
 
+    @patch("api.management.commands.update_nav.BATCH_SIZE", 2)
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
+    def test_update_nav_concurrent_batches_bulk_write(self, mock_fetch_batch):
+        """多批次并发获取，变更合并为批量写入，较旧日期不覆盖"""
+        from api.models import Fund
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for i in range(1, 6):
+            Fund.objects.create(
+                fund_code=f"00000{i}",
+                fund_name=f"基金{i}",
+                latest_nav=Decimal("1.0000"),
+                latest_nav_date=date(2026, 2, 9),
+            )
+
+        def fetch(codes):
+            return {
+                code: {
+                    "nav": Decimal("1.2000"),
+                    # 000005 返回比库中更旧的日期
+                    "nav_date": date(2026, 2, 1) if code == "000005" else date(2026, 2, 10),
+                }
+                for code in codes
+            }
+
+        mock_fetch_batch.side_effect = fetch
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("update_nav", "--workers", "3", "--rate", "0", stdout=out)
+
+        assert mock_fetch_batch.call_count == 3
+        # 基金表一次批量更新（不含写入历史净值后标记基金指标过期的 UPDATE）
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "fund" ')]
+        assert len(updates) == 1
+
+        updated = Fund.objects.filter(latest_nav_date=date(2026, 2, 10))
+        assert updated.count() == 4
+        assert Fund.objects.get(fund_code="000005").latest_nav == Decimal("1.0000")
+
+        output = out.getvalue()
+        assert "批次 3: 获取 1/1 净值" in output
+        assert "[获取净值] 耗时" in output
+        assert "[写入数据库] 耗时" in output
+        assert "成功 4 个" in output
+
+    @patch("requests.get")
+    def test_update_nav_records_history(self, mock_get, fund):
+        """批量更新同时把确认净值写入历史表（单位净值 / 累计净值 / 日增长率）"""
+        from unittest.mock import MagicMock
+
+        from api.models import FundNavHistory
+
+        mock = MagicMock()
+        mock.json.return_value = {
+            "Datas": [
+                {
+                    "FCODE": "000001",
+                    "NAV": "1.1490",
+                    "ACCNAV": "3.2100",
+                    "NAVCHGRT": "0.52",
+                    "PDATE": "2026-02-10",
+                },
+            ]
+        }
+        mock_get.return_value = mock
+
+        out = StringIO()
+        call_command("update_nav", stdout=out)
+
+        nav = FundNavHistory.objects.get(fund=fund, nav_date=date(2026, 2, 10))
+        assert nav.unit_nav == Decimal("1.1490")
+        assert nav.accumulated_nav == Decimal("3.2100")
+        assert nav.daily_growth == Decimal("0.5200")
+        assert "写入历史净值 1 条" in out.getvalue()
+
+    def test_rate_limiter_spacing(self):
+        """限速器保证请求发起间隔"""
+        import time
+
+        from api.management.commands.update_nav import _RateLimiter
+
+        limiter = _RateLimiter(rate=50)
+        started = time.monotonic()
+        for _ in range(3):
+            limiter.wait()
+
+        assert time.monotonic() - started >= 0.039
+
+
+@pytest.mark.django_db
+class TestUpdateNavMarketBackend:
+    """测试 update_nav 全市场净值表模式"""
+
+    @pytest.fixture
+    def funds(self):
+        from api.models import Fund
+
+        return [
+            Fund.objects.create(fund_code="000001", fund_name="基金1"),
+            Fund.objects.create(fund_code="000002", fund_name="基金2"),
+        ]
+
+    def test_parse_market_nav_table(self):
+        """解析日期前缀列名，只取最新一天；该日未公布的基金视为缺失（交由批量接口兜底）"""
+        import pandas as pd
+        from api.management.commands.update_nav import _parse_market_nav_table
+
+        df = pd.DataFrame(
+            [
+                {
+                    "基金代码": "000001",
+                    "基金简称": "基金1",
+                    "2026-02-10-单位净值": "1.1490",
+                    "2026-02-10-累计净值": "3.2100",
+                    "2026-02-09-单位净值": "1.1400",
+                    "2026-02-09-累计净值": "3.2010",
+                    "日增长值": "0.009",
+                    "日增长率": "0.79",
+                },
+                {
+                    "基金代码": "000002",
+                    "基金简称": "基金2",
+                    "2026-02-10-单位净值": "",
+                    "2026-02-10-累计净值": "",
+                    "2026-02-09-单位净值": "2.0000",
+                    "2026-02-09-累计净值": "2.5000",
+                    "日增长值": "",
+                    "日增长率": "",
+                },
+            ]
+        )
+
+        result = _parse_market_nav_table(df)
+
+        assert result["000001"] == {
+            "nav": Decimal("3.2100"),
+            "nav_date": date(2026, 2, 10),
+            "unit_nav": Decimal("1.1490"),
+            "accumulated_nav": Decimal("3.2100"),
+            "daily_growth": Decimal("0.79"),
+        }
+        # 不用前一天的净值顶替，否则该基金不会再走 FundMNFInfo，--today 时直接被跳过
+        assert "000002" not in result
+
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
+    @patch("api.management.commands.update_nav._fetch_market_nav")
+    def test_market_backend_with_batch_fallback(self, mock_market, mock_fetch_batch, funds):
+        """全市场表命中的基金直接更新，缺失的基金走批量接口"""
+        from api.models import Fund, FundNavHistory
+
+        mock_market.return_value = {
+            "000001": {
+                "nav": Decimal("1.1490"),
+                "nav_date": date(2026, 2, 10),
+                "unit_nav": Decimal("1.1490"),
+            },
+            "999999": {"nav": Decimal("9.9999"), "nav_date": date(2026, 2, 10)},
+        }
+        mock_fetch_batch.return_value = {
+            "000002": {
+                "nav": Decimal("2.0000"),
+                "nav_date": date(2026, 2, 10),
+                "unit_nav": Decimal("2.0000"),
+            },
+        }
+
+        out = StringIO()
+        call_command("update_nav", "--backend", "market", stdout=out)
+
+        mock_fetch_batch.assert_called_once_with(["000002"])
+        assert Fund.objects.get(fund_code="000001").latest_nav == Decimal("1.1490")
+        assert Fund.objects.get(fund_code="000002").latest_nav == Decimal("2.0000")
+        assert FundNavHistory.objects.filter(nav_date=date(2026, 2, 10)).count() == 2
+        assert "命中 1/2" in out.getvalue()
+
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
+    @patch("api.management.commands.update_nav._fetch_market_nav")
+    def test_market_backend_failure_falls_back(self, mock_market, mock_fetch_batch, funds):
+        """全市场表获取失败时整体回退批量接口"""
+        from api.models import Fund
+
+        mock_market.return_value = {}
+        mock_fetch_batch.return_value = {
+            "000001": {"nav": Decimal("1.1490"), "nav_date": date(2026, 2, 10)},
+            "000002": {"nav": Decimal("2.0000"), "nav_date": date(2026, 2, 10)},
+        }
+
+        out = StringIO()
+        call_command("update_nav", "--backend", "market", stdout=out)
+
+        mock_fetch_batch.assert_called_once_with(["000001", "000002"])
+        assert Fund.objects.filter(latest_nav_date=date(2026, 2, 10)).count() == 2
+        assert "回退批量接口" in out.getvalue()
+
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
+    @patch("api.management.commands.update_nav._fetch_market_nav")
+    def test_default_backend_is_batch(self, mock_market, mock_fetch_batch, funds):
+        """未指定且未配置时默认使用批量接口"""
+        mock_fetch_batch.return_value = {}
+
+        call_command("update_nav", stdout=StringIO())
+
+        mock_market.assert_not_called()
+        mock_fetch_batch.assert_called_once()
+
 
 @pytest.mark.django_db
 class TestCalculateAccuracyCommand:
@@ -172,7 +381,7 @@ class TestCalculateAccuracyCommand:
         mock = MagicMock()
         mock.json.return_value = {
             "Datas": [
-                {"FCODE": "000001", "ACCNAV": "1.1490", "PDATE": date_str},
+                {"FCODE": "000001", "NAV": "1.1490", "ACCNAV": "3.2100", "PDATE": date_str},
             ]
         }
         mock.raise_for_status = MagicMock()
@@ -233,7 +442,7 @@ class TestCalculateAccuracyCommand:
         mock = MagicMock()
         mock.json.return_value = {
             "Datas": [
-                {"FCODE": "000001", "ACCNAV": "1.1490", "PDATE": "2024-02-11"},
+                {"FCODE": "000001", "NAV": "1.1490", "ACCNAV": "3.2100", "PDATE": "2024-02-11"},
             ]
         }
         mock.raise_for_status = MagicMock()
@@ -246,6 +455,150 @@ class TestCalculateAccuracyCommand:
         assert record.actual_nav == Decimal("1.1490")
 
 
+@pytest.mark.django_db
+class TestCalculateAccuracyBatched:
+    """测试准确率批量计算"""
+
+    @pytest.fixture
+    def target_date(self):
+        return date.today() - timedelta(days=1)
+
+    def _records(self, target_date, count, sources=("eastmoney",)):
+        from api.models import EstimateAccuracy, Fund
+
+        funds = Fund.objects.bulk_create(
+            [Fund(fund_code=str(i).zfill(6), fund_name=f"基金{i}") for i in range(count)]
+        )
+        EstimateAccuracy.objects.bulk_create(
+            [
+                EstimateAccuracy(
+                    source_name=source,
+                    fund=fund,
+                    estimate_date=target_date,
+                    estimate_nav=Decimal("1.0000"),
+                )
+                for fund in funds
+                for source in sources
+            ]
+        )
+        return funds
+
+    @staticmethod
+    def _mnfinfo_response(codes, nav_date):
+        from unittest.mock import MagicMock
+
+        mock = MagicMock()
+        mock.json.return_value = {
+            "Datas": [
+                {"FCODE": code, "NAV": "1.0100", "ACCNAV": "2.0100", "PDATE": nav_date.isoformat()}
+                for code in codes
+            ]
+        }
+        return mock
+
+    @patch("requests.get")
+    def test_prefers_nav_history(self, mock_get, target_date):
+        """当日历史净值已入库时不请求接口"""
+        from api.models import EstimateAccuracy, FundNavHistory
+
+        funds = self._records(target_date, 3, sources=("eastmoney", "sina"))
+        FundNavHistory.objects.bulk_create(
+            [
+                FundNavHistory(fund=fund, nav_date=target_date, unit_nav=Decimal("1.0200"))
+                for fund in funds
+            ]
+        )
+
+        call_command("calculate_accuracy", stdout=StringIO())
+
+        mock_get.assert_not_called()
+        records = EstimateAccuracy.objects.all()
+        assert len(records) == 6
+        assert all(r.actual_nav == Decimal("1.0200") for r in records)
+        assert all(r.error_rate is not None for r in records)
+
+    @patch("requests.get")
+    def test_batched_fetch_and_bulk_write(self, mock_get, target_date):
+        """按 200只/批 请求净值，结果一次批量写回"""
+        from api.models import EstimateAccuracy
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        funds = self._records(target_date, 250)
+        mock_get.side_effect = lambda url, params, **kwargs: self._mnfinfo_response(
+            params["Fcodes"].split(","), target_date
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("calculate_accuracy", stdout=StringIO())
+
+        assert mock_get.call_count == 2
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        assert len(updates) == 1
+        assert EstimateAccuracy.objects.filter(actual_nav=Decimal("1.0100")).count() == len(funds)
+
+    @patch("requests.get")
+    def test_falls_back_to_sources(self, mock_get, target_date):
+        """批量接口没有返回的基金逐个数据源兜底，每只基金只查一次"""
+        from api.models import EstimateAccuracy
+
+        self._records(target_date, 2, sources=("eastmoney", "sina"))
+        mock_get.return_value = self._mnfinfo_response(["000000"], target_date)
+
+        fallback = {
+            "nav": Decimal("2.0300"),
+            "nav_date": target_date,
+            "unit_nav": Decimal("1.0300"),
+        }
+        with patch(
+            "api.sources.eastmoney.EastMoneySource.fetch_realtime_nav", return_value=fallback
+        ) as mock_fetch:
+            call_command("calculate_accuracy", stdout=StringIO())
+
+        mock_fetch.assert_called_once_with("000001")
+        navs = dict(
+            EstimateAccuracy.objects.values_list("fund__fund_code", "actual_nav").distinct()
+        )
+        assert navs == {"000000": Decimal("1.0100"), "000001": Decimal("1.0300")}
+
+    @patch("requests.get")
+    def test_skips_nav_of_other_date(self, mock_get, target_date):
+        """接口已返回更新日期的净值时不作为估值日期的实际净值"""
+        from api.models import EstimateAccuracy
+
+        self._records(target_date, 1)
+        mock_get.return_value = self._mnfinfo_response(["000000"], date.today())
+
+        with patch(
+            "api.sources.eastmoney.EastMoneySource.fetch_realtime_nav",
+            return_value={"nav_date": date.today(), "unit_nav": Decimal("1.0300")},
+        ):
+            call_command("calculate_accuracy", stdout=StringIO())
+
+        record = EstimateAccuracy.objects.get()
+        assert record.actual_nav is None
+        assert record.error_rate is None
+
+    @patch("requests.get")
+    def test_sweeps_late_published_navs(self, mock_get, target_date):
+        """净值晚披露（T+2）的记录在之后的审计中补上，超出回查天数的记录不处理"""
+        from api.management.commands.calculate_accuracy import PENDING_LOOKBACK_DAYS
+        from api.models import EstimateAccuracy
+
+        late_date = target_date - timedelta(days=2)
+        late, stale = self._records(late_date, 2)
+        EstimateAccuracy.objects.filter(fund=stale).update(
+            estimate_date=target_date - timedelta(days=PENDING_LOOKBACK_DAYS + 1)
+        )
+        mock_get.return_value = self._mnfinfo_response([late.fund_code], late_date)
+
+        with patch("api.sources.eastmoney.EastMoneySource.fetch_realtime_nav", return_value=None):
+            call_command("calculate_accuracy", stdout=StringIO())
+
+        assert EstimateAccuracy.objects.get(fund=late).actual_nav == Decimal("1.0100")
+        assert EstimateAccuracy.objects.get(fund=stale).actual_nav is None
+
+
 @pytest.mark.django_db
 class TestRecalculatePositionsCommand:
     """测试重算持仓命令"""
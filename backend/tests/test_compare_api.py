@@ -4,15 +4,17 @@
 测试点：
 1. compare API 返回多只基金的指标数据
 2. 无历史数据的基金降级返回
-3. 超 5 只返回错误
+3. 超出对比数量上限返回错误（上限可配置）
 4. 单只基金返回提示
+5. 净值一次查询、只加载指标窗口，NumPy 结果与逐条计算一致
+6. 读取预计算的基金指标，缺失时现场计算并补写
 """
 
 from datetime import date, timedelta
 from decimal import Decimal
 
 import pytest
-from api.models import Fund, FundNavHistory
+from api.models import Fund, FundMetrics, FundNavHistory
 from django.test import Client
 
 
@@ -73,8 +75,9 @@ class TestCompareAPI:
         f2_data = [f for f in data["funds"] if f["fund_code"] == "161725"][0]
         assert f2_data["returns"]["1m"] is None
 
-    def test_over_five_funds_error(self):
-        codes = ",".join([str(i).zfill(6) for i in range(6)])
+    def test_over_max_funds_error(self):
+        """超过默认上限（20 只）返回 400"""
+        codes = ",".join([str(i).zfill(6) for i in range(21)])
         for code in codes.split(","):
             Fund.objects.create(fund_code=code, fund_name=f"基金{code}")
 
@@ -82,6 +85,26 @@ class TestCompareAPI:
         resp = client.get(f"/api/funds/compare/?codes={codes}")
         assert resp.status_code == 400
 
+    def test_max_funds_configurable(self, mocker):
+        """对比数量上限读取 fund_compare_max_funds 配置"""
+        settings = {"fund_compare_max_funds": 3}
+        mocker.patch(
+            "fundval.config.config.get",
+            side_effect=lambda key, default=None: settings.get(key, default),
+        )
+        codes = [str(i).zfill(6) for i in range(4)]
+        for code in codes:
+            Fund.objects.create(fund_code=code, fund_name=f"基金{code}")
+
+        client = Client()
+        resp = client.get(f"/api/funds/compare/?codes={','.join(codes)}")
+        assert resp.status_code == 400
+        assert "3" in resp.json()["error"]
+
+        resp = client.get(f"/api/funds/compare/?codes={','.join(codes[:3])}")
+        assert resp.status_code == 200
+        assert len(resp.json()["funds"]) == 3
+
     def test_single_fund_returns_error(self):
         Fund.objects.create(fund_code="000001", fund_name="基金A")
         client = Client()
@@ -97,3 +120,92 @@ class TestCompareAPI:
         assert resp.status_code == 200
         data = resp.json()
         assert len(data["funds"]) == 1  # 999999 不存在，跳过
+
+
+def _reference_metrics(navs):
+    """逐条计算的参考实现（与向量化前的算法一致）"""
+    vals = [float(n) for n in navs]
+    peak = vals[0]
+    max_dd = 0.0
+    for v in vals:
+        peak = max(peak, v)
+        max_dd = max(max_dd, (peak - v) / peak)
+    daily = [(vals[i] - vals[i - 1]) / vals[i - 1] for i in range(1, len(vals))]
+    mean = sum(daily) / len(daily)
+    vol = (sum((r - mean) ** 2 for r in daily) / (len(daily) - 1)) ** 0.5 * 252**0.5
+    sharpe = (mean * 252 - 0.02) / vol
+    return {
+        "max_drawdown": str(round(-max_dd * 100, 2)),
+        "volatility": str(round(vol * 100, 2)),
+        "sharpe": str(round(sharpe, 2)),
+    }
+
+
+@pytest.mark.django_db
+class TestCompareVectorized:
+    def test_matches_reference(self):
+        """NumPy 计算的收益与风险指标与逐条计算一致"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_nav_history(fund, days=400)
+        Fund.objects.create(fund_code="000002", fund_name="基金B")
+
+        resp = Client().get("/api/funds/compare/?codes=000001,000002")
+        data = resp.json()["funds"][0]
+
+        navs = list(
+            FundNavHistory.objects.filter(fund=fund)
+            .order_by("nav_date")
+            .values_list("nav_date", "unit_nav")
+        )
+        expected = _reference_metrics([n for _, n in navs])
+        for key, value in expected.items():
+            assert float(data["metrics"][key]) == pytest.approx(float(value), abs=0.01)
+
+        # 区间以最新净值日为基准
+        cutoff = navs[-1][0] - timedelta(days=30)
+        start_nav = [n for d, n in navs if d <= cutoff][-1]
+        end_nav = navs[-1][1]
+        assert data["returns"]["1m"] == str(round((end_nav - start_nav) / start_nav * 100, 2))
+
+    def test_metrics_window(self, mocker):
+        """风险指标只使用窗口内的净值（窗口前的暴跌不计入回撤）"""
+        settings = {"fund_metrics_window_days": 400}
+        mocker.patch(
+            "fundval.config.config.get",
+            side_effect=lambda key, default=None: settings.get(key, default),
+        )
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        Fund.objects.create(fund_code="000002", fund_name="基金B")
+        _create_nav_history(fund, days=365)
+        # 窗口之外：高点后腰斩
+        old = date.today() - timedelta(days=600)
+        FundNavHistory.objects.bulk_create(
+            [
+                FundNavHistory(fund=fund, nav_date=old, unit_nav=Decimal("10")),
+                FundNavHistory(fund=fund, nav_date=old + timedelta(days=1), unit_nav=Decimal("5")),
+            ]
+        )
+
+        resp = Client().get("/api/funds/compare/?codes=000001,000002")
+        data = resp.json()["funds"][0]
+        assert float(data["metrics"]["max_drawdown"]) > -50
+
+    def test_single_nav_query(self, django_assert_max_num_queries, django_assert_num_queries):
+        """多只基金的净值一次查询加载；指标落表后只读指标表"""
+        codes = []
+        for i in range(8):
+            fund = Fund.objects.create(fund_code=str(i).zfill(6), fund_name=f"基金{i}")
+            _create_nav_history(fund, days=120)
+            codes.append(fund.fund_code)
+
+        # 首次：基金 + 指标表 + 净值 + 写入指标
+        with django_assert_max_num_queries(4):
+            resp = Client().get(f"/api/funds/compare/?codes={','.join(codes)}")
+        assert resp.status_code == 200
+        assert all(f["metrics"]["volatility"] is not None for f in resp.json()["funds"])
+        assert FundMetrics.objects.count() == 8
+
+        # 再次：基金 + 指标表
+        with django_assert_num_queries(2):
+            again = Client().get(f"/api/funds/compare/?codes={','.join(codes)}")
+        assert again.json() == resp.json()
@@ -183,7 +183,7 @@ class TestFetchRealtimeNavUsesMobileAPI:
             )
 
     def test_returns_correct_format(self):
-        """返回格式 {'fund_code', 'nav', 'nav_date'} 正确"""
+        """返回格式 {'fund_code', 'nav', 'nav_date'} + 历史净值字段正确"""
         source = EastMoneySource()
 
         with patch("requests.get") as mock_get:
@@ -200,7 +200,14 @@ class TestFetchRealtimeNavUsesMobileAPI:
             result = source.fetch_realtime_nav("000001")
 
             assert isinstance(result, dict)
-            assert set(result.keys()) == {"fund_code", "nav", "nav_date"}
+            assert set(result.keys()) == {
+                "fund_code",
+                "nav",
+                "nav_date",
+                "unit_nav",
+                "accumulated_nav",
+                "daily_growth",
+            }
             assert result["fund_code"] == "000001"
             assert result["nav"] == Decimal("2.3456")
             assert result["nav_date"] == date(2026, 7, 28)
@@ -103,7 +103,7 @@ class TestEastMoneySourceTodayNav:
 class TestUpdateNavCommandWithToday:
     """update_nav --today 命令测试 (M1: 使用 Mobile API)"""
 
-    @patch("api.management.commands.update_nav._fetch_batch_nav")
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
     def test_update_nav_today_success(self, mock_fetch_batch):
         """测试 --today 参数成功更新当日净值"""
         from api.models import Fund
@@ -130,7 +130,7 @@ class TestUpdateNavCommandWithToday:
         assert fund.latest_nav == Decimal("1.1500")
         assert fund.latest_nav_date == today
 
-    @patch("api.management.commands.update_nav._fetch_batch_nav")
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
     def test_update_nav_today_skip_old_date(self, mock_fetch_batch):
         """测试 --today 参数跳过非当日净值"""
         from api.models import Fund
@@ -157,7 +157,7 @@ class TestUpdateNavCommandWithToday:
         assert fund.latest_nav == Decimal("1.1000")
         assert fund.latest_nav_date == date(2024, 2, 12)
 
-    @patch("api.management.commands.update_nav._fetch_batch_nav")
+    @patch("api.management.commands.update_nav.fetch_batch_nav")
     def test_update_nav_today_specific_fund(self, mock_fetch_batch):
         """测试 --today 参数指定基金代码（单基金模式走多源 fallback）"""
         from api.models import Fund
@@ -178,7 +178,7 @@ class TestUpdateNavCommandWithToday:
             latest_nav_date=date(2024, 2, 12),
         )
 
-        # 单基金模式 (_fetch_batch_nav 被 --fund_code 分支跳过，走多源 fallback)
+        # 单基金模式 (fetch_batch_nav 被 --fund_code 分支跳过，走多源 fallback)
         # mock fetch_today_nav 的底层 Mobile API
         with patch("requests.get") as mock_get:
             mock_get.return_value = _make_mobile_nav_response(
@@ -243,7 +243,7 @@ class TestCelerySchedule:
 
         schedule = app.conf.beat_schedule
 
-        # 验证 update-fund-today-nav-task 任务存在（21:30 和 23:00）
+        # 验证 update-fund-today-nav-task 任务存在（21:30 和 23:30）
         assert "update-fund-today-nav-task" in schedule
         task = schedule["update-fund-today-nav-task"]
         assert task["task"] == "api.tasks.update_fund_today_nav"
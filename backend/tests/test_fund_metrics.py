@@ -0,0 +1,187 @@
+"""
+测试基金指标预计算（FundMetrics）
+
+测试点：
+1. 批量计算所有有历史净值的基金，指标以最新净值日为基准
+2. 写入新历史净值标记过期，定时任务只重算过期 / 缺失的基金
+3. 读取时过期的行现场重算
+4. 刷新命令（默认增量 / --all / --fund_code）
+5. 投资报告持仓明细附带预计算指标
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from api.models import Fund, FundMetrics, FundNavHistory
+from api.services.fund_metrics import load_fund_metrics, refresh_fund_metrics
+from django.core.management import call_command
+
+
+def _create_navs(fund, days, end=None, start_nav=Decimal("1.0000"), step=Decimal("0.0010")):
+    """创建连续 days 天、每天上涨 step 的净值"""
+    end = end or date.today() - timedelta(days=1)
+    FundNavHistory.objects.bulk_create(
+        [
+            FundNavHistory(
+                fund=fund,
+                nav_date=end - timedelta(days=days - 1 - i),
+                unit_nav=start_nav + step * i,
+            )
+            for i in range(days)
+        ]
+    )
+
+
+@pytest.mark.django_db
+class TestRefreshFundMetrics:
+    def test_refresh_all_funds_with_history(self):
+        """没有指标的基金全部计算，没有净值的基金不写行"""
+        f1 = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        f2 = Fund.objects.create(fund_code="000002", fund_name="基金B")
+        Fund.objects.create(fund_code="000003", fund_name="无净值")
+        _create_navs(f1, 400)
+        _create_navs(f2, 40)
+
+        assert refresh_fund_metrics() == 2
+
+        m1 = FundMetrics.objects.get(fund=f1)
+        assert m1.nav_date == date.today() - timedelta(days=1)
+        # 单调上涨：没有回撤
+        assert m1.max_drawdown == 0
+        assert m1.volatility is not None
+        # 1 个月：最新净值 1.399，30 天前 1.369
+        assert m1.return_1m == (
+            (Decimal("1.399") - Decimal("1.369")) / Decimal("1.369") * 100
+        ).quantize(Decimal("0.0001"))
+
+        m2 = FundMetrics.objects.get(fund=f2)
+        assert m2.return_1m is not None
+        assert m2.return_3m is None
+        assert m2.volatility is None  # 不足 60 条
+
+    def test_periods_anchor_latest_nav_date(self):
+        """停更基金的区间收益以最后一个净值日为基准"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_navs(fund, 100, end=date.today() - timedelta(days=20))
+
+        refresh_fund_metrics()
+
+        metrics = FundMetrics.objects.get(fund=fund)
+        assert metrics.nav_date == date.today() - timedelta(days=20)
+        assert metrics.return_1m is not None
+
+    def test_new_nav_marks_stale_and_refreshes_incrementally(self):
+        """写入新净值只标记对应基金，定时刷新只重算过期的基金"""
+        from api.services.nav_history import record_confirmed_navs
+
+        f1 = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        f2 = Fund.objects.create(fund_code="000002", fund_name="基金B")
+        _create_navs(f1, 100)
+        _create_navs(f2, 100)
+        refresh_fund_metrics()
+
+        record_confirmed_navs([(f1, {"unit_nav": Decimal("2.0000"), "nav_date": date.today()})])
+
+        assert FundMetrics.objects.get(fund=f1).stale is True
+        assert FundMetrics.objects.get(fund=f2).stale is False
+
+        f2_updated_at = FundMetrics.objects.get(fund=f2).updated_at
+        assert refresh_fund_metrics() == 1
+
+        m1 = FundMetrics.objects.get(fund=f1)
+        assert m1.stale is False
+        assert m1.nav_date == date.today()
+        assert FundMetrics.objects.get(fund=f2).updated_at == f2_updated_at
+
+    def test_nightly_task(self):
+        """定时任务刷新缺失的基金指标"""
+        from api.tasks import refresh_fund_metrics as refresh_task
+
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_navs(fund, 100)
+
+        assert "1" in refresh_task()
+        assert FundMetrics.objects.filter(fund=fund, stale=False).exists()
+
+    def test_load_recomputes_stale_rows(self):
+        """读取时过期的行现场重算并写回"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_navs(fund, 100)
+        refresh_fund_metrics()
+        FundMetrics.objects.filter(fund=fund).update(stale=True, return_1m=Decimal("99"))
+
+        result = load_fund_metrics([fund.id])
+
+        assert result[fund.id]["returns"]["1m"] != "99.00"
+        assert FundMetrics.objects.get(fund=fund).stale is False
+
+    def test_fund_without_navs_in_window_removed(self):
+        """窗口内已没有净值的基金删除旧指标行"""
+        fund = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        _create_navs(fund, 100)
+        refresh_fund_metrics()
+        FundNavHistory.objects.filter(fund=fund).delete()
+
+        refresh_fund_metrics([fund.id])
+
+        assert not FundMetrics.objects.filter(fund=fund).exists()
+
+
+@pytest.mark.django_db
+class TestRefreshFundMetricsCommand:
+    def test_default_only_stale(self):
+        """默认只刷新过期 / 缺失的基金，--all 全量刷新"""
+        f1 = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        f2 = Fund.objects.create(fund_code="000002", fund_name="基金B")
+        _create_navs(f1, 100)
+        _create_navs(f2, 100)
+        refresh_fund_metrics([f1.id])
+
+        out = StringIO()
+        call_command("refresh_fund_metrics", stdout=out)
+        assert "1 只基金" in out.getvalue()
+
+        out = StringIO()
+        call_command("refresh_fund_metrics", "--all", stdout=out)
+        assert "2 只基金" in out.getvalue()
+
+    def test_single_fund(self):
+        """--fund_code 只刷新指定基金"""
+        f1 = Fund.objects.create(fund_code="000001", fund_name="基金A")
+        f2 = Fund.objects.create(fund_code="000002", fund_name="基金B")
+        _create_navs(f1, 100)
+        _create_navs(f2, 100)
+
+        call_command("refresh_fund_metrics", "--fund_code", "000002", stdout=StringIO())
+
+        assert list(FundMetrics.objects.values_list("fund_id", flat=True)) == [f2.id]
+
+
+@pytest.mark.django_db
+class TestReportMetrics:
+    def test_position_summary_includes_metrics(self):
+        """投资报告的持仓明细附带近 1 年收益和最大回撤"""
+        from api.models import Account, Position
+        from api.views import build_report_context
+        from django.contrib.auth import get_user_model
+
+        user = get_user_model().objects.create_user(username="u", password="p")
+        parent = Account.objects.create(user=user, name="总账户")
+        child = Account.objects.create(user=user, name="子账户", parent=parent)
+        fund = Fund.objects.create(fund_code="000001", fund_name="测试基金", latest_nav="1.5")
+        Position.objects.create(
+            account=child, fund=fund, holding_share="100", holding_cost="120.00", holding_nav="1.2"
+        )
+        FundMetrics.objects.create(
+            fund=fund,
+            nav_date=date.today(),
+            return_1y=Decimal("12.3456"),
+            max_drawdown=Decimal("-8.5000"),
+        )
+
+        ctx = build_report_context(user, "weekly")
+
+        assert "近1年 12.35%" in ctx["position_summary"]
+        assert "最大回撤 -8.50%" in ctx["position_summary"]
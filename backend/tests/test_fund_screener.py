@@ -0,0 +1,121 @@
+"""
+测试基金筛选 API
+
+测试点：
+1. 区间条件（收益、回撤、波动率、估值涨幅）与基金类型筛选
+2. 排序（默认近 1 年收益降序，支持升序 / 其他字段），排序字段为空的基金不返回
+3. keyset 分页：逐页遍历不重不漏，同值按基金 ID 稳定排序，单次查询无 COUNT
+4. 参数校验
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from api.models import Fund, FundMetrics
+from django.test import Client
+
+URL = "/api/funds/screen/"
+
+
+def _fund(code, fund_type="股票型", estimate_growth=None, **metrics):
+    fund = Fund.objects.create(
+        fund_code=code,
+        fund_name=f"基金{code}",
+        fund_type=fund_type,
+        estimate_growth=estimate_growth,
+    )
+    FundMetrics.objects.create(fund=fund, nav_date=date(2026, 6, 1), **metrics)
+    return fund
+
+
+def _codes(resp):
+    return [item["fund_code"] for item in resp.json()["results"]]
+
+
+@pytest.mark.django_db
+class TestFundScreener:
+    def test_range_filters(self):
+        """区间条件为闭区间，多个条件同时生效"""
+        _fund("000001", return_1y=Decimal("25"), max_drawdown=Decimal("-10"))
+        _fund("000002", return_1y=Decimal("15"), max_drawdown=Decimal("-30"))
+        _fund("000003", return_1y=Decimal("5"), max_drawdown=Decimal("-5"))
+        _fund("000004", return_1y=Decimal("10"), max_drawdown=Decimal("-20"))
+
+        resp = Client().get(URL, {"return_1y_min": "10", "max_drawdown_min": "-20"})
+
+        assert resp.status_code == 200
+        assert _codes(resp) == ["000001", "000004"]
+        item = resp.json()["results"][0]
+        assert item["returns"]["1y"] == "25.00"
+        assert item["metrics"]["max_drawdown"] == "-10.00"
+
+    def test_fund_type_and_estimate_growth(self):
+        """基金类型按前缀匹配，估值涨幅条件作用于基金表"""
+        _fund("000001", fund_type="混合型-灵活", estimate_growth=Decimal("1.5"), return_1y=1)
+        _fund("000002", fund_type="混合型-偏股", estimate_growth=Decimal("-0.5"), return_1y=2)
+        _fund("000003", fund_type="股票型", estimate_growth=Decimal("2.0"), return_1y=3)
+
+        resp = Client().get(URL, {"fund_type": "混合型", "estimate_growth_min": "0"})
+        assert _codes(resp) == ["000001"]
+        assert resp.json()["results"][0]["estimate_growth"] == "1.5000"
+
+        resp = Client().get(URL, {"ordering": "-estimate_growth"})
+        assert _codes(resp) == ["000003", "000001", "000002"]
+
+    def test_ordering(self):
+        """默认近 1 年收益降序；升序排序；排序字段为空的基金不返回"""
+        _fund("000001", return_1y=Decimal("5"), volatility=Decimal("12"))
+        _fund("000002", return_1y=Decimal("15"), volatility=Decimal("8"))
+        _fund("000003", return_1y=None, volatility=Decimal("20"))
+
+        assert _codes(Client().get(URL)) == ["000002", "000001"]
+        assert _codes(Client().get(URL, {"ordering": "volatility"})) == [
+            "000002",
+            "000001",
+            "000003",
+        ]
+
+    def test_keyset_pagination(self, django_assert_num_queries):
+        """逐页遍历覆盖全部基金，同值按基金 ID 稳定排序，每页一次查询"""
+        for i in range(25):
+            # 每 5 只一个相同收益值，考察同值翻页
+            _fund(str(i).zfill(6), return_1y=Decimal(i // 5))
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {"page_size": 7}
+            if cursor:
+                params["cursor"] = cursor
+            with django_assert_num_queries(1):
+                data = Client().get(URL, params).json()
+            seen.extend(item["fund_code"] for item in data["results"])
+            pages += 1
+            cursor = data["next"]
+            if not cursor:
+                break
+
+        assert pages == 4
+        assert len(seen) == len(set(seen)) == 25
+        returns = [FundMetrics.objects.get(fund__fund_code=code).return_1y for code in seen]
+        assert returns == sorted(returns, reverse=True)
+
+    def test_invalid_params(self):
+        """非法数字、排序字段、游标返回 400"""
+        _fund("000001", return_1y=1)
+        client = Client()
+
+        assert client.get(URL, {"return_1y_min": "abc"}).status_code == 400
+        assert client.get(URL, {"ordering": "fund_name"}).status_code == 400
+        assert client.get(URL, {"cursor": "not-a-cursor"}).status_code == 400
+
+    def test_cursor_ordering_mismatch(self):
+        """游标只能用于生成它的排序"""
+        for i in range(3):
+            _fund(str(i).zfill(6), return_1y=i, sharpe=i)
+
+        cursor = Client().get(URL, {"page_size": 1}).json()["next"]
+        resp = Client().get(URL, {"cursor": cursor, "ordering": "-sharpe"})
+        assert resp.status_code == 400
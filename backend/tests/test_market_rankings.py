@@ -5,12 +5,21 @@
 1. market-indices 返回多指数行情
 2. rankings gain 返回涨幅排序
 3. rankings popular 返回人气排序
+4. 排行榜快照：读取快照不聚合、按名次区间分页、分类快照、重建时机
+5. 构建记录：空榜单不重复重建、等锁后已重建的类型跳过；非预建分类现场查询不截断
 """
 
 from unittest.mock import MagicMock, patch
 
 import pytest
-from api.models import Account, Fund, Position
+from api.models import (
+    Account,
+    EstimateAccuracy,
+    Fund,
+    FundRanking,
+    FundRankingBuild,
+    Position,
+)
 from django.test import Client
 
 
@@ -97,3 +106,157 @@ class TestRankingsAPI:
         data = resp.json()["results"]
         assert len(data) == 1
         assert data[0]["fund_code"] == "F2"
+
+
+@pytest.mark.django_db
+class TestRankingSnapshots:
+    def test_reads_snapshot_until_rebuilt(self):
+        """请求读取快照，估值变化在重建后才反映到名次"""
+        from api.services.fund_ranking import rebuild_rankings
+
+        g1 = Fund.objects.create(fund_code="G1", fund_name="基金1", estimate_growth="3.5")
+        Fund.objects.create(fund_code="G2", fund_name="基金2", estimate_growth="2.1")
+
+        client = Client()
+        assert (
+            client.get("/api/funds/rankings/?type=gain").json()["results"][0]["fund_code"] == "G1"
+        )
+
+        g1.estimate_growth = "1.0"
+        g1.save()
+        results = client.get("/api/funds/rankings/?type=gain").json()["results"]
+        assert [r["fund_code"] for r in results] == ["G1", "G2"]
+        # 返回快照中的涨幅，与名次一致
+        assert [r["estimate_growth"] for r in results] == ["3.5000", "2.1000"]
+
+        rebuild_rankings(["gain"])
+        codes = [
+            r["fund_code"] for r in client.get("/api/funds/rankings/?type=gain").json()["results"]
+        ]
+        assert codes == ["G2", "G1"]
+
+    def test_page_is_rank_range(self, django_assert_num_queries):
+        """翻页按名次区间读取：快照存在性 + 总数 + 一页数据，不做聚合"""
+        from api.services.fund_ranking import rebuild_rankings
+
+        for i in range(45):
+            Fund.objects.create(fund_code=f"F{i:02d}", fund_name=f"基金{i}", estimate_growth=str(i))
+        rebuild_rankings(["gain"])
+
+        with django_assert_num_queries(3):
+            data = Client().get("/api/funds/rankings/?type=gain&page=3").json()
+
+        assert data["count"] == 45
+        assert [r["fund_code"] for r in data["results"]] == ["F04", "F03", "F02", "F01", "F00"]
+
+        # 越界页码取最后一页
+        data = Client().get("/api/funds/rankings/?type=gain&page=99").json()
+        assert data["results"][0]["fund_code"] == "F04"
+
+    def test_category_snapshots(self):
+        """预建分类读取分类快照，其他分类从全部榜单过滤"""
+        Fund.objects.create(
+            fund_code="S1", fund_name="股票1", fund_type="股票型", estimate_growth="2"
+        )
+        Fund.objects.create(
+            fund_code="H1", fund_name="混合1", fund_type="混合型-偏股", estimate_growth="3"
+        )
+        Fund.objects.create(
+            fund_code="S2", fund_name="股票2", fund_type="股票型", estimate_growth="1"
+        )
+
+        client = Client()
+        data = client.get("/api/funds/rankings/?type=gain&category=股票").json()
+        assert data["count"] == 2
+        assert [r["fund_code"] for r in data["results"]] == ["S1", "S2"]
+        assert FundRanking.objects.filter(rank_type="gain", category="股票").count() == 2
+
+        data = client.get("/api/funds/rankings/?type=gain&category=偏股").json()
+        assert [r["fund_code"] for r in data["results"]] == ["H1"]
+
+    def test_other_category_not_truncated(self):
+        """非预建分类现场查询，不受全部榜单保留名次的限制"""
+        Fund.objects.create(
+            fund_code="S1", fund_name="股票1", fund_type="股票型", estimate_growth="3"
+        )
+        Fund.objects.create(
+            fund_code="S2", fund_name="股票2", fund_type="股票型", estimate_growth="2"
+        )
+        Fund.objects.create(
+            fund_code="H1", fund_name="混合1", fund_type="混合型-偏股", estimate_growth="1"
+        )
+
+        with patch("api.services.fund_ranking.DEFAULT_RANKING_DEPTH", 2):
+            data = Client().get("/api/funds/rankings/?type=gain&category=偏股").json()
+
+        assert FundRanking.objects.filter(rank_type="gain", category="").count() == 2
+        assert data["count"] == 1
+        assert [r["fund_code"] for r in data["results"]] == ["H1"]
+
+    def test_accuracy_and_popular_values(self):
+        """准度榜返回平均误差，人气榜返回持仓数"""
+        from django.contrib.auth import get_user_model
+
+        fund = Fund.objects.create(fund_code="A1", fund_name="准度基金")
+        for day, error in ((1, "0.0100"), (2, "-0.0300")):
+            EstimateAccuracy.objects.create(
+                fund=fund,
+                source_name="eastmoney",
+                estimate_date=f"2026-06-0{day}",
+                estimate_nav="1.0",
+                error_rate=error,
+            )
+        user = get_user_model().objects.create_user(username="u", password="p")
+        parent = Account.objects.create(user=user, name="账户")
+        child = Account.objects.create(user=user, name="子账户", parent=parent)
+        Position.objects.create(account=child, fund=fund, holding_share="10", holding_cost="10")
+
+        client = Client()
+        accuracy = client.get("/api/funds/rankings/?type=accuracy").json()["results"]
+        assert accuracy[0]["avg_error"] == "0.0200"
+        popular = client.get("/api/funds/rankings/?type=popular").json()["results"]
+        assert popular[0]["pos_count"] == 1
+
+    def test_empty_ranking_built_once(self, django_assert_num_queries):
+        """没有持仓的人气榜记录构建时间，之后的请求不再重建"""
+        client = Client()
+        assert client.get("/api/funds/rankings/?type=popular").json()["count"] == 0
+
+        build = FundRankingBuild.objects.get(rank_type="popular")
+        assert build.built_at is not None
+        assert build.row_count == 0
+
+        with django_assert_num_queries(3):
+            data = client.get("/api/funds/rankings/?type=popular").json()
+        assert data == {"count": 0, "results": []}
+
+    def test_rebuild_serialized_and_skips_built(self):
+        """重建锁住构建记录；首次读取等锁后发现已被重建则跳过"""
+        from api.services.fund_ranking import rebuild_rankings
+        from django.db.models.query import QuerySet
+
+        Fund.objects.create(fund_code="G1", fund_name="基金1", estimate_growth="1")
+
+        with patch.object(
+            QuerySet, "select_for_update", autospec=True, side_effect=QuerySet.select_for_update
+        ) as spy:
+            assert rebuild_rankings(["gain"]) == 1
+        assert spy.call_args.args[0].model is FundRankingBuild
+
+        built_at = FundRankingBuild.objects.get(rank_type="gain").built_at
+        assert rebuild_rankings(["gain"], only_missing=True) == 0
+        assert FundRankingBuild.objects.get(rank_type="gain").built_at == built_at
+        assert FundRanking.objects.filter(rank_type="gain").count() == 1
+
+    def test_nightly_task_rebuilds_all_types(self):
+        """晚间任务重建全部榜单类型"""
+        from api.tasks import rebuild_fund_rankings
+
+        Fund.objects.create(
+            fund_code="G1", fund_name="基金1", fund_type="股票型", estimate_growth="1"
+        )
+
+        rebuild_fund_rankings()
+
+        assert FundRanking.objects.filter(rank_type="gain", category="").count() == 1
+        assert FundRanking.objects.filter(rank_type="gain", category="股票").count() == 1
@@ -0,0 +1,330 @@
+"""
+测试基金净值覆盖水位
+
+测试点：
+1. 根据已入库净值计算首尾日期与缺失交易日区间
+2. 增量同步只拉取缺口 + 最新水位之后的区间
+3. 缺口补齐后从水位中移除；同步后只并入本次写入的日期，不重新读取全部历史
+4. 连续多次修复无进展的缺口转为数据源缺失，不再重试
+5. 批量同步一次取出所有基金的水位
+6. 批量写入确认净值时增量推进水位；基金第一条净值由批量写入时，下次同步全量回填历史
+"""
+
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from api.models import Fund, FundNavCoverage, FundNavHistory
+from api.services.nav_history import (
+    MAX_REPAIR_ATTEMPTS,
+    batch_sync_nav_history,
+    record_confirmed_navs,
+    refresh_nav_coverage,
+    sync_nav_history,
+)
+
+
+def _nav(nav_date, unit_nav="1.0000"):
+    return {
+        "nav_date": nav_date,
+        "unit_nav": Decimal(unit_nav),
+        "accumulated_nav": None,
+        "daily_growth": None,
+    }
+
+
+@pytest.mark.django_db
+class TestNavCoverage:
+    """测试覆盖水位计算"""
+
+    @pytest.fixture
+    def fund(self):
+        return Fund.objects.create(fund_code="000001", fund_name="测试基金")
+
+    def _create_navs(self, fund, dates):
+        for d in dates:
+            FundNavHistory.objects.create(fund=fund, nav_date=d, unit_nav=Decimal("1.0000"))
+
+    def test_refresh_detects_gaps(self, fund):
+        """中间缺失的交易日被记录为缺口，周末和节假日不算"""
+        # 2024-01-02 ~ 2024-01-12，缺 01-04、01-05、01-09
+        self._create_navs(
+            fund,
+            [
+                date(2024, 1, 2),
+                date(2024, 1, 3),
+                date(2024, 1, 8),
+                date(2024, 1, 10),
+                date(2024, 1, 12),
+            ],
+        )
+
+        coverage = refresh_nav_coverage(fund)
+
+        assert coverage.first_nav_date == date(2024, 1, 2)
+        assert coverage.last_nav_date == date(2024, 1, 12)
+        assert coverage.gaps == [
+            ["2024-01-04", "2024-01-05"],
+            ["2024-01-09", "2024-01-09"],
+            ["2024-01-11", "2024-01-11"],
+        ]
+
+    def test_refresh_no_data(self, fund):
+        """没有净值数据时水位为空"""
+        coverage = refresh_nav_coverage(fund)
+
+        assert coverage.first_nav_date is None
+        assert coverage.last_nav_date is None
+        assert coverage.gaps == []
+
+    def test_refresh_stale_gap_without_navs(self, fund):
+        """净值已清空时修复次数达到上限不报错，缺口清空"""
+        FundNavCoverage.objects.create(
+            fund=fund,
+            gaps=[["2024-01-04", "2024-01-05"]],
+            repair_attempts=MAX_REPAIR_ATTEMPTS - 1,
+        )
+
+        coverage = refresh_nav_coverage(fund, repaired_days={date(2024, 1, 4), date(2024, 1, 5)})
+
+        assert coverage.gaps == []
+        assert coverage.upstream_gaps == []
+        assert coverage.repair_attempts == 0
+
+
+@pytest.mark.django_db
+class TestGapAwareSync:
+    """测试基于水位的增量同步"""
+
+    @pytest.fixture
+    def fund(self):
+        fund = Fund.objects.create(fund_code="000001", fund_name="测试基金")
+        for d in [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 8)]:
+            FundNavHistory.objects.create(fund=fund, nav_date=d, unit_nav=Decimal("1.0000"))
+        refresh_nav_coverage(fund)
+        return fund
+
+    def test_sync_requests_gap_and_tail(self, fund):
+        """增量同步从最早的缺口开始拉取，而不是只从最新日期开始"""
+        with patch("api.services.nav_history.SourceRegistry.get_source") as mock_get_source:
+            mock_source = MagicMock()
+            mock_source.fetch_nav_history.return_value = []
+            mock_get_source.return_value = mock_source
+
+            sync_nav_history("000001", end_date=date(2024, 1, 10))
+
+            # 缺口（01-04 ~ 01-05）与尾部（01-09 ~ 01-10）相邻，合并为一次请求
+            mock_source.fetch_nav_history.assert_any_call(
+                "000001", date(2024, 1, 4), date(2024, 1, 10)
+            )
+
+    def test_sync_repairs_gap(self, fund):
+        """缺口数据补齐后从水位中移除"""
+        mock_data = [_nav(date(2024, 1, 4)), _nav(date(2024, 1, 5)), _nav(date(2024, 1, 9))]
+
+        with patch("api.services.nav_history.SourceRegistry.get_source") as mock_get_source:
+            mock_source = MagicMock()
+            mock_source.fetch_nav_history.return_value = mock_data
+            mock_get_source.return_value = mock_source
+
+            count = sync_nav_history("000001", end_date=date(2024, 1, 9))
+
+        assert count == 3
+        coverage = FundNavCoverage.objects.get(fund=fund)
+        assert coverage.gaps == []
+        assert coverage.last_nav_date == date(2024, 1, 9)
+        fund.refresh_from_db()
+        assert fund.latest_nav_date == date(2024, 1, 9)
+
+    def test_sync_advances_coverage_incrementally(self, fund):
+        """已有水位时同步只处理新写入的日期，不重新加载全部已入库日期"""
+        from api.services import nav_history
+
+        mock_data = [_nav(date(2024, 1, 9)), _nav(date(2024, 1, 10))]
+
+        with (
+            patch("api.services.nav_history.SourceRegistry.get_source") as mock_get_source,
+            patch.object(
+                nav_history, "get_trading_days", wraps=nav_history.get_trading_days
+            ) as spy,
+        ):
+            mock_source = MagicMock()
+            mock_source.fetch_nav_history.return_value = mock_data
+            mock_get_source.return_value = mock_source
+
+            sync_nav_history("000001", end_date=date(2024, 1, 10))
+
+        # 只展开已有缺口（01-04 ~ 01-05）与新增尾部，不从最早净值日期重新遍历日历
+        assert all(call.args[0] > date(2024, 1, 2) for call in spy.call_args_list)
+        coverage = FundNavCoverage.objects.get(fund=fund)
+        assert coverage.last_nav_date == date(2024, 1, 10)
+        assert coverage.gaps == [["2024-01-04", "2024-01-05"]]
+
+    def test_unrepairable_gap_moves_to_upstream(self, fund):
+        """多次修复无进展的缺口转为数据源缺失，不再请求"""
+        with patch("api.services.nav_history.SourceRegistry.get_source") as mock_get_source:
+            mock_source = MagicMock()
+            mock_source.fetch_nav_history.return_value = []
+            mock_get_source.return_value = mock_source
+
+            for _ in range(MAX_REPAIR_ATTEMPTS):
+                sync_nav_history("000001", end_date=date(2024, 1, 8))
+
+            coverage = FundNavCoverage.objects.get(fund=fund)
+            assert coverage.gaps == []
+            assert coverage.upstream_gaps == [["2024-01-04", "2024-01-05"]]
+
+            # 之后不再请求已确认缺失的区间
+            mock_source.fetch_nav_history.reset_mock()
+            sync_nav_history("000001", end_date=date(2024, 1, 8))
+            mock_source.fetch_nav_history.assert_not_called()
+
+    def test_coverage_rebuilt_when_missing(self):
+        """旧数据没有水位记录时按已入库数据重建"""
+        fund = Fund.objects.create(fund_code="000002", fund_name="测试基金2")
+        FundNavHistory.objects.create(
+            fund=fund, nav_date=date(2024, 1, 2), unit_nav=Decimal("1.0000")
+        )
+
+        with patch("api.services.nav_history.SourceRegistry.get_source") as mock_get_source:
+            mock_source = MagicMock()
+            mock_source.fetch_nav_history.return_value = []
+            mock_get_source.return_value = mock_source
+
+            sync_nav_history("000002", end_date=date(2024, 1, 3))
+
+            mock_source.fetch_nav_history.assert_any_call(
+                "000002", date(2024, 1, 3), date(2024, 1, 3)
+            )
+
+        assert FundNavCoverage.objects.filter(fund=fund).exists()
+
+    def test_batch_sync_uses_coverage(self, fund):
+        """批量同步同样按水位增量拉取"""
+        Fund.objects.create(fund_code="000002", fund_name="测试基金2")
+
+        with patch("api.services.nav_history.SourceRegistry.get_source") as mock_get_source:
+            mock_source = MagicMock()
+            mock_source.fetch_nav_history.return_value = [_nav(date(2024, 1, 4))]
+            mock_get_source.return_value = mock_source
+
+            results = batch_sync_nav_history(
+                ["000001", "000002", "999999"], end_date=date(2024, 1, 5)
+            )
+
+        assert results["000001"]["success"] is True
+        assert results["000002"]["success"] is True
+        assert results["999999"]["success"] is False
+        assert "基金不存在" in results["999999"]["error"]
+
+
+@pytest.mark.django_db
+class TestRecordConfirmedNavs:
+    """测试批量写入确认净值"""
+
+    @pytest.fixture
+    def fund(self):
+        fund = Fund.objects.create(fund_code="000001", fund_name="测试基金")
+        for d in [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 5)]:
+            FundNavHistory.objects.create(fund=fund, nav_date=d, unit_nav=Decimal("1.0000"))
+        refresh_nav_coverage(fund)
+        return fund
+
+    def test_upsert_history(self, fund):
+        """新日期插入，已有日期覆盖；没有单位净值的记录跳过，不用累计净值 nav 顶替"""
+        fund2 = Fund.objects.create(fund_code="000002", fund_name="测试基金2")
+
+        count = record_confirmed_navs(
+            [
+                (
+                    fund,
+                    {
+                        "nav": Decimal("2.5000"),
+                        "nav_date": date(2024, 1, 5),
+                        "unit_nav": Decimal("1.2000"),
+                        "accumulated_nav": Decimal("2.5000"),
+                        "daily_growth": Decimal("0.50"),
+                    },
+                ),
+                (fund2, {"nav": Decimal("1.3000"), "nav_date": date(2024, 1, 5)}),
+                (fund2, {"nav": None, "nav_date": date(2024, 1, 4)}),
+            ]
+        )
+
+        assert count == 1
+        nav = FundNavHistory.objects.get(fund=fund, nav_date=date(2024, 1, 5))
+        assert nav.unit_nav == Decimal("1.2000")
+        assert nav.accumulated_nav == Decimal("2.5000")
+        assert nav.daily_growth == Decimal("0.5000")
+        assert not FundNavHistory.objects.filter(fund=fund2).exists()
+        # 没有水位的基金不创建水位
+        assert not FundNavCoverage.objects.filter(fund=fund2).exists()
+
+    def test_upsert_keeps_existing_fields(self, fund):
+        """覆盖已有日期时，本次缺失的累计净值 / 日增长率保留已入库的值"""
+        record_confirmed_navs(
+            [
+                (
+                    fund,
+                    {
+                        "nav_date": date(2024, 1, 5),
+                        "unit_nav": Decimal("1.2000"),
+                        "accumulated_nav": Decimal("2.5000"),
+                        "daily_growth": Decimal("0.50"),
+                    },
+                )
+            ]
+        )
+
+        record_confirmed_navs(
+            [(fund, {"nav_date": date(2024, 1, 5), "unit_nav": Decimal("1.2100")})]
+        )
+
+        nav = FundNavHistory.objects.get(fund=fund, nav_date=date(2024, 1, 5))
+        assert nav.unit_nav == Decimal("1.2100")
+        assert nav.accumulated_nav == Decimal("2.5000")
+        assert nav.daily_growth == Decimal("0.5000")
+
+    def test_advance_coverage(self, fund):
+        """写入水位之后的日期推进 last_nav_date，跳过的交易日记为缺口"""
+        record_confirmed_navs([(fund, {"unit_nav": Decimal("1.1"), "nav_date": date(2024, 1, 10)})])
+
+        coverage = FundNavCoverage.objects.get(fund=fund)
+        assert coverage.last_nav_date == date(2024, 1, 10)
+        assert coverage.gaps == [["2024-01-04", "2024-01-04"], ["2024-01-08", "2024-01-09"]]
+
+    def test_fill_gap_in_coverage(self, fund):
+        """写入缺口内的日期后缺口移除"""
+        record_confirmed_navs([(fund, {"unit_nav": Decimal("1.1"), "nav_date": date(2024, 1, 4)})])
+
+        coverage = FundNavCoverage.objects.get(fund=fund)
+        assert coverage.last_nav_date == date(2024, 1, 5)
+        assert coverage.gaps == []
+
+    def test_first_nav_triggers_full_backfill(self):
+        """新基金的第一条净值来自批量写入时，下次同步拉取全部历史"""
+        fund = Fund.objects.create(fund_code="000002", fund_name="新持有基金")
+        record_confirmed_navs([(fund, {"unit_nav": Decimal("1.1"), "nav_date": date(2024, 1, 5)})])
+        record_confirmed_navs([(fund, {"unit_nav": Decimal("1.2"), "nav_date": date(2024, 1, 8)})])
+
+        coverage = FundNavCoverage.objects.get(fund=fund)
+        assert coverage.last_nav_date is None
+
+        with patch("api.services.nav_history.SourceRegistry.get_source") as mock_get_source:
+            mock_source = MagicMock()
+            mock_source.fetch_nav_history.return_value = [
+                _nav(date(2024, 1, 2)),
+                _nav(date(2024, 1, 3)),
+                _nav(date(2024, 1, 4)),
+            ]
+            mock_get_source.return_value = mock_source
+
+            sync_nav_history("000002", end_date=date(2024, 1, 8))
+
+            mock_source.fetch_nav_history.assert_called_once_with("000002", None, date(2024, 1, 8))
+
+        coverage.refresh_from_db()
+        assert coverage.first_nav_date == date(2024, 1, 2)
+        assert coverage.last_nav_date == date(2024, 1, 8)
+        assert coverage.gaps == []
@@ -393,3 +393,123 @@ class TestFundNavHistoryAPI:
         assert response.status_code == 200
         assert len(response.data) == 3
         assert all(len(response.data[code]) == 1 for code in ["000001", "000002", "000003"])
+
+    def test_batch_query_single_database_query(self, client, nav_history):
+        """批量查询多个基金只发起一次数据库查询，格式与单基金查询一致"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for i in range(2, 6):
+            fund = Fund.objects.create(fund_code=f"00000{i}", fund_name=f"基金{i}")
+            FundNavHistory.objects.create(
+                fund=fund, nav_date=date(2024, 1, 1), unit_nav=Decimal("3.0000")
+            )
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(
+                "/api/nav-history/batch_query/",
+                {"fund_codes": ["000001", "000002", "000003", "000004", "000005", "999999"]},
+                format="json",
+            )
+
+        assert response.status_code == 200
+        assert len(ctx.captured_queries) == 1
+        assert response.data["999999"] == []
+        assert len(response.data["000003"]) == 1
+
+        rows = response.data["000001"]
+        assert [r["nav_date"] for r in rows] == [f"2024-01-0{i}" for i in range(5, 0, -1)]
+        assert rows[-1]["fund_code"] == "000001"
+        assert rows[-1]["fund_name"] == "测试基金"
+        assert rows[-1]["unit_nav"] == "1.0001"
+        assert rows[-1]["daily_growth"] == "1.0000"
+        assert set(rows[-1]) == {
+            "id",
+            "fund_code",
+            "fund_name",
+            "nav_date",
+            "unit_nav",
+            "accumulated_nav",
+            "daily_growth",
+            "created_at",
+            "updated_at",
+        }
+
+
+@pytest.mark.django_db
+class TestNavHistoryExport:
+    """测试历史净值流式导出"""
+
+    @pytest.fixture
+    def auth_client(self):
+        user = User.objects.create_user(username="exporter", password="pass123456")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    @pytest.fixture
+    def nav_history(self):
+        fund1 = Fund.objects.create(fund_code="000001", fund_name="基金1")
+        fund2 = Fund.objects.create(fund_code="000002", fund_name="基金2")
+        for i in range(1, 4):
+            FundNavHistory.objects.create(
+                fund=fund1,
+                nav_date=date(2024, 1, i),
+                unit_nav=Decimal(f"1.{i:04d}"),
+                accumulated_nav=Decimal(f"2.{i:04d}"),
+            )
+        FundNavHistory.objects.create(
+            fund=fund2, nav_date=date(2024, 1, 2), unit_nav=Decimal("3.0000")
+        )
+
+    def _content(self, response) -> str:
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_export_requires_auth(self):
+        """导出需要登录"""
+        response = APIClient().get("/api/nav-history/export/")
+
+        assert response.status_code == 401
+
+    def test_export_csv(self, auth_client, nav_history):
+        """CSV 导出：表头 + 按日期升序，空值为空串"""
+        response = auth_client.get(
+            "/api/nav-history/export/", {"fund_codes": "000001", "start_date": "2024-01-02"}
+        )
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/csv")
+        lines = self._content(response).splitlines()
+        assert lines == [
+            "fund_code,nav_date,unit_nav,accumulated_nav,daily_growth",
+            "000001,2024-01-02,1.0002,2.0002,",
+            "000001,2024-01-03,1.0003,2.0003,",
+        ]
+
+    def test_export_ndjson(self, auth_client, nav_history):
+        """NDJSON 导出：每行一个 JSON 对象，多基金过滤"""
+        import json
+
+        response = auth_client.get(
+            "/api/nav-history/export/",
+            {"fund_codes": "000001,000002", "end_date": "2024-01-02", "export_format": "ndjson"},
+        )
+
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        assert len(rows) == 3
+        assert {
+            "fund_code": "000002",
+            "nav_date": "2024-01-02",
+            "unit_nav": "3.0000",
+            "accumulated_nav": None,
+            "daily_growth": None,
+        } in rows
+
+    def test_export_invalid_params(self, auth_client):
+        """不支持的格式 / 日期格式错误返回 400"""
+        response = auth_client.get("/api/nav-history/export/", {"export_format": "xlsx"})
+        assert response.status_code == 400
+
+        response = auth_client.get("/api/nav-history/export/", {"start_date": "2024/01/01"})
+        assert response.status_code == 400
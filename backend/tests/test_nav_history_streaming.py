@@ -0,0 +1,157 @@
+"""
+测试历史净值流式解析
+
+测试点：
+1. iter_json_array 在任意分块边界下都能正确产出数组元素
+2. EastMoneySource.iter_nav_history 流式读取并标准化记录
+3. 同步服务分块写入，结果与一次性写入一致
+"""
+
+import json
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from api.models import Fund, FundNavHistory
+from api.services.nav_history import sync_nav_history
+from api.sources.eastmoney import EastMoneySource
+from api.utils.json_stream import iter_json_array
+
+
+def _split(raw: bytes, size: int) -> list[bytes]:
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+def _mock_stream_response(payload: dict, chunk_size: int = 7):
+    """构造 stream=True 的响应 mock"""
+    raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_content.return_value = iter(_split(raw, chunk_size))
+    return response
+
+
+class TestIterJsonArray:
+    """测试增量 JSON 解析"""
+
+    PAYLOAD = {
+        "ErrCode": 0,
+        "Meta": {"Datas": ["嵌套的同名字段不应被识别"]},
+        "Datas": [
+            {"FSRQ": "2024-01-02", "DWJZ": "1.2345", "NAME": '含"引号"和中文'},
+            {"nested": [1, {"a": None}]},
+            12345,
+            None,
+        ],
+        "TotalCount": 4,
+    }
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 64, 100000])
+    def test_any_chunk_boundary(self, size):
+        """多字节字符、字符串、数字跨块均能正确解析"""
+        raw = json.dumps(self.PAYLOAD, ensure_ascii=False).encode("utf-8")
+
+        assert list(iter_json_array(_split(raw, size), "Datas")) == self.PAYLOAD["Datas"]
+
+    def test_missing_or_null_key(self):
+        """字段不存在或不是数组时不产出元素"""
+        assert list(iter_json_array([b'{"ErrCode": 0}'], "Datas")) == []
+        assert list(iter_json_array([b'{"Datas": null}'], "Datas")) == []
+        assert list(iter_json_array([b'{"Datas": []}'], "Datas")) == []
+
+    def test_truncated_payload_raises(self):
+        """响应体被截断时抛出 JSONDecodeError"""
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array([b'{"Datas": [{"a": 1}, {"b"'], "Datas"))
+
+
+class TestEastMoneyIterNavHistory:
+    """测试东方财富流式历史净值"""
+
+    PAYLOAD = {
+        "Datas": [
+            {"FSRQ": "2024-01-03", "DWJZ": "1.2456", "LJJZ": "2.3567", "JZZZL": "0.89"},
+            {"FSRQ": "2024-01-02", "DWJZ": "1.2345", "LJJZ": "2.3456", "JZZZL": ""},
+            {"FSRQ": "", "DWJZ": "1.0000"},
+        ],
+        "ErrCode": 0,
+    }
+
+    def test_stream_rows(self):
+        """逐条产出标准化记录，跳过无效行"""
+        with patch("api.sources.eastmoney.requests.get") as mock_get:
+            mock_get.return_value = _mock_stream_response(self.PAYLOAD)
+
+            rows = list(EastMoneySource().iter_nav_history("000001"))
+
+        assert mock_get.call_args.kwargs["stream"] is True
+        assert rows == [
+            {
+                "nav_date": date(2024, 1, 3),
+                "unit_nav": Decimal("1.2456"),
+                "accumulated_nav": Decimal("2.3567"),
+                "daily_growth": Decimal("0.89"),
+            },
+            {
+                "nav_date": date(2024, 1, 2),
+                "unit_nav": Decimal("1.2345"),
+                "accumulated_nav": Decimal("2.3456"),
+                "daily_growth": None,
+            },
+        ]
+
+    def test_stream_date_filter(self):
+        """按日期范围过滤"""
+        with patch("api.sources.eastmoney.requests.get") as mock_get:
+            mock_get.return_value = _mock_stream_response(self.PAYLOAD)
+
+            rows = list(EastMoneySource().iter_nav_history("000001", start_date=date(2024, 1, 3)))
+
+        assert [r["nav_date"] for r in rows] == [date(2024, 1, 3)]
+
+    def test_stream_network_error(self):
+        """网络错误时结束迭代，不抛异常"""
+        with patch("api.sources.eastmoney.requests.get") as mock_get:
+            mock_get.side_effect = requests.ConnectionError("boom")
+
+            assert list(EastMoneySource().iter_nav_history("000001")) == []
+
+
+@pytest.mark.django_db
+class TestStreamingSync:
+    """测试同步服务的流式分块写入"""
+
+    @pytest.fixture
+    def fund(self):
+        return Fund.objects.create(fund_code="000001", fund_name="测试基金")
+
+    def test_sync_writes_in_chunks(self, fund):
+        """分块写入多块数据，已存在的日期覆盖更新"""
+        FundNavHistory.objects.create(
+            fund=fund, nav_date=date(2024, 1, 2), unit_nav=Decimal("9.9999")
+        )
+        payload = {
+            "Datas": [
+                {"FSRQ": f"2024-01-{day:02d}", "DWJZ": f"1.{day:04d}"} for day in range(2, 13)
+            ]
+        }
+
+        with (
+            patch("api.services.nav_history.SourceRegistry.get_source") as mock_get_source,
+            patch("api.services.nav_history.NAV_WRITE_CHUNK_SIZE", 3),
+            patch("api.sources.eastmoney.requests.get") as mock_get,
+        ):
+            mock_get_source.return_value = EastMoneySource()
+            mock_get.return_value = _mock_stream_response(payload)
+
+            count = sync_nav_history("000001", force=True)
+
+        assert count == 10
+        assert FundNavHistory.objects.filter(fund=fund).count() == 11
+        assert FundNavHistory.objects.get(fund=fund, nav_date=date(2024, 1, 2)).unit_nav == (
+            Decimal("1.0002")
+        )
+        fund.refresh_from_db()
+        assert fund.latest_nav_date == date(2024, 1, 12)
@@ -8,6 +8,9 @@
 4. 多个基金
 5. 买入卖出混合
 6. 成本计算正确性
+7. 每日估值快照：读取 / 补写 / 失效 / 定时写入 / 回填
+8. 持仓前向填充：按变化点取值，与逐日填充结果一致
+9. 矩阵估值：净值前向填充、latest_nav 兜底、与逐日逐基金计算一致
 """
 
 from datetime import date, timedelta
@@ -292,3 +295,309 @@ class TestPositionHistory:
 
         result_7 = calculate_account_history(account.id, days=7)
         assert len(result_7) == 8  # 7 天 + 今天
+
+
+@pytest.mark.django_db
+class TestValuationSnapshots:
+    """账户每日估值快照"""
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="testuser", password="pass")
+
+    @pytest.fixture
+    def account(self, user, create_child_account):
+        return create_child_account(user, "测试账户")
+
+    @pytest.fixture
+    def fund(self):
+        from api.models import Fund
+
+        return Fund.objects.create(
+            fund_code="000001", fund_name="华夏成长混合", latest_nav=Decimal("1.5000")
+        )
+
+    def _buy(self, account, fund, days_ago, amount="1000.00"):
+        from api.models import PositionOperation
+
+        return PositionOperation.objects.create(
+            account=account,
+            fund=fund,
+            operation_type="BUY",
+            operation_date=date.today() - timedelta(days=days_ago),
+            amount=Decimal(amount),
+            share=Decimal(amount),
+            nav=Decimal("1.0000"),
+            before_15=True,
+        )
+
+    def _snapshot_dates(self, account):
+        from api.models import AccountValuationSnapshot
+
+        return set(
+            AccountValuationSnapshot.objects.filter(account=account).values_list(
+                "snapshot_date", flat=True
+            )
+        )
+
+    def test_history_writes_and_reads_snapshots(self, account, fund):
+        """首次查询补写过去日期的快照，再次查询只现场计算当天，结果一致"""
+        from unittest.mock import patch
+
+        from api.services import position_history
+
+        self._buy(account, fund, days_ago=5)
+        first = position_history.calculate_account_history(account.id, days=10)
+
+        today = date.today()
+        assert self._snapshot_dates(account) == {today - timedelta(days=d) for d in range(1, 6)}
+
+        with patch.object(
+            position_history,
+            "compute_accounts_rows",
+            wraps=position_history.compute_accounts_rows,
+        ) as mock_compute:
+            second = position_history.calculate_account_history(account.id, days=10)
+
+        mock_compute.assert_called_once()
+        assert list(mock_compute.call_args.args[0]) == [account.id]
+        assert mock_compute.call_args.args[1:] == (today, today)
+        assert second == first
+
+    def test_operation_invalidates_snapshots(self, account, fund):
+        """补录 / 删除流水后，自该日期起的快照失效"""
+        from api.services.position_history import calculate_account_history
+
+        self._buy(account, fund, days_ago=5)
+        calculate_account_history(account.id, days=10)
+
+        op = self._buy(account, fund, days_ago=3, amount="500.00")
+        today = date.today()
+        assert self._snapshot_dates(account) == {today - timedelta(days=d) for d in (4, 5)}
+
+        result = calculate_account_history(account.id, days=10)
+        assert result[-3]["cost"] == 1500.00
+
+        op.delete()
+        assert self._snapshot_dates(account) == {today - timedelta(days=d) for d in (4, 5)}
+        assert calculate_account_history(account.id, days=10)[-3]["cost"] == 1000.00
+
+    def test_nav_history_invalidates_snapshots(self, account, fund):
+        """写入历史净值后，持有该基金的账户自净值日期起的快照失效"""
+        from api.services.nav_history import record_confirmed_navs
+        from api.services.position_history import calculate_account_history
+
+        self._buy(account, fund, days_ago=5)
+        calculate_account_history(account.id, days=10)
+
+        nav_date = date.today() - timedelta(days=2)
+        record_confirmed_navs([(fund, {"unit_nav": Decimal("2.0000"), "nav_date": nav_date})])
+        assert max(self._snapshot_dates(account)) < nav_date
+
+        result = calculate_account_history(account.id, days=10)
+        assert result[-3]["value"] == 2000.00
+        assert result[-4]["value"] == 1500.00
+
+    def test_snapshot_task_writes_today(self, account, fund):
+        """定时任务为有流水的账户写入当天快照（含各基金明细）"""
+        from api.models import AccountValuationSnapshot
+        from api.tasks import snapshot_account_valuations
+
+        self._buy(account, fund, days_ago=1)
+        snapshot_account_valuations()
+
+        snapshot = AccountValuationSnapshot.objects.get(account=account)
+        assert snapshot.snapshot_date == date.today()
+        assert snapshot.value == Decimal("1500.0000")
+        assert snapshot.cost == Decimal("1000.0000")
+        assert Decimal(snapshot.breakdown[str(fund.id)]["share"]) == Decimal(1000)
+
+    def test_backfill_command(self, account, fund):
+        """回填命令写入首笔流水到昨天的快照"""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        self._buy(account, fund, days_ago=5)
+        out = StringIO()
+        call_command("backfill_valuation_snapshots", "--days", "30", stdout=out)
+
+        today = date.today()
+        assert self._snapshot_dates(account) == {today - timedelta(days=d) for d in range(1, 6)}
+        assert "1 个账户，写入 5 个快照" in out.getvalue()
+
+
+class TestForwardFill:
+    """持仓前向填充"""
+
+    def test_matches_daily_fill(self):
+        """按变化点二分取值，与逐日回溯最近操作的结果一致"""
+        from api.services.position_history import _fill_dates
+
+        start = date(2024, 1, 1)
+        op_dates = [start + timedelta(days=d) for d in (3, 4, 10, 40, 41, 90)]
+        positions = {
+            day: {"share": Decimal(i + 1), "cost": Decimal((i + 1) * 10)}
+            for i, day in enumerate(op_dates)
+        }
+        filled = _fill_dates({"fund": positions})["fund"]
+
+        for offset in range(-5, 120):
+            day = start + timedelta(days=offset)
+            earlier = [d for d in op_dates if d <= day]
+            expected = positions[max(earlier)] if earlier else {"share": 0, "cost": 0}
+            assert filled.get(day) == expected, day
+
+    def test_long_range(self, db, create_child_account):
+        """十年区间：每天一行，变化点前后的持仓正确"""
+        from api.models import Fund, PositionOperation
+        from api.services.position_history import calculate_account_history
+
+        user = User.objects.create_user(username="testuser", password="pass")
+        account = create_child_account(user, "测试账户")
+        fund = Fund.objects.create(
+            fund_code="000001", fund_name="华夏成长混合", latest_nav=Decimal("1.0000")
+        )
+        for days_ago in (3000, 2000, 1000):
+            PositionOperation.objects.create(
+                account=account,
+                fund=fund,
+                operation_type="BUY",
+                operation_date=date.today() - timedelta(days=days_ago),
+                amount=Decimal("100.00"),
+                share=Decimal("100.0000"),
+                nav=Decimal("1.0000"),
+                before_15=True,
+            )
+
+        result = calculate_account_history(account.id, days=3650)
+
+        assert len(result) == 3651
+        costs = {row["date"]: row["cost"] for row in result}
+        for days_ago, cost in ((3001, 0), (3000, 100), (2001, 100), (2000, 200), (0, 300)):
+            day = (date.today() - timedelta(days=days_ago)).isoformat()
+            assert costs[day] == cost, day
+
+
+class TestVectorizedValuation:
+    """基金 × 日期矩阵估值"""
+
+    def _series(self, points):
+        from api.services.position_history import _fill_dates
+
+        return _fill_dates({"fund": points})
+
+    def test_nav_forward_fill(self):
+        """缺少净值的日期沿用上一个净值日，区间内尚无净值时使用 latest_nav"""
+        from api.services.position_history import _calculate_daily_value
+
+        start = date(2024, 1, 1)
+        positions = self._series(
+            {start: {"share": Decimal(100), "cost": Decimal(100)}},
+        )
+        navs = {"fund": {date(2024, 1, 3): Decimal("1.2000"), date(2024, 1, 5): Decimal("1.5000")}}
+
+        rows = _calculate_daily_value(
+            positions, navs, {"fund": Decimal("2.0000")}, start, date(2024, 1, 7)
+        )
+
+        assert [row["value"] for row in rows] == [
+            Decimal(200),  # latest_nav
+            Decimal(200),
+            Decimal(120),
+            Decimal(120),  # 沿用 1 月 3 日
+            Decimal(150),
+            Decimal(150),
+            Decimal(150),
+        ]
+        assert all(row["cost"] == Decimal(100) for row in rows)
+        assert rows[2]["breakdown"]["fund"] == {"share": "100", "cost": "100", "value": "120.0000"}
+
+    def test_without_nav_uses_cost(self):
+        """没有任何净值时市值按成本估算，份额为 0 的日期不计入"""
+        from api.services.position_history import _calculate_daily_value
+
+        start = date(2024, 1, 1)
+        positions = self._series(
+            {
+                date(2024, 1, 2): {"share": Decimal(100), "cost": Decimal(80)},
+                date(2024, 1, 3): {"share": Decimal(0), "cost": Decimal(0)},
+            }
+        )
+
+        rows = _calculate_daily_value(positions, {}, {}, start, date(2024, 1, 3))
+
+        assert [(row["value"], row["cost"]) for row in rows] == [
+            (Decimal(0), Decimal(0)),
+            (Decimal(80), Decimal(80)),
+            (Decimal(0), Decimal(0)),
+        ]
+        assert rows[1]["breakdown"] and not rows[2]["breakdown"]
+
+    def test_lookback_nav_before_range(self, db, create_child_account):
+        """区间起点之前的最近净值用于填充起点"""
+        from api.models import Fund, FundNavHistory, PositionOperation
+        from api.services.position_history import compute_history_rows
+
+        user = User.objects.create_user(username="testuser", password="pass")
+        account = create_child_account(user, "测试账户")
+        fund = Fund.objects.create(
+            fund_code="000001", fund_name="华夏成长混合", latest_nav=Decimal("3.0000")
+        )
+        today = date.today()
+        PositionOperation.objects.create(
+            account=account,
+            fund=fund,
+            operation_type="BUY",
+            operation_date=today - timedelta(days=20),
+            amount=Decimal("100.00"),
+            share=Decimal("100.0000"),
+            nav=Decimal("1.0000"),
+            before_15=True,
+        )
+        FundNavHistory.objects.create(
+            fund=fund, nav_date=today - timedelta(days=8), unit_nav=Decimal("1.1000")
+        )
+
+        rows = compute_history_rows(account.id, today - timedelta(days=3), today)
+
+        assert [row["value"] for row in rows] == [Decimal(110)] * 4
+
+    def test_matches_per_day_reference(self):
+        """多基金长区间与逐日逐基金的 Decimal 计算一致"""
+        from api.services.position_history import _calculate_daily_value, _fill_dates
+
+        start = date(2020, 1, 1)
+        end = date(2024, 12, 31)
+        daily_positions = {}
+        daily_nav = {}
+        for f in range(8):
+            points = {}
+            share = Decimal(0)
+            for k in range(1, 12):
+                share += Decimal(10 * (f + 1))
+                day = start + timedelta(days=k * (97 + f * 13))
+                points[day] = {"share": share, "cost": share * Decimal("1.1")}
+            daily_positions[f"f{f}"] = points
+            daily_nav[f"f{f}"] = {
+                start + timedelta(days=d): Decimal(1) + Decimal(d % 50) / 100
+                for d in range(0, 1800, 3)
+            }
+        series = _fill_dates(daily_positions)
+
+        rows = _calculate_daily_value(series, daily_nav, {}, start, end)
+
+        for row in rows[::37]:
+            day = row["date"]
+            expected_value = Decimal(0)
+            expected_cost = Decimal(0)
+            for fund_id, s in series.items():
+                position = s.get(day)
+                if position["share"] == 0:
+                    continue
+                known = [d for d in daily_nav[fund_id] if d <= day]
+                nav = daily_nav[fund_id][max(known)] if known else None
+                expected_cost += position["cost"]
+                expected_value += position["share"] * nav if nav else position["cost"]
+            assert abs(row["value"] - expected_value) < Decimal("0.001"), day
+            assert abs(row["cost"] - expected_cost) < Decimal("0.001"), day
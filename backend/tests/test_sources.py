@@ -81,6 +81,36 @@ class TestEastMoneySource:
         assert result["fund_code"] == "000001"
         assert result["nav"] == Decimal("1.1490")
         assert result["nav_date"] == date(2026, 2, 10)
+        # 响应中没有 NAV 字段时单位净值为空，不用累计净值顶替
+        assert result["unit_nav"] is None
+
+    @patch("requests.get")
+    def test_fetch_realtime_nav_history_fields(self, mock_get):
+        """移动端净值同时返回单位净值 / 累计净值 / 日增长率（写入历史净值用）"""
+        from unittest.mock import MagicMock
+
+        from api.sources.eastmoney import EastMoneySource
+
+        mock = MagicMock()
+        mock.json.return_value = {
+            "Datas": [
+                {
+                    "FCODE": "000001",
+                    "NAV": "1.1490",
+                    "ACCNAV": "3.2100",
+                    "NAVCHGRT": "0.52",
+                    "PDATE": "2026-02-10",
+                },
+            ]
+        }
+        mock_get.return_value = mock
+
+        result = EastMoneySource().fetch_realtime_nav("000001")
+
+        assert result["nav"] == Decimal("3.2100")
+        assert result["unit_nav"] == Decimal("1.1490")
+        assert result["accumulated_nav"] == Decimal("3.2100")
+        assert result["daily_growth"] == Decimal("0.52")
 
 
 class TestSourceRegistry:
@@ -10,7 +10,7 @@
 
 from datetime import date
 
-from api.utils.trading_calendar import get_last_trading_day, is_trading_day
+from api.utils.trading_calendar import get_last_trading_day, get_trading_days, is_trading_day
 
 
 class TestTradingCalendar:
@@ -69,3 +69,21 @@ class TestTradingCalendar:
         """长假期间应该能正确往前找"""
         # 2024-02-12 是春节假期（2月10-17日），应该返回 2024-02-09（周五）
         assert get_last_trading_day(date(2024, 2, 12)) == date(2024, 2, 9)
+
+    def test_get_trading_days_excludes_weekend_and_holiday(self):
+        """区间交易日：排除周末与节假日"""
+        # 2023-12-29（周五）~ 2024-01-03（周三），元旦休市
+        assert get_trading_days(date(2023, 12, 29), date(2024, 1, 3)) == [
+            date(2023, 12, 29),
+            date(2024, 1, 2),
+            date(2024, 1, 3),
+        ]
+
+    def test_get_trading_days_excludes_makeup_workday(self):
+        """周末调休日交易所不开市"""
+        # 2024-02-04（周日）为春节调休工作日
+        assert date(2024, 2, 4) not in get_trading_days(date(2024, 2, 1), date(2024, 2, 8))
+
+    def test_get_trading_days_empty_range(self):
+        """起始晚于结束返回空列表"""
+        assert get_trading_days(date(2024, 1, 5), date(2024, 1, 2)) == []
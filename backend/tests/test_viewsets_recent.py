@@ -12,7 +12,7 @@ from decimal import Decimal
 from unittest.mock import MagicMock, patch
 
 import pytest
-from api.models import Account, Fund, Position
+from api.models import Account, Fund, FundNavHistory, Position
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -200,11 +200,13 @@ class TestFundBatchUpdateNav:
                     "fund_code": "000001",
                     "nav": Decimal("1.5000"),
                     "nav_date": date(2026, 2, 11),
+                    "unit_nav": Decimal("1.5000"),
                 },
                 {
                     "fund_code": "000002",
                     "nav": Decimal("2.0000"),
                     "nav_date": date(2026, 2, 11),
+                    "unit_nav": Decimal("2.0000"),
                 },
             ]
             mock_get_source.return_value = mock_source
@@ -234,6 +236,9 @@ class TestFundBatchUpdateNav:
             assert fund1.latest_nav == Decimal("1.5000")
             assert fund1.latest_nav_date == date(2026, 2, 11)
 
+            # 确认净值同时写入历史表
+            assert FundNavHistory.objects.filter(nav_date=date(2026, 2, 11)).count() == 2
+
     def test_batch_update_nav_with_error(self, client, funds):
         """测试：获取净值失败时，返回错误"""
         with patch("api.viewsets.SourceRegistry.get_source") as mock_get_source:
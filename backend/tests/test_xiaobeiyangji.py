@@ -9,6 +9,7 @@
 5. fetch_nav_history（字段映射、日期过滤、range 计算）
 6. fetch_holdings（字段映射、份额推算、money=0 跳过）
 7. 未登录时抛出明确异常
+8. import_from_xiaobeiyangji 导入服务（按账户分组、幂等、同一数据源实例上依次获取）
 """
 
 from datetime import date
@@ -507,3 +508,97 @@ class TestFetchHoldings:
         # money=12345, nav=1.6552 → share ≈ 7458.16
         expected_share = Decimal("12345") / Decimal("1.6552")
         assert abs(h["share"] - expected_share) < Decimal("0.01")
+
+
+# ─────────────────────────────────────────────
+# 测试：导入服务
+# ─────────────────────────────────────────────
+
+
+@pytest.mark.django_db
+class TestImportFromXiaoBeiYangJi:
+    @pytest.fixture
+    def user(self):
+        from django.contrib.auth import get_user_model
+
+        return get_user_model().objects.create_user(username="testuser", password="pass")
+
+    @pytest.fixture
+    def mock_source(self):
+        source = MagicMock()
+        source.fetch_accounts.return_value = [{"accountId": 11, "name": "支付宝"}]
+        source.fetch_holdings.return_value = [
+            {
+                "fund_code": "025209",
+                "fund_name": "基金A",
+                "account_id": 11,
+                "share": Decimal(100),
+                "nav": Decimal("1.5"),
+                "amount": Decimal(150),
+                "operation_date": date(2024, 3, 1),
+            },
+            {
+                "fund_code": "000001",
+                "fund_name": "基金B",
+                "account_id": None,
+                "share": Decimal(0),
+                "nav": Decimal(0),
+                "amount": Decimal(120),
+                "earnings": Decimal(20),
+                "operation_date": date(2024, 3, 1),
+            },
+        ]
+        return source
+
+    def test_import_groups_holdings_by_account(self, user, mock_source):
+        """按 accountId 分组到子账户，未知账户归入默认账户"""
+        from api.models import Position
+        from api.services.import_xiaobeiyangji import import_from_xiaobeiyangji
+
+        result = import_from_xiaobeiyangji(user, mock_source)
+
+        assert result["accounts_created"] == 3  # 父账户 + 2 个子账户
+        assert result["holdings_created"] == 2
+
+        alipay = Position.objects.get(account__name="支付宝", account__parent__name="小倍养基")
+        assert alipay.fund.fund_code == "025209"
+        assert alipay.holding_share == Decimal(100)
+
+        default = Position.objects.get(account__name="默认账户")
+        assert default.holding_cost == Decimal("100.00")
+        assert default.source_market_value == Decimal("120.00")
+
+    def test_import_idempotent(self, user, mock_source):
+        """重复导入跳过已有记录"""
+        from api.models import PositionOperation
+        from api.services.import_xiaobeiyangji import import_from_xiaobeiyangji
+
+        import_from_xiaobeiyangji(user, mock_source)
+        result = import_from_xiaobeiyangji(user, mock_source)
+
+        assert result["holdings_created"] == 0
+        assert result["holdings_skipped"] == 2
+        assert PositionOperation.objects.filter(account__user=user).count() == 2
+
+    def test_fetches_on_calling_thread(self, user, mock_source):
+        """账户列表与持仓在调用线程上依次获取，不并发共用数据源的登录态"""
+        import threading
+
+        from api.services.import_xiaobeiyangji import import_from_xiaobeiyangji
+
+        threads = []
+
+        def record(result):
+            def fetch():
+                threads.append(threading.current_thread())
+                return result
+
+            return fetch
+
+        mock_source.fetch_accounts.side_effect = record(mock_source.fetch_accounts.return_value)
+        mock_source.fetch_holdings.side_effect = record(mock_source.fetch_holdings.return_value)
+
+        result = import_from_xiaobeiyangji(user, mock_source)
+
+        assert threads == [threading.current_thread()] * 2
+        assert result["holdings_created"] == 2
@@ -459,6 +459,105 @@ class TestImportFromYangJiBao:
         assert result["holdings_skipped"] == 1
         assert result["holdings_created"] == 0
 
+    def _multi_source(self, count):
+        """两个账户，各 count 只基金"""
+        mock_source = Mock()
+        mock_source.fetch_accounts.return_value = [
+            {"account_id": "acc-001", "name": "招商银行"},
+            {"account_id": "acc-002", "name": "支付宝"},
+        ]
+        mock_source.fetch_holdings.side_effect = lambda account_id: [
+            {
+                "fund_code": f"{i:06d}",
+                "fund_name": f"基金{i}",
+                "share": Decimal(100),
+                "nav": Decimal("1.5"),
+                "amount": Decimal(150),
+                "operation_date": date(2024, 1, 15),
+            }
+            for i in range(1, count + 1)
+        ]
+        return mock_source
+
+    def test_import_recalculates_each_position_once(self, user):
+        """覆盖导入：每个持仓只重算一次，不逐条回放"""
+        from api import services
+        from api.models import Position, PositionOperation
+        from api.services import position_bulk
+        from api.services.import_yjb import import_from_yangjibao
+
+        import_from_yangjibao(user, self._multi_source(3))
+
+        with (
+            patch.object(services, "recalculate_position") as mock_single,
+            patch.object(
+                position_bulk, "recalculate_pairs", wraps=position_bulk.recalculate_pairs
+            ) as mock_pairs,
+        ):
+            result = import_from_yangjibao(user, self._multi_source(3), overwrite=True)
+
+        mock_single.assert_not_called()
+        assert mock_pairs.call_count == 1
+        assert len(mock_pairs.call_args.args[0]) == 6
+        assert result["holdings_created"] == 6
+        assert PositionOperation.objects.filter(account__user=user).count() == 6
+
+        position = Position.objects.get(account__name="支付宝", fund__fund_code="000002")
+        assert position.holding_share == Decimal(100)
+        assert position.holding_cost == Decimal("150.00")
+
+    def test_import_query_count_independent_of_holdings(self, user):
+        """数据库查询次数与持仓数量无关"""
+        from api.services.import_yjb import import_from_yangjibao
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def run(count):
+            with CaptureQueriesContext(connection) as ctx:
+                import_from_yangjibao(user, self._multi_source(count), overwrite=True)
+            return len(ctx.captured_queries)
+
+        # 各自重复导入一次，排除首次创建基金 / 清仓删除持仓的查询
+        run(10)
+        large = run(10)
+        run(2)
+        assert run(2) == large
+
+    def test_write_holdings_recalculates_without_outer_scope(self, user):
+        """write_holdings 自带重算作用域，调用方未开启时也会重算持仓"""
+        from api.models import Account, Position
+        from api.services.holding_import import write_holdings
+
+        parent = Account.objects.create(user=user, name="养基宝")
+        child = Account.objects.create(user=user, name="支付宝", parent=parent)
+        holding = {
+            "fund_code": "000001",
+            "fund_name": "华夏成长",
+            "share": Decimal("100"),
+            "nav": Decimal("1.5"),
+            "amount": Decimal("150"),
+            "operation_date": date(2024, 1, 15),
+        }
+
+        assert write_holdings([(child, [holding])], overwrite=False) == (1, 0)
+
+        position = Position.objects.get(account=child, fund__fund_code="000001")
+        assert position.holding_share == Decimal("100")
+        assert position.holding_cost == Decimal("150.00")
+
+    def test_fetch_failure_writes_nothing(self, user):
+        """远端获取失败时不写入任何数据"""
+        from api.models import Account
+        from api.services.import_yjb import import_from_yangjibao
+
+        mock_source = self._multi_source(1)
+        mock_source.fetch_holdings.side_effect = Exception("网络错误")
+
+        with pytest.raises(Exception, match="网络错误"):
+            import_from_yangjibao(user, mock_source)
+
+        assert not Account.objects.filter(user=user).exists()
+
 
 # ─────────────────────────────────────────────
 # 4. API 端点测试